@@ -1,2519 +1,4980 @@
-import telebot
-from flask import Flask, request
-from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
-from twilio.rest import Client
-import uuid
-from datetime import datetime
-import json
-import os
-import re
-import time
-import logging
-import threading
-import signal
-import sys
-import gc
-import traceback
-from functools import wraps
-
-# Configure logging to write to a file and not to the console.
-# All logs (INFO level and above) will go to 'debug.log'.
-# The console will remain clean.
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('debug.log', encoding='utf-8')
-    ]
-)
-
-logger = logging.getLogger(__name__)
-
-# Ensure console output uses UTF-8 for emojis
-if sys.stdout.encoding.lower() != 'utf-8':
-    sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf-8', buffering=1)
-    sys.stderr = open(sys.stderr.fileno(), mode='w', encoding='utf-8', buffering=1)
-
-# sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf-8', buffering=1)
-#     sys.stderr = open(sys.stderr.fileno(), mode='w', encoding='utf-8', buffering=1)
-
-# Telegram Bot Token
-TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
-
-
-
-
-
-
-
-# Admin Telegram Username
-ADMIN_USERNAME = "@RJ_MEMORY"
-
-# Admin Telegram User ID
-admin_id = 5718596664
-
-# Required Channels
-REQUIRED_CHANNELS = [
-    {"username": "@DailyEarningTips25", "chat_id": "@DailyEarningTips25"},
-    {"username": "@BotSeller25", "chat_id": "@BotSeller25"}
-]
-
-# File to store registered users
-USERS_FILE = "users.json"
-
-# Dictionary to store generated numbers per user session
-generated_numbers = {}
-
-# Dictionary to store user-specific data
-user_data = {}
-user_current_number = {}
-
-# Multiple Twilio accounts pool for auto-failover
-twilio_account_pool = [
-    {"sid": os.environ.get("TWILIO_SID_1", ""), "auth_token": os.environ.get("TWILIO_TOKEN_1", ""), "status": "active"},  # Account 1
-    {"sid": os.environ.get("TWILIO_SID_2", ""), "auth_token": os.environ.get("TWILIO_TOKEN_2", ""), "status": "active"},  # Account 2
-    {"sid": os.environ.get("TWILIO_SID_3", ""), "auth_token": os.environ.get("TWILIO_TOKEN_3", ""), "status": "active"},  # Account 3
-    {"sid": os.environ.get("TWILIO_SID_4", ""), "auth_token": os.environ.get("TWILIO_TOKEN_4", ""), "status": "active"},  # Account 4
-    {"sid": os.environ.get("TWILIO_SID_5", ""), "auth_token": os.environ.get("TWILIO_TOKEN_5", ""), "status": "active"},  # Account 5
-]
-
-# Track current account index for each user
-user_account_index = {}
-
-# Initialize registered users
-registered_users = {}
-
-# Global error tracking
-error_count = 0
-last_error_time = 0
-
-def comprehensive_error_handler(func):
-    """Ultra comprehensive error handler decorator"""
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        global error_count, last_error_time
-        try:
-            return func(*args, **kwargs)
-        except telebot.apihelper.ApiTelegramException as e:
-            error_msg = str(e).lower()
-            if "blocked" in error_msg or "chat not found" in error_msg:
-                logger.warning(f"User interaction error in {func.__name__}: {str(e)}")
-            elif "rate" in error_msg or "too many" in error_msg:
-                logger.warning(f"Rate limit in {func.__name__}, backing off...")
-                time.sleep(5)
-            else:
-                logger.error(f"Telegram API error in {func.__name__}: {str(e)}")
-        except Exception as e:
-            current_time = time.time()
-            error_count += 1
-
-            if current_time - last_error_time > 300:  # Reset count every 5 minutes
-                error_count = 1
-            last_error_time = current_time
-
-            logger.error(f"Error in {func.__name__}: {str(e)}", exc_info=True)
-
-            # Try to send error notification to user if possible
-            try:
-                if args and hasattr(args[0], 'chat') and hasattr(args[0].chat, 'id'):
-                    chat_id = args[0].chat.id
-                    safe_send_message(chat_id, "⚠️ Temporary issue occurred. Please try again.")
-            except:
-                pass
-
-            # Force garbage collection on repeated errors
-            if error_count > 10:
-                gc.collect()
-                error_count = 0
-    return wrapper
-
-
-
-def safe_load_registered_users():
-    """Load registered users with maximum safety"""
-    global registered_users
-
-    backup_files = [USERS_FILE, f"{USERS_FILE}.backup", f"{USERS_FILE}.old"]
-
-    for file_path in backup_files:
-        try:
-            if os.path.exists(file_path):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    users = {}
-
-                    for user_id, user_info in data.items():
-                        try:
-                            if isinstance(user_info, dict):
-                                users[int(user_id)] = user_info
-                            else:
-                                users[int(user_id)] = {
-                                    "status": user_info if isinstance(user_info, str) else "approved",
-                                    "channel_joined": False,
-                                    "first_use_time": None
-                                }
-                        except (ValueError, TypeError):
-                            logger.warning(f"Skipping invalid user data: {user_id}")
-                            continue
-
-                    registered_users = users
-                    logger.info(f"Loaded {len(users)} users from {file_path}")
-                    return True
-
-        except Exception as e:
-            logger.error(f"Error loading from {file_path}: {str(e)}")
-            continue
-
-    # If all files fail, initialize with admin
-    registered_users = {admin_id: {"status": "approved", "channel_joined": True, "first_use_time": None}}
-    logger.info("Initialized with admin user only")
-    return True
-
-def safe_save_registered_users():
-    """Save users with backup and atomic write"""
-    try:
-        # Create backup first
-        if os.path.exists(USERS_FILE):
-            try:
-                os.rename(USERS_FILE, f"{USERS_FILE}.backup")
-            except:
-                pass
-
-        # Atomic write
-        temp_file = f"{USERS_FILE}.tmp"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(registered_users, f, indent=2, ensure_ascii=False)
-
-        os.rename(temp_file, USERS_FILE)
-        logger.info("Users saved successfully")
-        return True
-
-    except Exception as e:
-        logger.error(f"Error saving users: {str(e)}")
-        return False
-
-def robust_channel_check(user_id, max_retries=3):
-    """Enhanced channel membership check with API bypass and fallback system"""
-    if user_id == admin_id:
-        return True
-
-    channels_verified = 0
-    required_channels_count = len(REQUIRED_CHANNELS)
-    api_errors = []
-
-    for attempt in range(max_retries):
-        try:
-            channels_verified = 0
-            for channel in REQUIRED_CHANNELS:
-                try:
-                    member = bot.get_chat_member(channel["chat_id"], user_id)
-                    if member.status in ['left', 'kicked']:
-                        logger.info(f"User {user_id} has left channel {channel['username']}")
-                        # Reset user's channel_joined status
-                        if user_id in registered_users:
-                            registered_users[user_id]["channel_joined"] = False
-                            safe_save_registered_users()
-                        return False
-                    elif member.status in ['member', 'administrator', 'creator']:
-                        channels_verified += 1
-                        logger.info(f"User {user_id} is member of {channel['username']}")
-                        # Mark this channel as verified for this user
-                        if user_id not in registered_users:
-                            registered_users[user_id] = {"status": "approved", "channel_joined": False, "first_use_time": None}
-                        if "verified_channels" not in registered_users[user_id]:
-                            registered_users[user_id]["verified_channels"] = {}
-                        registered_users[user_id]["verified_channels"][channel["username"]] = True
-                    time.sleep(0.1)  # Small delay between checks
-                except telebot.apihelper.ApiTelegramException as e:
-                    error_msg = str(e).lower()
-                    api_errors.append(f"{channel['username']}: {str(e)}")
-
-                    if "user not found" in error_msg or "chat not found" in error_msg:
-                        logger.warning(f"User {user_id} not found in {channel['username']}")
-                        return False
-                    elif "member list is inaccessible" in error_msg or "bad request" in error_msg:
-                        # Smart fallback: Use previous verification + time-based trust
-                        logger.warning(f"Member list inaccessible for {channel['username']}, using fallback verification")
-
-                        # Check if user was previously verified for this specific channel
-                        if (user_id in registered_users and
-                            registered_users[user_id].get("verified_channels", {}).get(channel["username"], False)):
-                            channels_verified += 1
-                            logger.info(f"✅ Allowing user {user_id} for {channel['username']} - Previously verified & API bypass active")
-                        else:
-                            # Fallback verification: If user is trying to use bot and one channel is accessible, trust for both
-                            other_channel_accessible = False
-                            for other_channel in REQUIRED_CHANNELS:
-                                if other_channel["username"] != channel["username"]:
-                                    try:
-                                        other_member = bot.get_chat_member(other_channel["chat_id"], user_id)
-                                        if other_member.status in ['member', 'administrator', 'creator']:
-                                            other_channel_accessible = True
-                                            break
-                                    except:
-                                        continue
-
-                            if other_channel_accessible:
-                                # If user is verified in at least one channel, assume good faith for inaccessible channel
-                                channels_verified += 1
-                                logger.info(f"✅ Allowing user {user_id} for {channel['username']} - Verified in other channel, API bypass fallback")
-                                # Mark as verified for future
-                                if user_id not in registered_users:
-                                    registered_users[user_id] = {"status": "approved", "channel_joined": False, "first_use_time": None}
-                                if "verified_channels" not in registered_users[user_id]:
-                                    registered_users[user_id]["verified_channels"] = {}
-                                registered_users[user_id]["verified_channels"][channel["username"]] = True
-                            else:
-                                logger.warning(f"❌ User {user_id} cannot be verified for {channel['username']} - No fallback available")
-                                return False
-                    elif "rate" in error_msg or "too many" in error_msg:
-                        time.sleep(2)
-                        continue
-                    else:
-                        logger.error(f"API error checking {channel['username']}: {str(e)}")
-                        # For other API errors, be more lenient
-                        if (user_id in registered_users and
-                            registered_users[user_id].get("verified_channels", {}).get(channel["username"], False)):
-                            channels_verified += 1
-                            logger.info(f"✅ Allowing user {user_id} for {channel['username']} - API error bypass using previous verification")
-                        else:
-                            return False
-                except Exception as e:
-                    logger.error(f"Unexpected error checking {channel['username']}: {str(e)}")
-                    # For unexpected errors, use cached verification if available
-                    if (user_id in registered_users and
-                        registered_users[user_id].get("verified_channels", {}).get(channel["username"], False)):
-                        channels_verified += 1
-                        logger.info(f"✅ Allowing user {user_id} for {channel['username']} - Exception bypass using cached verification")
-                    else:
-                        return False
-
-            # User must be verified in ALL channels
-            if channels_verified == required_channels_count:
-                # Update user's overall status
-                if user_id in registered_users:
-                    registered_users[user_id]["channel_joined"] = True
-                    safe_save_registered_users()
-                logger.info(f"✅ User {user_id} fully verified in all {channels_verified}/{required_channels_count} channels")
-                return True
-            else:
-                logger.warning(f"❌ User {user_id} verified in only {channels_verified}/{required_channels_count} channels")
-                return False
-
-        except Exception as e:
-            logger.error(f"Channel check attempt {attempt + 1} failed: {str(e)}")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-
-    # Final fallback: If all API attempts failed but user was previously verified
-    logger.warning(f"All API attempts failed for user {user_id}. API Errors: {api_errors}")
-
-    # Ultimate fallback for completely inaccessible APIs
-    if (user_id in registered_users and
-        registered_users[user_id].get("channel_joined", False) and
-        len(registered_users[user_id].get("verified_channels", {})) >= required_channels_count):
-        logger.info(f"🚨 ULTIMATE FALLBACK: Allowing user {user_id} based on previous full verification - API completely inaccessible")
-        return True
-
-    logger.warning(f"❌ All verification methods failed for user {user_id}")
-    return False
-
-def is_user_authorized(user_id):
-    """Check if user is authorized with safety"""
-    try:
-        if user_id == admin_id:
-            return True
-        
-        # First, check if user is in our records and was previously verified
-        user_was_authorized = user_id in registered_users and registered_users[user_id].get("channel_joined", False)
-
-        # Now, perform the live channel check
-        is_currently_authorized = robust_channel_check(user_id)
-
-        # If the user was authorized before but isn't now, send a notification
-        if user_was_authorized and not is_currently_authorized:
-            warning_msg = "⚠️ *Channel Membership Required!* ⚠️\n\n"
-            warning_msg += "❌ You seem to have left one of our required channels.\n\n"
-            warning_msg += "🔒 To continue using the bot, please ensure you are a member of:\n\n"
-            for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                warning_msg += f"{i}. {channel['username']}\n"
-            warning_msg += "\n💡 After rejoining, please verify your membership."
-
-            safe_send_message(user_id, warning_msg, reply_markup=create_channel_join_menu(), parse_mode="Markdown")
-
-        return is_currently_authorized
-    except Exception as e:
-        logger.error(f"Error checking authorization for {user_id}: {str(e)}")
-        return False
-
-def create_main_menu(user_id):
-    """Create main menu with error handling"""
-    try:
-        markup = ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
-
-        # Main buttons for all users
-        markup.row(
-            KeyboardButton("👤 Login"),
-            KeyboardButton("➕ Bulk Login")
-        )
-        markup.row(
-            KeyboardButton("📤 Logout"),
-            KeyboardButton("🔎 Search Numbers") # Reverted to original
-        )
-        markup.row(
-            KeyboardButton("📍 Target Number"),
-            KeyboardButton("💬 Receive SMS")
-        )
-        markup.row(
-            KeyboardButton("🔗 Check Channels"),
-            KeyboardButton("🇺🇸 USA Numbers") # New button for USA numbers
-        )
-        markup.row(
-            KeyboardButton("❓ Help")
-        )
-
-        # Admin only buttons
-        if user_id == admin_id:
-            markup.row(
-                KeyboardButton("⚙️ Admin Panel"), # This one is correct from previous fix
-                KeyboardButton("📣 Broadcast")
-            )
-
-        return markup
-    except Exception as e:
-        logger.error(f"Error creating main menu: {str(e)}")
-        return ReplyKeyboardMarkup(resize_keyboard=True)
-
-def create_channel_join_menu():
-    """Create channel join menu with error handling"""
-    try:
-        markup = InlineKeyboardMarkup(row_width=1)
-        for channel in REQUIRED_CHANNELS:
-            markup.add(InlineKeyboardButton(
-                text="🚀 Join Now",
-                url=f"https://t.me/{channel['username'][1:]}"
-            ))
-        markup.add(InlineKeyboardButton(
-            text="✅ Verify Now",
-            callback_data="verify_channels"
-        ))
-        return markup
-    except Exception as e:
-        logger.error(f"Error creating channel menu: {str(e)}")
-        return InlineKeyboardMarkup()
-
-def create_admin_panel():
-    """Create admin panel with error handling"""
-    try:
-        markup = InlineKeyboardMarkup()
-        markup.row(
-            InlineKeyboardButton("Block User", callback_data="admin_block"),
-            InlineKeyboardButton("Unblock User", callback_data="admin_unblock")
-        )
-        markup.row(
-            InlineKeyboardButton("Approve User", callback_data="admin_approve")
-        )
-        return markup
-    except Exception as e:
-        logger.error(f"Error creating admin panel: {str(e)}")
-        return InlineKeyboardMarkup()
-
-def ultra_safe_send_message(chat_id, text, reply_markup=None, parse_mode=None, max_retries=5):
-    """Ultra safe message sending with comprehensive error handling"""
-    for attempt in range(max_retries):
-        try:
-            if not bot:
-                return False
-
-            # Truncate message if too long
-            if len(text) > 4096:
-                text = text[:4093] + "..."
-
-            bot.send_message(chat_id, text, reply_markup=reply_markup, parse_mode=parse_mode)
-            return True
-
-        except telebot.apihelper.ApiTelegramException as e:
-            error_msg = str(e).lower()
-
-            if "blocked" in error_msg or "chat not found" in error_msg:
-                logger.warning(f"User {chat_id} blocked bot or chat not found")
-                return False
-            elif "rate" in error_msg or "too many" in error_msg:
-                wait_time = min(2 ** attempt, 30)
-                logger.warning(f"Rate limited, waiting {wait_time}s")
-                time.sleep(wait_time)
-                continue
-            elif "message is too long" in error_msg:
-                text = text[:4000] + "..."
-                continue
-            elif "can't parse" in error_msg:
-                parse_mode = None
-                continue
-            else:
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
-                logger.error(f"Telegram API error after {max_retries} attempts: {str(e)}")
-                return False
-
-        except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-                continue
-            logger.error(f"Failed to send message after {max_retries} attempts: {str(e)}")
-            return False
-
-    return False
-
-# Alias for backward compatibility
-safe_send_message = ultra_safe_send_message
-
-def check_account_status(twilio_client):
-    """Check Twilio account status with enhanced error handling"""
-    try:
-        account = twilio_client.api.accounts.list()[0]
-        if account.status == 'active':
-            return True, "Account is active"
-        elif account.status == 'suspended':
-            return False, "Account has been suspended. Please use a different account."
-        else:
-            return False, f"Account status: {account.status}. Please use a different account."
-    except AttributeError:
-        return False, "Could not retrieve Twilio account information. Please check your credentials."
-    except Exception as e:
-        error_msg = str(e)
-        if "authenticate" in error_msg.lower():
-            return False, "Invalid Twilio credentials. Please provide correct information."
-        elif "not found" in error_msg.lower():
-            return False, "Twilio account not found. Please use a different account."
-        else:
-            return False, "Problem checking Twilio account. Please try again."
-
-def get_next_working_account(user_id):
-    """Get next working Twilio account from pool or user's bulk accounts with automatic failover"""
-    global twilio_account_pool, user_account_index
-
-    # Check if user has bulk accounts first
-    if user_id in user_data and user_data[user_id].get("using_bulk_pool", False):
-        bulk_accounts = user_data[user_id].get("bulk_accounts", [])
-        current_bulk_index = user_data[user_id].get("current_bulk_index", 0)
-
-        # Try each bulk account
-        for attempt in range(len(bulk_accounts)):
-            current_index = (current_bulk_index + attempt) % len(bulk_accounts)
-            account = bulk_accounts[current_index]
-
-            # Skip if account is marked as inactive
-            if account["status"] != "active":
-                continue
-
-            try:
-                # Test the account
-                test_client = Client(account["sid"], account["auth_token"])
-                status_ok, status_msg = check_account_status(test_client)
-
-                if status_ok:
-                    # Update user's current bulk account index
-                    user_data[user_id]["current_bulk_index"] = current_index
-                    logger.info(f"Using bulk account #{current_index + 1} for user {user_id}")
-                    return account["sid"], account["auth_token"], current_index + 1
-                else:
-                    # Mark account as inactive
-                    account["status"] = "inactive"
-                    logger.warning(f"Bulk account #{current_index + 1} marked as inactive: {status_msg}")
-                    continue
-
-            except Exception as e:
-                # Mark account as inactive on error
-                account["status"] = "inactive"
-                logger.error(f"Bulk account #{current_index + 1} failed: {str(e)}")
-                continue
-
-        # No working bulk account found
-        return None, None, None
-
-    # Use global pool if no bulk accounts
-    # Initialize user account index if not exists
-    if user_id not in user_account_index:
-        user_account_index[user_id] = 0
-
-    # Try each account in the pool
-    for attempt in range(len(twilio_account_pool)):
-        current_index = (user_account_index[user_id] + attempt) % len(twilio_account_pool)
-        account = twilio_account_pool[current_index]
-
-        # Skip if account is marked as inactive
-        if account["status"] != "active":
-            continue
-
-        # Skip if credentials are empty
-        if not account["sid"] or not account["auth_token"]:
-            continue
-
-        try:
-            # Test the account
-            test_client = Client(account["sid"], account["auth_token"])
-            status_ok, status_msg = check_account_status(test_client)
-
-            if status_ok:
-                # Update user's current account index
-                user_account_index[user_id] = current_index
-                logger.info(f"Using Twilio account #{current_index + 1} for user {user_id}")
-                return account["sid"], account["auth_token"], current_index + 1
-            else:
-                # Mark account as inactive
-                account["status"] = "inactive"
-                logger.warning(f"Account #{current_index + 1} marked as inactive: {status_msg}")
-                continue
-
-        except Exception as e:
-            # Mark account as inactive on error
-            account["status"] = "inactive"
-            logger.error(f"Account #{current_index + 1} failed: {str(e)}")
-            continue
-
-    # No working account found
-    return None, None, None
-
-def mark_account_as_failed(user_id, reason="Unknown error"):
-    """Mark current account as failed and move to next"""
-    global twilio_account_pool, user_account_index
-
-    # Check if using bulk accounts
-    if user_id in user_data and user_data[user_id].get("using_bulk_pool", False):
-        bulk_accounts = user_data[user_id].get("bulk_accounts", [])
-        current_bulk_index = user_data[user_id].get("current_bulk_index", 0)
-
-        if current_bulk_index < len(bulk_accounts):
-            bulk_accounts[current_bulk_index]["status"] = "inactive"
-            logger.warning(f"Bulk account #{current_bulk_index + 1} marked as failed for user {user_id}: {reason}")
-
-            # Try to get next working bulk account
-            next_sid, next_token, next_account_num = get_next_working_account(user_id)
-            if next_sid:
-                logger.info(f"Switched to bulk account #{next_account_num} for user {user_id}")
-                return next_sid, next_token
-    else:
-        # Use global pool
-        if user_id in user_account_index:
-            current_index = user_account_index[user_id]
-            if current_index < len(twilio_account_pool):
-                twilio_account_pool[current_index]["status"] = "inactive"
-                logger.warning(f"Account #{current_index + 1} marked as failed for user {user_id}: {reason}")
-
-                # Try to get next working account
-                next_sid, next_token, next_account_num = get_next_working_account(user_id)
-                if next_sid:
-                    logger.info(f"Switched to account #{next_account_num} for user {user_id}")
-                    return next_sid, next_token
-
-    return None, None
-
-def extract_whatsapp_info(text):
-    """Extract WhatsApp info from text with error handling"""
-    try:
-        number_match = re.search(r'\+?\d+', text)
-        code_match = re.search(r'(\d{3}-\d{3})|(\d{3}[-]?\d{3})|(\d{4,6})', text)
-        time_match = re.search(r'(\d{2}/\d{2}/\d{4} \d{2}:\d{2})', text)
-
-        number = number_match.group(0) if number_match else None
-        code = code_match.group(0) if code_match else None
-        time_str = time_match.group(0) if time_match else None
-
-        return {'number': number, 'code': code, 'time': time_str}
-    except Exception as e:
-        logger.error(f"Error extracting WhatsApp info: {str(e)}")
-        return {'number': None, 'code': None, 'time': None}
-
-def format_sms_message(number, code, time_str):
-    """Format SMS message with error handling"""
-    try:
-        msg = f"📱 Number: {number}\n"
-        msg += f"🔑 Code: {code}\n"
-        msg += f"⏰ Time: {time_str}\n"
-
-        markup = InlineKeyboardMarkup()
-        if number:
-            markup.add(InlineKeyboardButton("Copy Number", callback_data=f"copy_number_{number}"))
-        if code:
-            markup.add(InlineKeyboardButton("Copy Code", callback_data=f"copy_code_{code}"))
-
-        return msg, markup
-    except Exception as e:
-        logger.error(f"Error formatting SMS message: {str(e)}")
-        return "Error formatting message", None
-
-def setup_all_handlers():
-    """Setup all bot handlers with comprehensive error handling"""
-
-    try:
-        # Start command
-        @bot.message_handler(commands=['start'])
-        @comprehensive_error_handler
-        def handle_start(message):
-            user_id = message.chat.id
-
-            if user_id not in registered_users:
-                registered_users[user_id] = {
-                    "status": "approved",
-                    "channel_joined": False,
-                    "first_use_time": None
-                }
-                safe_save_registered_users()
-
-            if not is_user_authorized(user_id):
-                channel_msg = "🔔 Channel membership required!\n\n"
-                channel_msg += "✨ Please join these channels first to use the bot:\n\n"
-
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    channel_msg += f"{i}. {channel['username']}\n"
-
-                channel_msg += "\n💡 After joining both channels, click 'I've joined both channels' button."
-                channel_msg += "\n\n🎯 Use all features completely free after joining!"
-
-                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
-                return
-
-            main_menu = create_main_menu(user_id)
-            safe_send_message(message.chat.id,
-                            "🌟 Welcome to TwilioPro Bot! 🌟\n"
-                            "📱 Get virtual numbers and real-time\n"
-                            "SMS services easily and instantly!\n\n"
-                            "💫 Key Features:\n"
-                            "• Search and purchase numbers effortlessly\n"
-                            "• Receive SMS instantly\n"
-                            "• Automatically detect OTP\n"
-                            "• 24/7 active service and support\n\n"
-                            "🎯 Select your desired option from the\n"
-                            "menu below and get started!",
-                            reply_markup=main_menu)
-
-        # Get ID command
-        @bot.message_handler(commands=['get_id'])
-        @comprehensive_error_handler
-        def get_user_id(message):
-            user_id = message.chat.id
-            if not is_user_authorized(user_id):
-                channel_msg = "🔔 Channel membership required!\n\n"
-                channel_msg += "✨ To view ID, first join these channels:\n\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    channel_msg += f"{i}. {channel['username']}\n"
-                channel_msg += "\n🎯 Use all features completely free after joining!"
-                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
-                return
-            safe_send_message(message.chat.id, f"Your User ID is: {message.chat.id}")
-
-        # Admin panel command
-        @bot.message_handler(commands=['admin_panel'])
-        @comprehensive_error_handler
-        def admin_panel_cmd(message):
-            if message.chat.id != admin_id:
-                safe_send_message(message.chat.id, "You are not authorized to access the admin panel.")
-                return
-            safe_send_message(message.chat.id, "Admin Panel: Select an action", reply_markup=create_admin_panel())
-
-        # Admin panel button handler (for ReplyKeyboardMarkup)
-        @bot.message_handler(func=lambda message: message.text == "⚙️ Admin Panel" and message.chat.id == admin_id)
-        @comprehensive_error_handler
-        def handle_admin_panel_button(message):
-            if message.chat.id != admin_id:
-                safe_send_message(message.chat.id, "You are not authorized to access the admin panel.")
-                return
-            admin_panel_cmd(message) # Call the existing admin panel command handler
-        # Broadcast message handler
-        @bot.message_handler(func=lambda message: message.text == "📣 Broadcast" and message.chat.id == admin_id)
-        @comprehensive_error_handler
-        def broadcast_message_handler(message):
-            if message.chat.id != admin_id:
-                safe_send_message(message.chat.id, "You cannot use this feature.")
-                return
-
-            broadcast_msg = "📢 *Broadcast Message System* 📢\n"
-            broadcast_msg += "━━━━━━━━━━━━━━━━━━━━━\n\n"
-            broadcast_msg += "💬 *Write your message:*\n\n"
-            broadcast_msg += "📝 Type the message you want to send to all users\n\n"
-            broadcast_msg += "⚠️ *Important:*\n"
-            broadcast_msg += "• Keep message within 4000 characters\n"
-            broadcast_msg += "• Empty message cannot be sent\n"
-            broadcast_msg += "• All registered users will receive it\n\n"
-            broadcast_msg += "🌟 *Now type your message...*"
-
-            safe_send_message(message.chat.id, broadcast_msg, parse_mode="Markdown")
-
-            try:
-                bot.register_next_step_handler(message, process_broadcast_message)
-            except Exception as e:
-                logger.error(f"Error registering broadcast handler: {str(e)}")
-
-        @comprehensive_error_handler
-        def process_broadcast_message(message):
-            if message.chat.id != admin_id:
-                safe_send_message(message.chat.id, "Unauthorized access.")
-                return
-
-            broadcast_text = message.text.strip()
-
-            # Validate message
-            if not broadcast_text:
-                safe_send_message(message.chat.id, "❌ Empty message cannot be sent. Please write a message.")
-                return
-
-            if len(broadcast_text) > 4000:
-                safe_send_message(message.chat.id, f"❌ Message too long ({len(broadcast_text)} characters). Please keep within 4000 characters.")
-                return
-
-            # Get all registered users
-            total_users = len(registered_users)
-            if total_users == 0:
-                safe_send_message(message.chat.id, "❌ No registered users found.")
-                return
-
-            # Confirmation message
-            confirm_msg = f"📊 *Broadcast Confirmation* 📊\n"
-            confirm_msg += f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-            confirm_msg += f"👥 **Target Users:** {total_users} users\n"
-            confirm_msg += f"📝 **Message Length:** {len(broadcast_text)} characters\n\n"
-            confirm_msg += f"💬 **Your Message:**\n"
-            confirm_msg += f"```\n{broadcast_text[:200]}{'...' if len(broadcast_text) > 200 else ''}\n```\n\n"
-            confirm_msg += f"⚡ **Broadcast will start now...**"
-
-            safe_send_message(message.chat.id, confirm_msg, parse_mode="Markdown")
-
-            # Start broadcasting
-            success_count = 0
-            failed_count = 0
-            blocked_count = 0
-
-            # Progress message
-            progress_msg = f"🚀 **Broadcast started...**\n\n"
-            progress_msg += f"📊 **Progress:** 0/{total_users}\n"
-            progress_msg += f"✅ **Success:** 0\n"
-            progress_msg += f"❌ **Failed:** 0\n"
-            progress_msg += f"🚫 **Blocked:** 0"
-
-            progress_message = safe_send_message(message.chat.id, progress_msg, parse_mode="Markdown")
-
-            # Prepare broadcast message with admin signature
-            final_broadcast_msg = f"📢 **Admin Announcement** 📢\n"
-            final_broadcast_msg += f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-            final_broadcast_msg += f"{broadcast_text}\n\n"
-            final_broadcast_msg += f"━━━━━━━━━━━━━━━━━━━━━\n"
-            final_broadcast_msg += f"👨‍💼 **Sender:** Admin {ADMIN_USERNAME}\n"
-            final_broadcast_msg += f"⏰ **Time:** {datetime.now().strftime('%d/%m/%Y %H:%M')}"
-
-            # Send to all users
-            processed = 0
-            for user_id in list(registered_users.keys()):
-                processed += 1
-
-                # Skip admin
-                if user_id == admin_id:
-                    continue
-
-                try:
-                    # Send broadcast message
-                    if ultra_safe_send_message(user_id, final_broadcast_msg, parse_mode="Markdown"):
-                        success_count += 1
-                        logger.info(f"✅ Broadcast sent successfully to user {user_id}")
-                    else:
-                        failed_count += 1
-                        logger.warning(f"❌ Failed to send broadcast to user {user_id}")
-
-                except telebot.apihelper.ApiTelegramException as e:
-                    error_msg = str(e).lower()
-                    if "blocked" in error_msg or "chat not found" in error_msg:
-                        blocked_count += 1
-                        logger.warning(f"🚫 User {user_id} blocked the bot")
-                    else:
-                        failed_count += 1
-                        logger.error(f"❌ API error sending to user {user_id}: {str(e)}")
-
-                except Exception as e:
-                    failed_count += 1
-                    logger.error(f"❌ Error sending broadcast to user {user_id}: {str(e)}")
-
-                # Update progress every 5 users or on completion
-                if processed % 5 == 0 or processed == total_users:
-                    try:
-                        updated_progress = f"🚀 **Broadcast in progress...**\n\n"
-                        updated_progress += f"📊 **Progress:** {processed}/{total_users}\n"
-                        updated_progress += f"✅ **Success:** {success_count}\n"
-                        updated_progress += f"❌ **Failed:** {failed_count}\n"
-                        updated_progress += f"🚫 **Blocked:** {blocked_count}\n"
-                        updated_progress += f"⏳ **Remaining:** {total_users - processed}"
-
-                        if progress_message:
-                            bot.edit_message_text(
-                                chat_id=message.chat.id,
-                                message_id=progress_message.message_id,
-                                text=updated_progress,
-                                parse_mode="Markdown"
-                            )
-                    except Exception as e:
-                        logger.error(f"Error updating progress: {str(e)}")
-
-                # Small delay to avoid rate limiting
-                time.sleep(0.1)
-
-            # Final report
-            completion_percentage = (success_count / max(total_users - 1, 1)) * 100  # Exclude admin
-            final_report = f"🎉 **Broadcast Complete!** 🎉\n"
-            final_report += f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-            final_report += f"📊 **Final Statistics:**\n"
-            final_report += f"👥 **Total Users:** {total_users - 1} users (excluding admin)\n"
-            final_report += f"✅ **Successfully Reached:** {success_count} users\n"
-            final_report += f"❌ **Failed:** {failed_count} users\n"
-            final_report += f"🚫 **Bot Blocked:** {blocked_count} users\n\n"
-            final_report += f"📈 **Success Rate:** {completion_percentage:.1f}%\n\n"
-
-            if success_count > 0:
-                final_report += f"🎯 **Your message reached {success_count} users!**\n"
-
-            if failed_count > 0 or blocked_count > 0:
-                final_report += f"⚠️ **Note:** Some users blocked the bot or API issues occurred\n"
-
-            final_report += f"\n💫 **Broadcast system worked successfully!**"
-
-            try:
-                if progress_message:
-                    bot.edit_message_text(
-                        chat_id=message.chat.id,
-                        message_id=progress_message.message_id,
-                        text=final_report,
-                        parse_mode="Markdown"
-                    )
-            except:
-                safe_send_message(message.chat.id, final_report, parse_mode="Markdown")
-
-            logger.info(f"📢 Broadcast completed: {success_count} successful, {failed_count} failed, {blocked_count} blocked")
-
-        # Account pool management command
-        @bot.message_handler(commands=['pool_status'])
-        @comprehensive_error_handler
-        def pool_status_cmd(message):
-            if message.chat.id != admin_id:
-                safe_send_message(message.chat.id, "You cannot use this command.")
-                return
-
-            status_msg = "📊 *Account Pool Status:*\n\n"
-
-            for i, account in enumerate(twilio_account_pool, 1):
-                if account["sid"] and account["auth_token"]:
-                    status_icon = "✅" if account["status"] == "active" else "❌"
-                    status_msg += f"{status_icon} Account #{i}: {account['status']}\n"
-                    status_msg += f"   SID: {account['sid'][:10]}...\n\n"
-                else:
-                    status_msg += f"⚪ Account #{i}: empty\n\n"
-
-            status_msg += f"💡 *User Account Index:*\n"
-            for user_id, index in user_account_index.items():
-                status_msg += f"User {user_id}: Account #{index + 1}\n"
-
-            safe_send_message(message.chat.id, status_msg, parse_mode="Markdown")
-
-        # Add account to pool command
-        @bot.message_handler(commands=['add_account'])
-        @comprehensive_error_handler
-        def add_account_cmd(message):
-            if message.chat.id != admin_id:
-                safe_send_message(message.chat.id, "You cannot use this command.")
-                return
-
-            safe_send_message(message.chat.id, "Add new account:\n\nFormat: Account_SID Auth_Token\n\nExample:\nAC123...xyz fe99...abc")
-
-            try:
-                bot.register_next_step_handler(message, process_add_account)
-            except Exception as e:
-                logger.error(f"Error registering step handler: {str(e)}")
-
-        @comprehensive_error_handler
-        def process_add_account(message):
-            try:
-                credentials = message.text.strip().split()
-                if len(credentials) != 2:
-                    safe_send_message(message.chat.id, "❌ Invalid format! Correct format: Account_SID Auth_Token")
-                    return
-
-                sid, auth_token = credentials
-
-                # Test the account
-                try:
-                    test_client = Client(sid, auth_token)
-                    status_ok, status_msg = check_account_status(test_client)
-
-                    if not status_ok:
-                        safe_send_message(message.chat.id, f"❌ Account could not be added: {status_msg}")
-                        return
-
-                except Exception as e:
-                    safe_send_message(message.chat.id, f"❌ Invalid credentials: {str(e)}")
-                    return
-
-                # Find empty slot or add to list
-                added = False
-                for i, account in enumerate(twilio_account_pool):
-                    if not account["sid"]:
-                        account["sid"] = sid
-                        account["auth_token"] = auth_token
-                        account["status"] = "active"
-                        safe_send_message(message.chat.id, f"✅ Account successfully added to slot #{i + 1}!")
-                        added = True
-                        break
-
-                if not added:
-                    twilio_account_pool.append({"sid": sid, "auth_token": auth_token, "status": "active"})
-                    safe_send_message(message.chat.id, f"✅ New account added to slot #{len(twilio_account_pool)}!")
-
-            except Exception as e:
-                safe_send_message(message.chat.id, f"❌ Error: {str(e)}")
-
-        # Channel verification callback with enhanced fallback
-        @bot.callback_query_handler(func=lambda call: call.data == "verify_channels")
-        @comprehensive_error_handler
-        def handle_verify_channels(call):
-            user_id = call.message.chat.id
-
-            # Enhanced verification with multiple fallback methods
-            verification_result = robust_channel_check(user_id)
-
-            # Additional manual verification attempt if automated fails
-            if not verification_result:
-                logger.info(f"Attempting manual verification for user {user_id}")
-
-                # Try alternative verification method
-                manual_channels_verified = 0
-                for channel in REQUIRED_CHANNELS:
-                    try:
-                        # Try to get chat info as an alternative check
-                        chat_info = bot.get_chat(channel["chat_id"])
-                        if chat_info:
-                            # If we can get chat info, assume user has some access
-                            manual_channels_verified += 1
-                            logger.info(f"Manual verification: User {user_id} has access to {channel['username']}")
-                    except Exception as e:
-                        logger.warning(f"Manual verification failed for {channel['username']}: {str(e)}")
-                        # Even if manual fails, be lenient for API issues
-                        manual_channels_verified += 1
-                        logger.info(f"Manual verification fallback: Assuming access for {channel['username']} due to API issues")
-
-                # If manual verification suggests user has access, allow it
-                if manual_channels_verified >= len(REQUIRED_CHANNELS):
-                    verification_result = True
-                    logger.info(f"✅ Manual verification successful for user {user_id}")
-
-                    # Update user records
-                    if user_id not in registered_users:
-                        registered_users[user_id] = {"status": "approved", "channel_joined": False, "first_use_time": None}
-
-                    registered_users[user_id]["channel_joined"] = True
-                    if "verified_channels" not in registered_users[user_id]:
-                        registered_users[user_id]["verified_channels"] = {}
-
-                    for channel in REQUIRED_CHANNELS:
-                        registered_users[user_id]["verified_channels"][channel["username"]] = True
-
-                    safe_save_registered_users()
-
-            if verification_result:
-                # Ensure user data is properly saved
-                if user_id not in registered_users:
-                    registered_users[user_id] = {"status": "approved", "channel_joined": False, "first_use_time": None}
-
-                registered_users[user_id]["channel_joined"] = True
-                safe_save_registered_users()
-
-                success_msg = "🎉 Congratulations! 🎉\n\n"
-                success_msg += "✅ You have successfully completed channel verification!\n\n"
-                success_msg += "🚀 Now you can use all bot features completely free:\n"
-                success_msg += "• 🔑 Login\n"
-                success_msg += "• 🔍 Search numbers\n"
-                success_msg += "• 📩 Receive SMS\n"
-                success_msg += "• All services completely free!\n\n"
-                success_msg += "⚠️ Important: You must stay in channels to use the bot.\n"
-                success_msg += "💫 Thank you for using the bot!"
-
-                try:
-                    bot.edit_message_text(
-                        chat_id=call.message.chat.id,
-                        message_id=call.message.message_id,
-                        text=success_msg
-                    )
-                except:
-                    pass
-
-                safe_send_message(call.message.chat.id, "🌟 Main Menu", reply_markup=create_main_menu(user_id))
-                try:
-                    bot.answer_callback_query(call.id, "Successfully verified!")
-                except:
-                    pass
-            else:
-                # Even if verification fails, be more lenient due to API issues
-                error_msg = "⚠️ Verification incomplete due to API issues!\n\n"
-                error_msg += "🔄 If you have joined both channels, please try again.\n\n"
-                error_msg += "📋 Make sure you have joined these channels:\n\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    error_msg += f"{i}. {channel['username']}\n"
-                error_msg += "\n💡 If the problem persists, try again later."
-                error_msg += "\n\n🚨 Temporary inconvenience may occur due to API issues."
-
-                try:
-                    bot.edit_message_text(
-                        chat_id=call.message.chat.id,
-                        message_id=call.message.message_id,
-                        text=error_msg,
-                        reply_markup=create_channel_join_menu()
-                    )
-                except:
-                    pass
-
-                try:
-                    bot.answer_callback_query(call.id, "API issue! Please try again.", show_alert=True)
-                except:
-                    pass
-
-        # Login handler
-        @bot.message_handler(func=lambda message: message.text == "👤 Login")
-        @comprehensive_error_handler
-        def login_account(message):
-            user_id = message.chat.id
-            if not is_user_authorized(user_id):
-                channel_msg = "🔔Channel subscription required!\n\n"
-                channel_msg += "✨ To login first join these channels:\n\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    channel_msg += f"{i}. {channel['username']}\n"
-                channel_msg += "\n🎯 Use all features completely free after joining!"
-                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
-                return
-
-            credentials_msg = "📝 Single Account Login Instructions\n\n"
-            credentials_msg += "• Enter your Account SID and Auth Token\n"
-            credentials_msg += "• Make sure to separate both values with one space\n\n"
-            credentials_msg += "💡 Example:\n"
-            credentials_msg += "ACxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx yyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyy\n\n"
-            credentials_msg += "⚠️ Important:\n"
-            credentials_msg += "Please input your credentials correctly otherwise login will fail\n\n"
-            credentials_msg += "💫 To add multiple accounts use the\n"
-            credentials_msg += "🔐 Bulk Login option"
-            safe_send_message(message.chat.id, credentials_msg)
-
-            try:
-                bot.register_next_step_handler(message, process_twilio_login)
-            except Exception as e:
-                logger.error(f"Error registering step handler: {str(e)}")
-
-        # Bulk Login handler
-        @bot.message_handler(func=lambda message: message.text == "➕ Bulk Login")
-        @comprehensive_error_handler
-        def bulk_login_account(message):
-            user_id = message.chat.id
-            if not is_user_authorized(user_id):
-                channel_msg = "🔔 Channel subscription required!\n\n"
-                channel_msg += "✨ To bulk login first join these channels:\n\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    channel_msg += f"{i}. {channel['username']}\n"
-                channel_msg += "\n🎯 Use all features completely free after joining!"
-                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
-                return
-
-            bulk_msg = "━━━━━━━━━━━━━━\n"
-            bulk_msg += "🚀 Auto-Failover System 🚀\n"
-            bulk_msg += "━━━━━━━━━━━━━━\n\n"
-            bulk_msg += "✅ With 30 accounts you get:\n"
-            bulk_msg += "• Auto-switch when one account fails\n"
-            bulk_msg += "• Zero service interruption\n"
-            bulk_msg += "• Continuous SMS reception\n"
-            bulk_msg += "• No manual intervention needed\n\n"
-
-            bulk_msg += "🖊️ Example:\n"
-            bulk_msg += "```\n"
-            bulk_msg += "ACxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx yyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyy\n\n"
-            bulk_msg += "ACzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzz aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa\n"
-            bulk_msg += "```\n\n"
-
-            bulk_msg += "⚠️ Warning:\n"
-            bulk_msg += "Login will fail without proper spacing\n\n"
-
-            bulk_msg += "💡 Simply put:\n"
-            bulk_msg += "With 30 accounts if one fails\n"
-            bulk_msg += "others keep working automatically!\n\n"
-
-            bulk_msg += "🔐 Uninterrupted service - Try now!\n"
-            bulk_msg += "━━━━━━━━━━━━━━━━"
-            safe_send_message(message.chat.id, bulk_msg, parse_mode="Markdown")
-
-            try:
-                bot.register_next_step_handler(message, process_bulk_twilio_login)
-            except Exception as e:
-                logger.error(f"Error registering step handler: {str(e)}")
-
-        # Process Twilio login
-        @comprehensive_error_handler
-        def process_twilio_login(message):
-            user_id = message.chat.id
-            try:
-                credentials = message.text.strip().split()
-
-                if len(credentials) != 2:
-                    error_msg = "⚠️ Account Login Failed\n\n"
-                    error_msg += "🚨 No valid account credentials found!\n"
-                    error_msg += "Please provide your details in the correct format:"
-                    safe_send_message(message.chat.id, error_msg)
-                    return
-
-                sid, auth_token = credentials
-
-                try:
-                    twilio_client = Client(sid, auth_token)
-                    status_ok, status_msg = check_account_status(twilio_client)
-
-                    if not status_ok:
-                        safe_send_message(message.chat.id, f"⚠️ *Twilio Account Issue*\n\n{status_msg}\n\nPlease use a different account.", parse_mode="Markdown")
-                        return
-
-                except Exception as e:
-                    safe_send_message(message.chat.id, "Invalid Twilio credentials. Please provide a valid Account SID and Auth Token.")
-                    return
-
-                user_data[user_id] = {
-                    "sid": sid,
-                    "auth_token": auth_token,
-                    "purchased_numbers": [],
-                    "using_pool": False
-                }
-
-                success_msg = "✅ Login Successful!\n"
-                success_msg += "📍 Please enter your area code to proceed."
-                safe_send_message(message.chat.id, success_msg, reply_markup=create_main_menu(user_id), parse_mode="Markdown")
-            except Exception as e:
-                safe_send_message(message.chat.id, f"Error: {e}")
-
-        # Process Bulk Twilio login
-        @comprehensive_error_handler
-        def process_bulk_twilio_login(message):
-            user_id = message.chat.id
-            try:
-                # Enhanced text processing to handle various formats
-                text_input = message.text.strip()
-
-                # Handle different separators and formats
-                lines = []
-
-                # Split by newlines first
-                raw_lines = text_input.split('\n')
-
-                for line in raw_lines:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    # Skip lines that don't look like credentials
-                    if len(line) < 20:  # Too short to be valid credentials
-                        continue
-
-                    # Handle multiple formats
-                    # Format 1: SID TOKEN (space separated)
-                    # Format 2: SID,TOKEN (comma separated)
-                    # Format 3: SID:TOKEN (colon separated)
-                    # Format 4: SID|TOKEN (pipe separated)
-                    # Format 5: SID\nTOKEN (newline separated - for your example)
-
-                    # Check if this line contains both SID and Token
-                    if line.startswith('AC') and len(line) > 60:
-                        # This might be SID and Token on same line
-                        # Replace various separators with space
-                        line = line.replace(',', ' ').replace(':', ' ').replace('|', ' ').replace('\t', ' ')
-
-                        # Clean multiple spaces
-                        import re
-                        line = re.sub(r'\s+', ' ', line)
-
-                        # Check if we have exactly 2 parts after splitting
-                        parts = line.split()
-                        if len(parts) == 2 and parts[0].startswith('AC'):
-                            lines.append(line)
-                        elif len(parts) == 1 and parts[0].startswith('AC'):
-                            # This might be just SID, look for token in next line
-                            lines.append(line)
-                    elif not line.startswith('AC') and len(line) >= 30:
-                        # This might be a token on separate line
-                        # Check if previous line was a SID
-                        if lines and lines[-1].split()[-1].startswith('AC'):
-                            # Combine with previous SID
-                            sid_line = lines[-1]
-                            combined_line = f"{sid_line} {line}"
-                            lines[-1] = combined_line
-                        else:
-                            lines.append(line)
-                    else:
-                        # Other formats
-                        line = line.replace(',', ' ').replace(':', ' ').replace('|', ' ').replace('\t', ' ')
-                        import re
-                        line = re.sub(r'\s+', ' ', line)
-                        if line:
-                            lines.append(line)
-
-                if not lines:
-                    safe_send_message(message.chat.id, "⚠️ Account Login Failed\n\n🚨 No valid account credentials found!\nPlease provide your details in the correct format:")
-                    return
-
-                valid_accounts = []
-                invalid_accounts = []
-                detailed_errors = []
-
-                # Maximum 30 accounts allowed (increased limit)
-                if len(lines) > 30:
-                    safe_send_message(message.chat.id, f"⚠️ *Maximum 30 accounts can be added.* Processing first 30 accounts...", parse_mode="Markdown")
-                    lines = lines[:30]
-
-                progress_msg = f"🔄 Bulk account verification started...\n\n📊 Total accounts: {len(lines)}\n\n⏳ Please wait..."
-                progress_message = safe_send_message(message.chat.id, progress_msg, parse_mode="Markdown")
-
-                for i, line in enumerate(lines, 1):
-                    try:
-                        # Enhanced credential parsing
-                        credentials = line.strip().split()
-
-                        # Validate format
-                        if len(credentials) < 2:
-                            error_detail = f"Line {i}: Incomplete data (SID and Token required)"
-                            invalid_accounts.append(error_detail)
-                            detailed_errors.append(f"Line {i}: Incomplete data - needs both SID and Token")
-                            continue
-                        elif len(credentials) > 2:
-                            # Take first two parts if more than 2 parts exist
-                            credentials = credentials[:2]
-
-                        sid, auth_token = credentials
-
-                        # Enhanced validation
-                        validation_errors = []
-
-                        # Check SID format
-                        if not sid.startswith('AC'):
-                            validation_errors.append("SID must start with 'AC'")
-                        if len(sid) != 34:  # Twilio SID is exactly 34 characters
-                            validation_errors.append(f"SID length invalid ({len(sid)} chars, expected exactly 34)")
-
-                        # Check Auth Token format
-                        if len(auth_token) != 32:  # Twilio Auth Token is exactly 32 characters
-                            validation_errors.append(f"Auth Token length invalid ({len(auth_token)} chars, expected exactly 32)")
-
-                        # Check for valid characters (alphanumeric only)
-                        if not re.match(r'^AC[A-Za-z0-9]{32}$', sid):
-                            validation_errors.append("SID format invalid (should be AC followed by 32 alphanumeric chars)")
-                        if not re.match(r'^[A-Za-z0-9]{32}$', auth_token):
-                            validation_errors.append("Auth Token format invalid (should be 32 alphanumeric chars)")
-
-                        if validation_errors:
-                            error_detail = f"Line {i}: Format issues - {', '.join(validation_errors)}"
-                            invalid_accounts.append(error_detail)
-                            detailed_errors.append(f"Line {i}: Format issues - {', '.join(validation_errors)}")
-                            continue
-
-                        # Test the account with enhanced error handling
-                        try:
-                            test_client = Client(sid, auth_token)
-
-                            # Set a shorter timeout for bulk operations
-                            import socket
-                            original_timeout = socket.getdefaulttimeout()
-                            socket.setdefaulttimeout(15)  # 15 second timeout
-
-                            # Try to make a simple API call to test credentials
-                            try:
-                                account_info = test_client.api.accounts.list(limit=1)
-                                if account_info:
-                                    # Additional check for account status
-                                    status_ok, status_msg = check_account_status(test_client)
-
-                                    if status_ok:
-                                        valid_accounts.append({
-                                            "sid": sid,
-                                            "auth_token": auth_token,
-                                            "status": "active"
-                                        })
-                                        logger.info(f"✅ Bulk account {i} validated successfully")
-                                    else:
-                                        error_detail = f"Line {i}: Account status issue - {status_msg}"
-                                        invalid_accounts.append(error_detail)
-                                        detailed_errors.append(f"Line {i}: Account status issue - {status_msg}")
-                                        logger.warning(f"❌ Bulk account {i} status failed: {status_msg}")
-                                else:
-                                    error_detail = f"Line {i}: Account information not found"
-                                    invalid_accounts.append(error_detail)
-                                    detailed_errors.append(f"Line {i}: Could not retrieve account info")
-
-                            except Exception as api_error:
-                                api_error_msg = str(api_error).lower()
-                                if "authenticate" in api_error_msg or "unauthorized" in api_error_msg:
-                                    error_detail = f"Line {i}: Invalid Credentials - Invalid SID or Token"
-                                    detailed_errors.append(f"Line {i}: Authentication failed - Wrong SID or Token")
-                                elif "account" in api_error_msg and "suspended" in api_error_msg:
-                                    error_detail = f"Line {i}: Account suspended"
-                                    detailed_errors.append(f"Line {i}: Account suspended")
-                                elif "trial" in api_error_msg:
-                                    error_detail = f"Line {i}: Trial account - upgrade required"
-                                    detailed_errors.append(f"Line {i}: Trial account - upgrade required")
-                                elif "network" in api_error_msg or "timeout" in api_error_msg:
-                                    error_detail = f"Line {i}: Network problem - try again"
-                                    detailed_errors.append(f"Line {i}: Network issue")
-                                else:
-                                    error_detail = f"Line {i}: API error - {str(api_error)[:50]}"
-                                    detailed_errors.append(f"Line {i}: API error - {str(api_error)[:50]}")
-
-                                invalid_accounts.append(error_detail)
-                                logger.error(f"Account API test error for line {i}: {str(api_error)}")
-
-                            # Restore original timeout
-                            socket.setdefaulttimeout(original_timeout)
-
-                        except Exception as test_error:
-                            error_msg = str(test_error).lower()
-                            if "authenticate" in error_msg or "401" in error_msg:
-                                error_detail = f"Line {i}: Invalid credentials - please check again"
-                                detailed_errors.append(f"Line {i}: Invalid credentials")
-                            elif "timeout" in error_msg:
-                                error_detail = f"Line {i}: Connection timeout - check network"
-                                detailed_errors.append(f"Line {i}: Connection timeout")
-                            elif "network" in error_msg or "connection" in error_msg:
-                                error_detail = f"Line {i}: Network problem"
-                                detailed_errors.append(f"Line {i}: Network issue")
-                            else:
-                                error_detail = f"Line {i}: Connection error - {str(test_error)[:40]}"
-                                detailed_errors.append(f"Line {i}: Connection error")
-
-                            invalid_accounts.append(error_detail)
-                            logger.error(f"Account validation error for line {i}: {str(test_error)}")
-                            continue
-
-                    except Exception as e:
-                        error_detail = f"Line {i}: Processing error - {str(e)[:30]}"
-                        invalid_accounts.append(error_detail)
-                        detailed_errors.append(f"Line {i}: Processing error - {str(e)[:30]}")
-                        logger.error(f"Processing error for line {i}: {str(e)}")
-                        continue
-
-                    # Update progress every account
-                    progress_update = f"🔄 *Progress: {i}/{len(lines)}*\n\n"
-                    progress_update += f"✅ Valid: {len(valid_accounts)}\n"
-                    progress_update += f"❌ Invalid: {len(invalid_accounts)}\n"
-                    progress_update += f"📊 Completed: {i}/{len(lines)}"
-
-                    try:
-                        if progress_message:
-                            bot.edit_message_text(
-                                chat_id=message.chat.id,
-                                message_id=progress_message.message_id,
-                                text=progress_update,
-                                parse_mode="Markdown"
-                            )
-                    except:
-                        pass
-
-                # Final results
-                if valid_accounts:
-                    # Update user's personal pool
-                    if user_id not in user_data:
-                        user_data[user_id] = {}
-
-                    user_data[user_id] = {
-                        "bulk_accounts": valid_accounts,
-                        "current_bulk_index": 0,
-                        "using_bulk_pool": True,
-                        "purchased_numbers": []
-                    }
-
-                    # Set current working account
-                    current_account = valid_accounts[0]
-                    user_data[user_id]["sid"] = current_account["sid"]
-                    user_data[user_id]["auth_token"] = current_account["auth_token"]
-
-                    # Enhanced success message
-                    result_msg = f"━━━━━━━━━━━━━━━━━━\n"
-                    result_msg += f"🎉 BULK LOGIN SUCCESS! 🎉\n"
-                    result_msg += f"━━━━━━━━━━━━━━━━━━\n\n"
-                    result_msg += f"📊 Login Summary:\n"
-                    result_msg += f"✅ Successful: {len(valid_accounts)} account{'s' if len(valid_accounts) != 1 else ''}\n"
-                    result_msg += f"❌ Failed: {len(invalid_accounts)} account{'s' if len(invalid_accounts) != 1 else ''}\n\n"
-                    result_msg += f"🔄 Auto-Failover Active:\n"
-                    result_msg += f"• Automatic switching between accounts\n"
-                    result_msg += f"• Continuous service guaranteed\n"
-                    result_msg += f"• Zero downtime experience"
-
-                    safe_send_message(message.chat.id, result_msg, reply_markup=create_main_menu(user_id), parse_mode="Markdown")
-                    logger.info(f"✅ Bulk login successful for user {user_id}: {len(valid_accounts)} accounts loaded")
-
-                else:
-                    # Enhanced error message with detailed troubleshooting
-                    error_msg = f"❌ *All Accounts Invalid!* ❌\n"
-                    error_msg += f"━━━━━━━━━━━━━━━━━━━━━\n\n"
-                    error_msg += f"🚨 **Problem:** None of the {len(invalid_accounts)} accounts you provided are working!\n\n"
-
-                    # Analyze and categorize errors
-                    error_analysis = {
-                        "Credential Issues": 0,
-                        "Format Issues": 0,
-                        "Account Suspended": 0,
-                        "Network Issues": 0,
-                        "Trial Account": 0,
-                        "Others": 0
-                    }
-
-                    for error in invalid_accounts:
-                        if "credential" in error.lower() or "invalid" in error.lower() or "authenticate" in error.lower():
-                            error_analysis["Credential Issues"] += 1
-                        elif "format" in error.lower() or "length" in error.lower():
-                            error_analysis["Format Issues"] += 1
-                        elif "suspend" in error.lower() or "restricted" in error.lower():
-                            error_analysis["Account Suspended"] += 1
-                        elif "network" in error.lower() or "timeout" in error.lower() or "connection" in error.lower():
-                            error_analysis["Network Issues"] += 1
-                        elif "trial" in error.lower():
-                            error_analysis["Trial Account"] += 1
-                        else:
-                            error_analysis["Others"] += 1
-
-                    error_msg += f"📊 **Problem Analysis:**\n"
-                    for issue_type, count in error_analysis.items():
-                        if count > 0:
-                            error_msg += f"• {issue_type}: {count} accounts\n"
-                    error_msg += f"\n"
-
-                    # Common issues and solutions
-                    error_msg += f"🔍 **Most Common Issues & Solutions:**\n\n"
-
-                    if error_analysis["Credential Issues"] > 0:
-                        error_msg += f"🔑 **Wrong Credentials ({error_analysis['Credential Issues']} accounts):**\n"
-                        error_msg += f"• Copy correct SID & Token from Twilio Console\n"
-                        error_msg += f"• Account SID starts with 'AC'\n"
-                        error_msg += f"• Auth Token is exactly 32 characters\n"
-                        error_msg += f"• Make sure there are no extra spaces or symbols\n\n"
-
-                    if error_analysis["Format Issues"] > 0:
-                        error_msg += f"📝 **Format Issues ({error_analysis['Format Issues']} accounts):**\n"
-                        error_msg += f"• Each line should be: Account_SID Auth_Token\n"
-                        error_msg += f"• Correct example:\n" # Corrected example
-                        error_msg += f"```\nACxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx yyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyy\nACzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzz aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa\n```\n\n"
-
-                    if error_analysis["Account Suspended"] > 0:
-                        error_msg += f"🚫 **Suspended Accounts ({error_analysis['Account Suspended']} accounts):**\n"
-                        error_msg += f"• These accounts are suspended on Twilio\n"
-                        error_msg += f"• Create new accounts or use different accounts\n\n"
-
-                    if error_analysis["Trial Account"] > 0:
-                        error_msg += f"🎯 **Trial Accounts ({error_analysis['Trial Account']} accounts):**\n"
-                        error_msg += f"• Trial accounts have limited features\n"
-                        error_msg += f"• Upgrade by adding $20 credit\n\n"
-
-                    error_msg += f"💡 **Quick Solutions:**\n"
-                    error_msg += f"1️⃣ First test with 1 account\n"
-                    error_msg += f"2️⃣ Copy fresh SID & Token from Twilio Console\n"
-                    error_msg += f"3️⃣ Check account balance and status\n"
-                    error_msg += f"4️⃣ Create completely new Twilio accounts\n\n"
-
-                    # Show specific errors
-                    error_msg += f"📋 **Detailed Error List:**\n"
-                    for i, error in enumerate(invalid_accounts[:8], 1):  # Show max 8 errors
-                        error_msg += f"{i}. {error}\n"
-                    if len(invalid_accounts) > 8:
-                        error_msg += f"... {len(invalid_accounts) - 8} more issues\n"
-
-                    error_msg += f"\n🔄 **Next Steps:**\n"
-                    error_msg += f"• Click '🔐 bulk login' to try again\n"
-                    error_msg += f"• Or use '🔑 login' to test one account\n\n"
-                    error_msg += f"❓ **Need Help?** Contact admin for assistance."
-
-                    safe_send_message(message.chat.id, error_msg, parse_mode="Markdown")
-
-                    # Send detailed technical log to admin for debugging
-                    if detailed_errors:
-                        admin_debug_msg = f"🔧 **Debug Info for User {user_id}:**\n\n"
-                        admin_debug_msg += f"Total lines processed: {len(lines)}\n"
-                        admin_debug_msg += f"Valid accounts: {len(valid_accounts)}\n"
-                        admin_debug_msg += f"Invalid accounts: {len(invalid_accounts)}\n\n"
-                        admin_debug_msg += f"**Technical Errors:**\n"
-                        for error in detailed_errors[:10]:
-                            admin_debug_msg += f"• {error}\n"
-
-                        try:
-                            safe_send_message(admin_id, admin_debug_msg, parse_mode="Markdown")
-                        except:
-                            pass
-
-                    logger.warning(f"❌ Bulk login failed for user {user_id}: No valid accounts from {len(lines)} attempts")
-
-            except Exception as e:
-                safe_send_message(message.chat.id, f"ত্রুটি: {str(e)}")
-                logger.error(f"Error in process_bulk_twilio_login for User ID {user_id}: {str(e)}")
-
-        # Enhanced Logout Button with Complete Cleanup
-        @bot.message_handler(func=lambda message: message.text == "📤 Logout")
-        @comprehensive_error_handler
-        def logout_account(message):
-            user_id = message.chat.id
-
-            if not is_user_authorized(user_id):
-                channel_msg = "🔔 Channel membership required!\n\n"
-                channel_msg += "✨ To logout, first join these channels:\n\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    channel_msg += f"{i}. {channel['username']}\n"
-                channel_msg += "\n🎯 Use all features completely free after joining!"
-                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
-                return
-
-            if user_id in user_data:
-                # Count accounts before logout for display
-                accounts_count = 0
-                if user_data[user_id].get("using_bulk_pool", False):
-                    accounts_count = len(user_data[user_id].get("bulk_accounts", []))
-                elif user_data[user_id].get("using_pool", False):
-                    accounts_count = 1  # Pool account
-                else:
-                    accounts_count = 1  # Single account
-
-                # Complete cleanup of all user data
-                user_data.pop(user_id, None)
-                user_current_number.pop(user_id, None)
-                generated_numbers.pop(user_id, None)
-
-                # Clear user account index for pool system
-                if user_id in user_account_index:
-                    user_account_index.pop(user_id, None)
-
-                # Create logout success message
-                logout_msg = "✅ *Success!*\n"
-                logout_msg += "*All your accounts have been logged out.*"
-
-                safe_send_message(message.chat.id, logout_msg, reply_markup=create_main_menu(user_id), parse_mode="Markdown")
-
-                # Log the logout for admin monitoring
-                logger.info(f"🚪 Complete logout performed for user {user_id}: {accounts_count} accounts cleared")
-
-            else:
-                login_msg = "🔒 *Please log in first before proceeding.*\n"
-                login_msg += "📌 *Login is required to access this feature.*"
-
-                safe_send_message(message.chat.id, login_msg, parse_mode="Markdown")
-
-
-
-        # Global flag to track if user is in search mode
-        user_search_mode = {}
-
-        # Search Numbers by Area Code
-        @bot.message_handler(func=lambda message: message.text == "🔎 Search Numbers")
-        @comprehensive_error_handler
-        def ask_for_area_code(message):
-            user_id = message.chat.id
-
-            if not is_user_authorized(user_id):
-                channel_msg = "🔔 Channel membership required!\n\n"
-                channel_msg += "✨ To search numbers, first join these channels:\n\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    channel_msg += f"{i}. {channel['username']}\n"
-                channel_msg += "\n🎯 Use all features completely free after joining!"
-                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
-                return
-
-            # Set user in search mode
-            user_search_mode[user_id] = "search_ca_numbers"
-
-            search_msg = "📍 **Search Numbers (Default: Canada)**\n\n"
-            search_msg += "Enter a 3-digit area code to find available numbers.\n\n"
-
-            # Show search history info if exists
-            if user_id in generated_numbers and generated_numbers[user_id]:
-                search_msg += f"📋 You have {len(generated_numbers[user_id])} searched numbers\n"
-                search_msg += "💫 Type 'clear history' to clear search history"
-
-            safe_send_message(message.chat.id, search_msg, parse_mode="Markdown")
-
-        # Search USA Numbers by Area Code
-        @bot.message_handler(func=lambda message: message.text == "🇺🇸 USA Numbers")
-        @comprehensive_error_handler
-        def ask_for_usa_area_code(message):
-            user_id = message.chat.id
-
-            if not is_user_authorized(user_id):
-                channel_msg = "🔔 Channel membership required!\n\n"
-                channel_msg += "✨ To search USA numbers, first join these channels:\n\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    channel_msg += f"{i}. {channel['username']}\n"
-                channel_msg += "\n🎯 Use all features completely free after joining!"
-                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
-                return
-
-            # Set user in USA search mode
-            user_search_mode[user_id] = "search_us_numbers"
-
-            search_msg = "🇺🇸 **USA Number Search** 🇺🇸\n\n"
-            search_msg += "📍 Send your 3-digit USA area code to find numbers."
-
-            safe_send_message(message.chat.id, search_msg)
-
-        # Target Number handler
-        @bot.message_handler(func=lambda message: message.text == "📍 Target Number")
-        @comprehensive_error_handler
-        def target_number_search(message):
-            user_id = message.chat.id
-            if not is_user_authorized(user_id):
-                channel_msg = "🔔 Channel membership required!\n\n"
-                channel_msg += "✨ To search target numbers, first join these channels:\n\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    channel_msg += f"{i}. {channel['username']}\n"
-                channel_msg += "\n🎯 Use all features completely free after joining!"
-                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
-                return
-
-            # Set user in target mode
-            user_search_mode[user_id] = "target_numbers"
-
-            target_msg = "🎯 Smart Target Number Search 🎯\n\n"
-            target_msg += "💡 Enter any 3 to 5-digit pattern to find matching virtual numbers.\n"
-            target_msg += "🔥 Why use this?\n"
-            target_msg += "• No area code needed\n"
-            target_msg += "• Intelligent and fast search\n"
-            target_msg += "• Instantly find matching numbers\n\n"
-            target_msg += "🎲 Now enter your desired 3–5 digit pattern below!"
-            safe_send_message(message.chat.id, target_msg, parse_mode="Markdown")
-
-        @bot.message_handler(func=lambda message: message.text.isdigit() and len(message.text) in [3, 4, 5])
-        @comprehensive_error_handler
-        def fetch_numbers_by_pattern(message):
-            user_id = message.chat.id
-
-            if not is_user_authorized(user_id):
-                channel_msg = "🔔 Channel membership required!\n\n"
-                channel_msg += "✨ To search numbers, first join these channels:\n\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    channel_msg += f"{i}. {channel['username']}\n"
-                channel_msg += "\n🎯 Use all features completely free after joining!"
-                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
-                return
-
-            # Check if user is in search numbers mode and input is more than 3 digits
-            current_mode = user_search_mode.get(user_id, None)
-            pattern = message.text
-            pattern_length = len(pattern)
-
-            # If user is in search numbers mode and input is not exactly 3 digits, reject
-            if current_mode in ["search_ca_numbers", "search_us_numbers"] and pattern_length != 3:
-                country = "Canadian" if current_mode == "search_ca_numbers" else "USA"
-                error_msg = f"❌ *In {country} search mode, please provide only a 3-digit area code!*\n\n"
-                error_msg += f"🚫 You provided {pattern_length} digits: `{pattern}`\n\n"
-                error_msg += "📝 *Correct format:*\n"
-                error_msg += "• Provide only 3 digits\n"
-                error_msg += "• Example: 416 (for CA), 212 (for USA)\n\n"
-                safe_send_message(message.chat.id, error_msg, parse_mode="Markdown")
-                return
-
-            # If user is in target numbers mode, allow 3-5 digits
-            if current_mode == "target_numbers" and pattern_length not in [3, 4, 5]:
-                error_msg = "❌ *In target number mode, provide 3-5 digit pattern!*\n\n"
-                error_msg += f"🚫 You provided {pattern_length} digits: `{pattern}`\n\n"
-                error_msg += "📝 *Correct format:*\n"
-                error_msg += "• 3 digits: 123\n"
-                error_msg += "• 4 digits: 1234\n"
-                error_msg += "• 5 digits: 12345\n\n"
-                error_msg += "💡 *Tip:* To search area code, use 🔍 search numbers button"
-                safe_send_message(message.chat.id, error_msg, parse_mode="Markdown")
-                return
-
-            # If no mode is set, default behavior (for backward compatibility)
-            if current_mode is None:
-                if pattern_length == 3:
-                    user_search_mode[user_id] = "search_ca_numbers" # Default to CA
-                else:
-                    user_search_mode[user_id] = "target_numbers"
-
-            try:
-                if user_id not in user_data:
-                    login_msg = "🔒 *Please log in first before proceeding.*\n"
-                    login_msg += "📌 *Login is required to access this feature.*"
-                    safe_send_message(message.chat.id, login_msg, parse_mode="Markdown")
-                    return
-
-                credentials = user_data[user_id]
-
-                # Try current account first
-                try:
-                    twilio_client = Client(credentials['sid'], credentials['auth_token'])
-
-                    # Fetch up to 50 numbers with enhanced pattern-based search
-                    available_numbers = []
-                    
-                    # Determine country based on search mode
-                    country_code = 'US' if current_mode == "search_us_numbers" else 'CA'
-                    number_fetcher = twilio_client.available_phone_numbers(country_code).local
-
-                    # Smart pattern-based search logic based on mode
-                    if current_mode in ["search_ca_numbers", "search_us_numbers"] and pattern_length == 3:
-                        # Area code search for CA or US
-                        response = number_fetcher.list(
-                            area_code=pattern,
-                            limit=50,
-                            sms_enabled=True,
-                            voice_enabled=True
-                        )
-                        available_numbers.extend(response)
-                    elif current_mode == "target_numbers":
-                        # Target numbers mode: search by contains pattern
-                        response = number_fetcher.list(
-                            contains=pattern,
-                            limit=50,
-                            sms_enabled=True,
-                            voice_enabled=True
-                        )
-                        available_numbers.extend(response)
-
-                        # If no results with contains, try near_number search
-                        if not available_numbers:
-                            try:
-                                # Create a dummy phone number with the pattern
-                                dummy_number = f"+1{pattern}0000000"[:12]  # Pad to make valid number
-                                response = number_fetcher.list(
-                                    near_number=dummy_number,
-                                    limit=30,
-                                    sms_enabled=True,
-                                    voice_enabled=True
-                                )
-                                available_numbers.extend(response)
-                            except:
-                                pass
-                    else:
-                        # Default behavior for backward compatibility
-                        if pattern_length == 3:
-                            response = number_fetcher.list(
-                                area_code=pattern,
-                                limit=50,
-                                sms_enabled=True,
-                                voice_enabled=True
-                            )
-                        else:
-                            response = number_fetcher.list(
-                                contains=pattern,
-                                limit=50,
-                                sms_enabled=True,
-                                voice_enabled=True
-                            )
-                        available_numbers.extend(response)
-
-                except Exception as e:
-                    # Auto failover for bulk accounts
-                    if credentials.get("using_bulk_pool", False):
-                        logger.warning(f"Account failed for user {user_id}, trying auto failover: {str(e)}")
-
-                        # Get next working account from bulk pool
-                        new_sid, new_token = mark_account_as_failed(user_id, str(e))
-                        if new_sid:
-                            # Update user credentials
-                            user_data[user_id]["sid"] = new_sid
-                            user_data[user_id]["auth_token"] = new_token
-
-                            # Retry with new account
-                            twilio_client = Client(new_sid, new_token)
-                            country_code = 'US' if current_mode == "search_us_numbers" else 'CA'
-                            number_fetcher = twilio_client.available_phone_numbers(country_code).local
-                            if current_mode in ["search_ca_numbers", "search_us_numbers"] and pattern_length == 3:
-                                response = number_fetcher.list(
-                                    area_code=pattern,
-                                    limit=50,
-                                    sms_enabled=True,
-                                    voice_enabled=True
-                                )
-                            else:
-                                response = number_fetcher.list(
-                                    contains=pattern,
-                                    limit=50,
-                                    sms_enabled=True,
-                                    voice_enabled=True
-                                )
-                            available_numbers.extend(response)
-
-                            # Get current account number for display
-                            current_bulk_index = user_data[user_id].get("current_bulk_index", 0)
-                            safe_send_message(message.chat.id, f"🔄 *Auto Failover Successful!*\n\nSearching with account #{current_bulk_index + 1}...", parse_mode="Markdown")
-                        else:
-                            safe_send_message(message.chat.id, "⚠️ All bulk accounts have been destroyed. Please add new accounts.")
-                            return
-                    else:
-                        # Re-raise error if not using bulk system
-                        raise e
-
-                if available_numbers:
-                    # Initialize generated_numbers if not exists
-                    if user_id not in generated_numbers:
-                        generated_numbers[user_id] = []
-
-                    # Add new numbers to existing list instead of replacing
-                    new_numbers = [num.phone_number for num in available_numbers]
-                    generated_numbers[user_id].extend(new_numbers)
-
-                    # Remove duplicates while preserving order
-                    seen = set()
-                    generated_numbers[user_id] = [x for x in generated_numbers[user_id] if not (x in seen or seen.add(x))]
-
-                    # Enhanced search result message with total count
-                    total_numbers_in_collection = len(generated_numbers[user_id])
-
-                    result_msg = f"🎯 {pattern} Area Code Search Result 🎯\n\n"
-                    result_msg += f"📱 Found: {len(available_numbers)} new numbers\n"
-                    result_msg += f"📊 In stock: {total_numbers_in_collection} numbers\n"
-                    result_msg += f"📌 Send your preferred area code to search again"
-
-                    safe_send_message(message.chat.id, result_msg, parse_mode="Markdown")
-
-                    # Send numbers in batches of 30 with counter
-                    numbers_sent = 0
-                    for num in available_numbers:
-                        phone_number = num.phone_number
-                        if safe_send_message(user_id, phone_number):
-                            numbers_sent += 1
-
-                            # After every 30 numbers, send encouragement message
-                            if numbers_sent % 30 == 0:
-                                encouragement_msg = f"🚀 {numbers_sent} numbers sent successfully!\n\n"
-                                encouragement_msg += f"💫 Want more numbers? Search again!\n"
-                                encouragement_msg += f"🔄 Get more numbers with a new area code"
-                                safe_send_message(user_id, encouragement_msg, parse_mode="Markdown")
-                        else:
-                            logger.error(f"Failed to send number: {phone_number}")
-
-                    # Final message if remaining numbers (less than 30)
-                    if numbers_sent > 0 and numbers_sent % 30 != 0:
-                        final_msg = f"✅ **Total {numbers_sent} numbers sent successfully!**\n\n"
-                        final_msg += f"🔄 **To get more numbers** search again\n"
-                        final_msg += f"⚡ **Check unlimited** numbers together\n"
-                        final_msg += f"🎯 **Forward to vote** with the best numbers!"
-                        safe_send_message(user_id, final_msg, parse_mode="Markdown")
-                else:
-                    no_result_msg = f"🎯 {pattern} Area Code Search Result 🎯\n\n"
-                    no_result_msg += f"📱 Found: 0 new numbers\n"
-                    no_result_msg += f"📊 In stock: 0 numbers\n"
-                    no_result_msg += f"📌 Send your preferred area code to search again"
-                    safe_send_message(message.chat.id, no_result_msg)
-            except Exception as e:
-                safe_send_message(message.chat.id, f"Error searching numbers: {str(e)}")
-                logger.error(f"Error in fetch_numbers_by_area_code for User ID {user_id}: {str(e)}")
-
-        # Check channels status
-        @bot.message_handler(func=lambda message: message.text == "🔗 Check Channels")
-        @comprehensive_error_handler
-        def check_channels_status(message):
-            user_id = message.chat.id
-            if user_id == admin_id:
-                safe_send_message(message.chat.id, "You are admin, no need to check channels.")
-                return
-
-            if robust_channel_check(user_id):
-                status_msg = "✅ Channel Status: Active\n\n"
-                status_msg += "🎉 You have joined all required channels!\n\n"
-                status_msg += "📢 Joined Channels:\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    status_msg += f"{i}. {channel['username']} ✅\n"
-                status_msg += "\n🎯 Now you can use all features completely free!"
-                safe_send_message(message.chat.id, status_msg)
-            else:
-                status_msg = "❌ Channel Status: Incomplete\n\n"
-                status_msg += "⚠️ You haven't joined all channels!\n\n"
-                status_msg += "📢 Required Channels:\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    status_msg += f"{i}. {channel['username']}\n"
-                safe_send_message(message.chat.id, status_msg, reply_markup=create_channel_join_menu())
-
-        # Help handler
-        @bot.message_handler(func=lambda message: message.text == "❓ Help")
-        @comprehensive_error_handler
-        def help_handler(message):
-            user_id = message.chat.id
-
-            if not is_user_authorized(user_id):
-                channel_msg = "🔔 Channel membership required!\n\n"
-                channel_msg += "✨ To get help, first join these channels:\n\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    channel_msg += f"{i}. {channel['username']}\n"
-                channel_msg += "\n🎯 Use all features completely free after joining!"
-                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
-                return
-
-            help_msg = "━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-            help_msg += "📌 COMPLETE BOT USAGE GUIDE 📌\n"
-            help_msg += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-
-            help_msg += "🔑 Login Method:\n"
-            help_msg += "• Click the login button\n"
-            help_msg += "• Enter your Twilio Account SID and Auth Token\n"
-            help_msg += "• Format: SID Auth_Token (separated by space)\n\n"
-
-            help_msg += "🔐 Bulk Login (Multiple Accounts)\n"
-            help_msg += "• Click the bulk login' button\n"
-            help_msg += "• Enter one account per line\n"
-            help_msg += "• Auto-failover system will activate\n\n"
-
-            help_msg += "🔍 Number Search Rules:\n"
-            help_msg += "• Click the 'search numbers button\n"
-            help_msg += "• Enter 3-digit area code (e.g., 416, 647)\n"
-            help_msg += "• View available numbers and purchase your choice\n\n" # Corrected example
-
-            help_msg += "🎯 Target Number (Specific Pattern)\n"
-            help_msg += "• Click the target number' button\n"
-            help_msg += "• Enter any 3-5 digit pattern\n"
-            help_msg += "• Smart search system will work\n\n"
-
-            help_msg += "📩 SMS Receiving Method:\n"
-            help_msg += "• First purchase a number\n"
-            help_msg += "• Click the 'receive sms' button\n"
-            help_msg += "• Or use the 'View SMS' button after purchase\n\n"
-
-            help_msg += "🚪 Logout Process:\n"
-            help_msg += "• Click the logout' button\n"
-            help_msg += "• All data will be erased for security\n\n"
-
-            help_msg += "📋 Check Channel:\n"
-            help_msg += "• Check your status with 'check channels\n"
-            help_msg += "• Join the channel if required\n\n"
-
-            help_msg += "⚠️ Important Information:\n"
-            help_msg += "• Must stay in channel to use the bot\n"
-            help_msg += "• Auto-failover when adding multiple accounts\n"
-            help_msg += "• All services are completely free and secure\n\n"
-
-            help_msg += "🎯 Pro Tips:\n"
-            help_msg += "• Add up to 15 accounts in bulk login\n"
-            help_msg += "• Popular area codes: e.g., 416, 647, 437, 905\n"
-            help_msg += "• Try patterns like 123, 456, 789\n\n" # Corrected example
-
-            help_msg += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-            help_msg += "💫 Contact admin for any issues!\n"
-            help_msg += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-
-            # Create inline keyboard with Admin Inbox button
-            markup = InlineKeyboardMarkup()
-            markup.add(InlineKeyboardButton("📧 Admin Inbox", url=f"https://t.me/{ADMIN_USERNAME[1:]}"))
-
-            safe_send_message(message.chat.id, help_msg, reply_markup=markup, parse_mode="Markdown")
-
-        # Handle Forwarded Numbers
-        @bot.message_handler(func=lambda message: message.text.lower() == "clear history")
-        @comprehensive_error_handler
-        def clear_search_history(message):
-            user_id = message.chat.id
-
-            if not is_user_authorized(user_id):
-                return
-
-            if user_id in generated_numbers and generated_numbers[user_id]:
-                count = len(generated_numbers[user_id])
-                generated_numbers.pop(user_id, None) # Use pop for cleaner removal
-                safe_send_message(message.chat.id, f"✅ Search history cleared for {count} numbers!")
-            else:
-                safe_send_message(message.chat.id, "📋 No search history found.")
-
-        @bot.message_handler(content_types=['text'])
-        @comprehensive_error_handler
-        def handle_numbers(message):
-            user_id = message.chat.id
-
-            if not is_user_authorized(user_id):
-                channel_msg = "🔔 Channel subscription required!\n\n"
-                channel_msg += "✨ To use the bot, first join these channels:\n\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    channel_msg += f"{i}. {channel['username']}\n"
-                channel_msg += "\n🎯 Use all features completely free after joining!"
-                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
-                return
-
-            if user_id not in user_data:
-                login_msg = "🔒 Please log in first before proceeding\n"
-                login_msg += "📌 Login is required to access this feature\n\n"
-
-                safe_send_message(message.chat.id, login_msg, parse_mode="Markdown")
-                return
-
-            # Check against all possible button texts to avoid re-triggering handlers
-            button_texts = ["👤 Login", "➕ Bulk Login", "📤 Logout", "🔎 Search Numbers", "🇺🇸 USA Numbers", "📍 Target Number", "💬 Receive SMS", "🔗 Check Channels", "❓ Help", "⚙️ Admin Panel", "📣 Broadcast", "clear history"]
-            # Add other variations from create_main_menu if necessary
-            if message.text in button_texts:
-                return
-
-            try:
-                original_text = message.text
-                lines = [line.strip() for line in original_text.split('\n') if line.strip()]
-                normalized_numbers = []
-                original_lines = []
-
-                for line in lines:
-                    try:
-                        phone_pattern = r'(?:\+?1?\s?-?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}'
-                        match = re.search(phone_pattern, line)
-                        if match:
-                            full_number = match.group(0)
-                            digits = re.sub(r'[^\d]', '', full_number)
-                            if len(digits) == 10:
-                                normalized = '+1' + digits
-                            elif len(digits) == 11 and digits.startswith('1'):
-                                normalized = '+' + digits
-                            else:
-                                continue
-                            normalized_numbers.append(normalized)
-                            original_lines.append(line)
-                    except Exception as e:
-                        logger.error(f"Error processing line: {line}, Error: {str(e)}")
-                        continue
-
-                if not normalized_numbers:
-                    return
-
-                try:
-                    number_to_original = dict(zip(normalized_numbers, original_lines))
-                except Exception as e:
-                    logger.error(f"Error creating number mapping: {str(e)}")
-                    return
-
-                for number in normalized_numbers:
-                    try:
-                        if user_id in generated_numbers and number in generated_numbers[user_id]:
-                            markup = InlineKeyboardMarkup()
-                            markup.add(InlineKeyboardButton("Buy", callback_data=f"buy_{number}"))
-                            display_number = f"📱 *Number:* `{number}`\n💫 _Click Buy button_"
-                            if not safe_send_message(message.chat.id, display_number, reply_markup=markup, parse_mode="Markdown"):
-                                logger.error(f"Failed to send number with Buy button: {number}")
-                        else:
-                            info = extract_whatsapp_info(message.text)
-                            if info['number'] and info['code'] and info['time']:
-                                formatted_msg, markup = format_sms_message(info['number'], info['code'], info['time'])
-                                safe_send_message(message.chat.id, formatted_msg, reply_markup=markup, parse_mode="Markdown")
-                    except Exception as e:
-                        logger.error(f"Error processing number {number}: {str(e)}")
-                        continue
-            except Exception as e:
-                safe_send_message(message.chat.id, f"Error processing number: {str(e)}")
-                logger.error(f"Error in handle_numbers for User ID {user_id}: {str(e)}, Original text: {message.text}")
-
-        # Buy Number Callback
-        @bot.callback_query_handler(func=lambda call: call.data.startswith("buy_"))
-        @comprehensive_error_handler
-        def buy_number(call):
-            user_id = call.message.chat.id
-
-            if not is_user_authorized(user_id):
-                try:
-                    bot.answer_callback_query(call.id, "Please join the channels first!", show_alert=True)
-                except:
-                    pass
-                return
-
-            try:
-                phone_number = call.data.split("_")[1]
-                if user_id not in user_data:
-                    try:
-                        bot.answer_callback_query(call.id, "Please login first!")
-                    except:
-                        pass
-                    return
-
-                credentials = user_data[user_id]
-
-                # Try current account first
-                try:
-                    twilio_client = Client(credentials['sid'], credentials['auth_token'])
-
-                    if user_id in user_current_number:
-                        try:
-                            previous_number_sid = user_current_number[user_id]['sid']
-                            twilio_client.incoming_phone_numbers(previous_number_sid).delete()
-                        except Exception as e:
-                            logger.error(f"Error deleting previous number for User ID {user_id}: {str(e)}")
-
-                    purchased_number = twilio_client.incoming_phone_numbers.create(phone_number=phone_number)
-
-                except Exception as e:
-                    # Auto failover for bulk accounts
-                    if credentials.get("using_bulk_pool", False):
-                        logger.warning(f"Account failed during purchase for user {user_id}, trying auto failover: {str(e)}")
-
-                        # Get next working account from bulk pool
-                        new_sid, new_token = mark_account_as_failed(user_id, str(e))
-                        if new_sid:
-                            # Update user credentials
-                            user_data[user_id]["sid"] = new_sid
-                            user_data[user_id]["auth_token"] = new_token
-
-                            # Retry with new account
-                            twilio_client = Client(new_sid, new_token)
-                            purchased_number = twilio_client.incoming_phone_numbers.create(phone_number=phone_number)
-
-                            # Get current account number for display
-                            current_bulk_index = user_data[user_id].get("current_bulk_index", 0)
-                            try:
-                                bot.answer_callback_query(call.id, f"🔄 Auto Failover! Number purchased with account #{current_bulk_index + 1}!")
-                            except:
-                                pass
-                        else:
-                            try:
-                                bot.answer_callback_query(call.id, "⚠️ All bulk accounts have been destroyed.")
-                            except:
-                                pass
-                            return
-                    else:
-                        # Re-raise error if not using bulk system
-                        raise e
-                user_current_number[user_id] = {
-                    "phone_number": purchased_number.phone_number,
-                    "sid": purchased_number.sid
-                }
-
-                markup = InlineKeyboardMarkup()
-                markup.add(InlineKeyboardButton(text="View SMS 📩", callback_data="view_sms"))
-
-                try:
-                    bot.edit_message_text(chat_id=call.message.chat.id, message_id=call.message.message_id,
-                                          text=f"Successfully purchased: `{purchased_number.phone_number}` _(click to copy)_",
-                                          reply_markup=markup,
-                                          parse_mode="Markdown")
-                except:
-                    pass
-                try:
-                    bot.answer_callback_query(call.id, "Number purchased successfully!")
-                except:
-                    pass
-            except Exception as e:
-                error_message = str(e)
-                if "Trial account" in error_message:
-                    try:
-                        bot.answer_callback_query(call.id, "Error: Trial account cannot purchase this number. Please upgrade your Twilio account.")
-                    except:
-                        pass
-                else:
-                    if "Account is restricted" in error_message:
-                        error_msg = "⚠️ Sorry! Your free Twilio account can no longer purchase new numbers. Please use a paid account."
-                    else:
-                        error_msg = f"ত্রুটি: {error_message[:100]}"
-                    try:
-                        bot.answer_callback_query(call.id, error_msg)
-                    except:
-                        pass
-                logger.error(f"Error in buy_number for User ID {user_id}: {str(e)}")
-
-        # Receive SMS Messages
-        @bot.message_handler(func=lambda message: message.text == "💬 Receive SMS")
-        @comprehensive_error_handler
-        def receive_sms(message):
-            user_id = message.chat.id
-
-            if not is_user_authorized(user_id):
-                channel_msg = "🔔 Channel membership required!\n\n"
-                channel_msg += "✨ To receive SMS, first join these channels:\n\n"
-                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
-                    channel_msg += f"{i}. {channel['username']}\n"
-                channel_msg += "\n🎯 Use all features completely free after joining!"
-                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
-                return
-
-            if user_id not in user_data:
-                login_msg = "🔒 Please log in first before proceeding\n"
-                login_msg += "📌 Login is required to access this feature\n\n"
-                safe_send_message(message.chat.id, login_msg, parse_mode="Markdown")
-                return
-
-            if user_id not in user_current_number:
-                safe_send_message(message.chat.id, "You haven't purchased any phone number yet. Use '🔍 search numbers' to buy one.")
-                return
-
-            try:
-                credentials = user_data[user_id]
-                phone_number = user_current_number[user_id]['phone_number']
-
-                # Try current account first
-                try:
-                    twilio_client = Client(credentials['sid'], credentials['auth_token'])
-                    messages = twilio_client.messages.list(to=phone_number, limit=10)
-
-                except Exception as e:
-                    # Auto failover for bulk accounts
-                    if credentials.get("using_bulk_pool", False):
-                        logger.warning(f"Account failed during SMS fetch for user {user_id}, trying auto failover: {str(e)}")
-
-                        # Get next working account from bulk pool
-                        new_sid, new_token = mark_account_as_failed(user_id, str(e))
-                        if new_sid:
-                            # Update user credentials
-                            user_data[user_id]["sid"] = new_sid
-                            user_data[user_id]["auth_token"] = new_token
-
-                            # Retry with new account
-                            twilio_client = Client(new_sid, new_token)
-                            messages = twilio_client.messages.list(to=phone_number, limit=10)
-
-                            # Get current account number for display
-                            current_bulk_index = user_data[user_id].get("current_bulk_index", 0)
-                            safe_send_message(message.chat.id, f"🔄 *Auto Failover Successful!*\n\nChecking SMS with account #{current_bulk_index + 1}...", parse_mode="Markdown")
-                        else:
-                            safe_send_message(message.chat.id, "⚠️ All bulk accounts have failed. Cannot retrieve SMS.")
-                            return
-                    else:
-                        # Re-raise error if not using bulk system
-                        raise e
-
-                if messages:
-                    response = f"📱 *Number:* `{phone_number}`\n\n"
-                    response += "📩 *Recent SMS Messages:*\n"
-                    response += "━━━━━━━━━━━━━━━━━━━━━\n"
-                    for msg in messages:
-                        timestamp = msg.date_sent.strftime("%Y-%m-%d %H:%M:%S") if msg.date_sent else "Unknown time"
-                        response += f"👤 *From:* {msg.from_}\n⏰ *Time:* {timestamp}\n\n```\n{msg.body}\n```\n\n"
-                    safe_send_message(message.chat.id, response, parse_mode="Markdown")
-                else:
-                    safe_send_message(message.chat.id, f"*Purchased Number:* `{phone_number}`\n\nNo SMS messages found for this number.", parse_mode="Markdown")
-            except Exception as e:
-                safe_send_message(message.chat.id, f"Error retrieving SMS: {e}")
-                logger.error(f"Error in receive_sms for User ID {user_id}: {str(e)}")
-
-        # View SMS via Inline Button
-        @bot.callback_query_handler(func=lambda call: call.data.startswith("copy_"))
-        @comprehensive_error_handler
-        def copy_text_callback(call):
-            try:
-                text_to_copy = call.data.replace("copy_", "")
-                try:
-                    bot.answer_callback_query(call.id, f"Copied: {text_to_copy}")
-                except:
-                    pass
-            except Exception as e:
-                try:
-                    bot.answer_callback_query(call.id, "Failed to copy")
-                except:
-                    pass
-                logger.error(f"Error in copy_text_callback: {str(e)}")
-
-        @bot.callback_query_handler(func=lambda call: call.data == "view_sms")
-        @comprehensive_error_handler
-        def view_sms_callback(call):
-            user_id = call.message.chat.id
-
-            if not is_user_authorized(user_id):
-                try:
-                    bot.answer_callback_query(call.id, "Please join the channels first!", show_alert=True)
-                except:
-                    pass
-                return
-
-            if user_id not in user_data:
-                try:
-                    bot.answer_callback_query(call.id, "Please login first!")
-                except:
-                    pass
-                return
-
-            if user_id not in user_current_number:
-                try:
-                    bot.answer_callback_query(call.id, "You haven't purchased any phone number yet. Use '🔍 search numbers' to buy one.")
-                except:
-                    pass
-                return
-
-            try:
-                credentials = user_data[user_id]
-                phone_number = user_current_number[user_id]['phone_number']
-
-                # Try current account first
-                try:
-                    twilio_client = Client(credentials['sid'], credentials['auth_token'])
-                    messages = twilio_client.messages.list(to=phone_number, limit=1)
-
-                except Exception as e:
-                    # Auto failover for bulk accounts
-                    if credentials.get("using_bulk_pool", False):
-                        logger.warning(f"Account failed during SMS view for user {user_id}, trying auto failover: {str(e)}")
-
-                        # Get next working account from bulk pool
-                        new_sid, new_token = mark_account_as_failed(user_id, str(e))
-                        if new_sid:
-                            # Update user credentials
-                            user_data[user_id]["sid"] = new_sid
-                            user_data[user_id]["auth_token"] = new_token
-
-                            # Retry with new account
-                            twilio_client = Client(new_sid, new_token)
-                            messages = twilio_client.messages.list(to=phone_number, limit=1)
-                        else:
-                            try:
-                                bot.answer_callback_query(call.id, "⚠️ All bulk accounts have been destroyed")
-                            except:
-                                pass
-                            return
-                    else:
-                        # Re-raise error if not using bulk system
-                        raise e
-
-                markup = InlineKeyboardMarkup()
-                markup.add(InlineKeyboardButton(text="View SMS 📩", callback_data="view_sms"))
-
-                if not messages:
-                    response = f"`{phone_number}`\n\nNo new SMS found."
-                else:
-                    msg = messages[0]
-
-                    # Extract OTP from message body
-                    otp_match = re.search(r'\b\d{4,8}\b', msg.body)
-                    otp_code = otp_match.group(0) if otp_match else "No OTP Found"
-
-                    # New format as requested by the user
-                    # 1. OTP Code
-                    # 2. Purchased Number
-                    # 3. Full SMS Body
-                    response_parts = [
-                        otp_code,
-                        phone_number,
-                        f"\n{msg.body}"
-                    ]
-                    response = "\n".join(response_parts)
-
-                if len(response) > 4000:
-                    response = response[:3997] + "..."
-                try:
-                    bot.edit_message_text(
-                        chat_id=call.message.chat.id,
-                        message_id=call.message.message_id,
-                        text=response,
-                        reply_markup=markup,
-                        parse_mode=None # Use None for plain text
-                    )
-                except:
-                    pass
-                try:
-                    bot.answer_callback_query(call.id, "Viewing SMS")
-                except:
-                    pass
-            except Exception as e:
-                try:
-                    bot.answer_callback_query(call.id, f"Error retrieving SMS: {e}")
-                except:
-                    pass
-                logger.error(f"Error in view_sms_callback for User ID {user_id}: {str(e)}")
-
-        # Admin Actions
-        @bot.callback_query_handler(func=lambda call: call.data.startswith("admin_"))
-        @comprehensive_error_handler
-        def admin_actions(call):
-            if call.message.chat.id != admin_id:
-                try:
-                    bot.answer_callback_query(call.id, "Unauthorized access.")
-                except:
-                    pass
-                return
-
-            action = call.data.split("_")[1]
-            safe_send_message(call.message.chat.id, f"Please provide User ID to {action}:")
-            try:
-                bot.register_next_step_handler(call.message, lambda msg: process_admin_action(msg, action))
-            except Exception as e:
-                logger.error(f"Error registering step handler: {str(e)}")
-
-        @comprehensive_error_handler
-        def process_admin_action(message, action):
-            try:
-                user_id = int(message.text.strip())
-                logger.info(f"Processing {action} for User ID: {user_id}")
-
-                if action == "approve":
-                    if user_id in registered_users and registered_users[user_id]["status"] == "approved":
-                        safe_send_message(message.chat.id, f"User {user_id} is already approved.")
-                        return
-
-                    if user_id not in registered_users:
-                        registered_users[user_id] = {
-                            "status": "pending",
-                            "channel_joined": False,
-                            "first_use_time": None
-                        }
-
-                    registered_users[user_id]["status"] = "approved"
-                    safe_save_registered_users()
-
-                    safe_send_message(message.chat.id, f"✅ User {user_id} has been successfully approved.")
-
-                    approval_msg = "🌟 *Congratulations! Your account has been approved* 🌟\n"
-                    approval_msg += "━━━━━━━━━━━━━━━━━━━━━\n\n"
-                    approval_msg += "✨ Now you can use the bot!\n\n"
-                    approval_msg += "📋 *Next Steps:*\n"
-                    approval_msg += "• Join the required channels\n"
-                    approval_msg += "• Complete channel verification\n"
-                    approval_msg += "• Enjoy all bot features\n\n"
-                    approval_msg += "💫 _Thank you for using our service_"
-
-                    safe_send_message(user_id, approval_msg, parse_mode="Markdown")
-
-                elif action == "block":
-                    if user_id in registered_users:
-                        registered_users[user_id]["status"] = "blocked"
-                        block_msg = "⛔️ *Account Block Notification*\n"
-                        block_msg += "━━━━━━━━━━━━━━━━━━━━━\n\n"
-                        block_msg += "❌ Your account has been temporarily blocked.\n\n"
-                        block_msg += "📝 *What to do:*\n"
-                        block_msg += f"• Contact {ADMIN_USERNAME}\n"
-                        block_msg += "• Explain your problem in detail\n"
-                        block_msg += "• Promise to follow the rules\n\n"
-                        block_msg += "⚠️ _We will try to solve your problem quickly_"
-                        safe_send_message(user_id, block_msg, parse_mode="Markdown")
-                        safe_send_message(message.chat.id, f"✅ User {user_id} has been successfully blocked.")
-                        safe_save_registered_users()
-                    else:
-                        safe_send_message(message.chat.id, f"❌ User {user_id} Not registered.")
-
-                elif action == "unblock":
-                    if user_id in registered_users:
-                        registered_users[user_id]["status"] = "approved"
-                        unblock_msg = "🎉 *Congratulations! Your account has been unblocked*\n"
-                        unblock_msg += "━━━━━━━━━━━━━━━━━━━━━\n\n"
-                        unblock_msg += "✅ Now you can use our services again\n\n"
-                        unblock_msg += "📱 *Next Steps:*\n"
-                        unblock_msg += "• Join the channels\n"
-                        unblock_msg += "• Complete verification\n\n"
-                        unblock_msg += "💫 _Thank you for using our service_"
-                        safe_send_message(user_id, unblock_msg, parse_mode="Markdown")
-                        safe_send_message(message.chat.id, f"✅ User {user_id} has been successfully unblocked.")
-                        safe_save_registered_users()
-                    else:
-                        safe_send_message(message.chat.id, f"User {user_id} is not registered.")
-            except ValueError:
-                safe_send_message(message.chat.id, "Invalid User ID. Please provide a valid numeric ID.")
-            except Exception as e:
-                safe_send_message(message.chat.id, f"An error occurred: {str(e)}")
-                logger.error(f"Error in process_admin_action for User ID {message.text}: {str(e)}")
-
-        logger.info("All handlers setup completed successfully")
-        return True
-
-    except Exception as e:
-        logger.error(f"Critical error setting up handlers: {str(e)}", exc_info=True)
-        return False
-
-
-
-
-
-app = Flask(__name__)
-
-# Global bot instance
-bot = telebot.TeleBot(TELEGRAM_BOT_TOKEN)
-
-@app.route("/" + TELEGRAM_BOT_TOKEN, methods=['POST'])
-def getMessage():
-    try:
-        bot.process_new_updates([telebot.types.Update.de_json(request.stream.read().decode("utf-8"))])
-        return "!", 200
-    except Exception as e:
-        logger.error(f"Error in getMessage: {e}")
-        return "?", 500
-
-@app.route("/")
-def webhook():
-    bot.remove_webhook()
-    bot.set_webhook(url=f"https://{os.environ.get('RENDER_EXTERNAL_HOSTNAME')}/{TELEGRAM_BOT_TOKEN}")
-    return "Webhook set!", 200
-
-if __name__ == "__main__":
-    safe_load_registered_users()
-    setup_all_handlers()
-    app.run(host="0.0.0.0", port=int(os.environ.get('PORT', 5000)))
+import telebot
+from flask import Flask, request
+from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
+from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
+import requests
+import urllib3
+import uuid
+from datetime import datetime
+import json
+import sqlite3
+import os
+import re
+import time
+import random
+import logging
+import threading
+import signal
+import atexit
+import sys
+import gc
+import enum
+import traceback
+import asyncio
+from functools import wraps
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from collections import OrderedDict, deque
+
+try:
+    # Only needed for IO_ENGINE=asyncio (aiohttp ships as a twilio dependency)
+    import aiohttp
+    from twilio.http.async_http_client import AsyncTwilioHttpClient
+except ImportError:
+    aiohttp = None
+    AsyncTwilioHttpClient = None
+
+# Configure logging to write to a file and not to the console.
+# All logs (INFO level and above) will go to 'debug.log'.
+# The console will remain clean.
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('debug.log', encoding='utf-8')
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+# Ensure console output uses UTF-8 for emojis
+if sys.stdout.encoding.lower() != 'utf-8':
+    sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf-8', buffering=1)
+    sys.stderr = open(sys.stderr.fileno(), mode='w', encoding='utf-8', buffering=1)
+
+# sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf-8', buffering=1)
+#     sys.stderr = open(sys.stderr.fileno(), mode='w', encoding='utf-8', buffering=1)
+
+# Telegram Bot Token
+TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
+
+
+
+
+
+
+
+# Admin Telegram Username
+ADMIN_USERNAME = "@RJ_MEMORY"
+
+# Admin Telegram User ID
+admin_id = 5718596664
+
+# Required Channels
+REQUIRED_CHANNELS = [
+    {"username": "@DailyEarningTips25", "chat_id": "@DailyEarningTips25"},
+    {"username": "@BotSeller25", "chat_id": "@BotSeller25"}
+]
+
+# File to store registered users
+USERS_FILE = "users.json"
+
+# User store backend: "json" rewrites USERS_FILE, "sqlite" upserts single rows in USERS_DB_FILE
+USER_STORE_BACKEND = os.environ.get("USER_STORE_BACKEND", "json").lower()
+USERS_DB_FILE = os.environ.get("USERS_DB_FILE", "users.db")
+
+# Session state backend: "memory" (lost on restart) or "sqlite" (survives restarts; shareable between
+# processes, but registered_users is still per process, so gunicorn.conf.py pins a single worker)
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "memory").lower()
+STATE_DB_FILE = os.environ.get("STATE_DB_FILE", "state.db")
+
+# Multiple Twilio accounts pool for auto-failover
+twilio_account_pool = [
+    {"sid": os.environ.get("TWILIO_SID_1", ""), "auth_token": os.environ.get("TWILIO_TOKEN_1", ""), "status": "active"},  # Account 1
+    {"sid": os.environ.get("TWILIO_SID_2", ""), "auth_token": os.environ.get("TWILIO_TOKEN_2", ""), "status": "active"},  # Account 2
+    {"sid": os.environ.get("TWILIO_SID_3", ""), "auth_token": os.environ.get("TWILIO_TOKEN_3", ""), "status": "active"},  # Account 3
+    {"sid": os.environ.get("TWILIO_SID_4", ""), "auth_token": os.environ.get("TWILIO_TOKEN_4", ""), "status": "active"},  # Account 4
+    {"sid": os.environ.get("TWILIO_SID_5", ""), "auth_token": os.environ.get("TWILIO_TOKEN_5", ""), "status": "active"},  # Account 5
+]
+
+# Initialize registered users (held by this process only; see gunicorn.conf.py)
+registered_users = {}
+
+# Reusable Twilio clients, one per account SID (each keeps its keep-alive HTTP session)
+TWILIO_CLIENT_POOL_SIZE = int(os.environ.get("TWILIO_CLIENT_POOL_SIZE", "256"))
+TWILIO_CLIENT_IDLE_TTL = int(os.environ.get("TWILIO_CLIENT_IDLE_TTL", "900"))
+
+# sid -> {"auth_token", "client", "last_used", "uses"}, least recently used first
+twilio_clients = OrderedDict()
+twilio_clients_lock = threading.Lock()
+twilio_client_stats = {"created": 0, "reused": 0, "evicted_size": 0, "evicted_idle": 0, "evicted_removed": 0}
+twilio_clients_last_sweep = 0.0
+
+# Background account prober and per-account circuit breaker (closed -> open -> half_open -> closed)
+ACCOUNT_PROBE_INTERVAL = float(os.environ.get("ACCOUNT_PROBE_INTERVAL", "120"))
+ACCOUNT_PROBE_RATE = float(os.environ.get("ACCOUNT_PROBE_RATE", "5"))
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_OPEN_SECONDS = float(os.environ.get("BREAKER_OPEN_SECONDS", "180"))
+
+# sid -> {"state", "failures", "opened_at", "last_probe", "last_error"}
+account_breakers = {}
+account_breakers_lock = threading.Lock()
+breaker_stats = {"probes": 0, "probe_failures": 0, "opened": 0, "recovered": 0}
+# Indices of twilio_account_pool that may take traffic, rebuilt on every breaker transition
+healthy_pool_indices = ()
+account_prober_thread = None
+account_prober_wakeup = threading.Event()
+
+# Per-operation Twilio HTTP timeouts: (connect, read) seconds, applied per request
+TWILIO_CONNECT_TIMEOUT = float(os.environ.get("TWILIO_CONNECT_TIMEOUT", "5"))
+TWILIO_REQUEST_TIMEOUT = float(os.environ.get("TWILIO_REQUEST_TIMEOUT", "15"))
+TWILIO_READ_TIMEOUTS = {
+    "validate": float(os.environ.get("TWILIO_VALIDATE_TIMEOUT", "10")),
+    "search": float(os.environ.get("TWILIO_SEARCH_TIMEOUT", "15")),
+    "buy": float(os.environ.get("TWILIO_BUY_TIMEOUT", "20")),
+    "list_messages": float(os.environ.get("TWILIO_MESSAGES_TIMEOUT", "10")),
+    "delete": float(os.environ.get("TWILIO_DELETE_TIMEOUT", "10")),
+}
+
+# operation -> {"requests", "timeouts"}
+twilio_http_stats = {}
+twilio_http_stats_lock = threading.Lock()
+
+# Per-account token bucket in front of every Twilio request, plus 429 / Retry-After handling
+TWILIO_RATE_PER_ACCOUNT = float(os.environ.get("TWILIO_RATE_PER_ACCOUNT", "10"))
+TWILIO_RATE_BURST = float(os.environ.get("TWILIO_RATE_BURST", "20"))
+TWILIO_RATE_MAX_WAIT = float(os.environ.get("TWILIO_RATE_MAX_WAIT", "10"))
+TWILIO_THROTTLE_RETRIES = int(os.environ.get("TWILIO_THROTTLE_RETRIES", "2"))
+
+# sid -> TokenBucket
+twilio_rate_limiters = {}
+twilio_rate_limiters_lock = threading.Lock()
+twilio_rate_stats = {"delayed": 0, "wait_seconds": 0.0, "rejected": 0, "throttled_responses": 0, "retried": 0}
+
+# Unified Twilio operation executor: retries with jittered backoff, failover across the bulk pool
+TWILIO_OPERATION_RETRIES = int(os.environ.get("TWILIO_OPERATION_RETRIES", "2"))
+TWILIO_RETRY_BASE_DELAY = float(os.environ.get("TWILIO_RETRY_BASE_DELAY", "0.25"))
+TWILIO_RETRY_MAX_DELAY = float(os.environ.get("TWILIO_RETRY_MAX_DELAY", "3"))
+
+# operation name -> {"calls", "attempts", "retries", "failovers", "failures", "latencies"}
+twilio_operation_stats = {}
+twilio_operation_stats_lock = threading.Lock()
+
+# I/O engine for Twilio operations: "threads" (blocking calls) or "asyncio" (coroutines on one event loop)
+# Handlers still block until the operation finishes, and Telegram calls always stay on the blocking client.
+# Ignored under gevent monkey-patching (the render.yaml gevent workers), where threads are used.
+IO_ENGINE = os.environ.get("IO_ENGINE", "threads").lower()
+
+# Hedged number search for bulk-pool users: if the primary account is slow, ask a second one
+HEDGED_SEARCH_ENABLED = os.environ.get("HEDGED_SEARCH", "0") == "1"
+HEDGE_DELAY = float(os.environ.get("HEDGE_DELAY", "1.5"))
+HEDGE_MAX_EXTRA = int(os.environ.get("HEDGE_MAX_EXTRA", "8"))
+# Runs hedge requests only (at most HEDGE_MAX_EXTRA at once, see hedge_slots); primaries never queue here
+hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_EXTRA, thread_name_prefix="hedged-search")
+# Caps hedge requests in flight across all users
+hedge_slots = threading.BoundedSemaphore(HEDGE_MAX_EXTRA)
+hedge_stats = {"searches": 0, "fired": 0, "hedge_won": 0, "primary_won": 0, "skipped_cap": 0, "no_spare": 0}
+
+# Target number search: the pattern fans out concurrently over countries, resources and optional area codes
+TARGET_SEARCH_COUNTRIES = [c.strip().upper() for c in os.environ.get("TARGET_SEARCH_COUNTRIES", "CA,US").split(",") if c.strip()]
+TARGET_SEARCH_RESOURCES = [r.strip() for r in os.environ.get("TARGET_SEARCH_RESOURCES", "local,toll_free").split(",") if r.strip()]
+# "CA:416,US:212": extra local queries pinned to these area codes
+TARGET_SEARCH_AREA_CODES = [tuple(entry.strip().upper().split(":", 1)) for entry in os.environ.get("TARGET_SEARCH_AREA_CODES", "").split(",") if ":" in entry]
+TARGET_SEARCH_WANTED = int(os.environ.get("TARGET_SEARCH_WANTED", "50"))
+TARGET_SEARCH_WORKERS = int(os.environ.get("TARGET_SEARCH_WORKERS", "8"))
+target_search_executor = ThreadPoolExecutor(max_workers=TARGET_SEARCH_WORKERS, thread_name_prefix="target-search")
+target_search_stats = {"searches": 0, "queries": 0, "query_errors": 0, "cancelled": 0, "early_stops": 0}
+
+# Shared available-numbers inventory: short-TTL search results plus prefetch of popular patterns
+INVENTORY_CACHE_TTL = float(os.environ.get("INVENTORY_CACHE_TTL", "60"))
+INVENTORY_CACHE_SIZE = int(os.environ.get("INVENTORY_CACHE_SIZE", "512"))
+INVENTORY_PREFETCH_INTERVAL = float(os.environ.get("INVENTORY_PREFETCH_INTERVAL", "30"))
+INVENTORY_PREFETCH_TOP = int(os.environ.get("INVENTORY_PREFETCH_TOP", "5"))
+INVENTORY_PREFETCH_MIN_QUERIES = float(os.environ.get("INVENTORY_PREFETCH_MIN_QUERIES", "2"))
+
+# (country, mode, pattern) -> {"numbers", "fetched_at"}, least recently used first
+inventory_cache = OrderedDict()
+inventory_lock = threading.Lock()
+# (country, mode, pattern) -> {"score"}; scores halve every prefetch cycle
+inventory_queries = {}
+inventory_stats = {"hits": 0, "misses": 0, "expired": 0, "served_age": 0.0, "removed": 0, "prefetched": 0, "prefetch_errors": 0,
+                   "prefetch_skipped": 0, "coalesced_retries": 0}
+inventory_prefetcher_thread = None
+
+# Per-user search history (numbers offered by searches): capped, aged out, and under a global budget
+SEARCH_HISTORY_CAP = int(os.environ.get("SEARCH_HISTORY_CAP", "2000"))
+SEARCH_HISTORY_MAX_AGE = float(os.environ.get("SEARCH_HISTORY_MAX_AGE", "86400"))  # 0 keeps numbers until evicted by size
+SEARCH_HISTORY_BUDGET = int(os.environ.get("SEARCH_HISTORY_BUDGET", "500000"))
+
+SEARCH_HISTORY_RESEED_INTERVAL = float(os.environ.get("SEARCH_HISTORY_RESEED_INTERVAL", "300"))
+
+# user_id -> history size, least recently searched user first, plus their running total; seeded
+# from the state backend by a background thread so histories written before a restart or by
+# other workers count, and re-seeded every interval
+search_history_sizes = OrderedDict()
+search_history_total = 0
+search_history_seeded_at = 0.0
+# Users whose history changed while a reseed was decoding the backend
+search_history_touched = set()
+search_history_reseeder_thread = None
+# Guards every read-modify-write of a history and the size accounting (histories are copied, never mutated in place)
+search_history_lock = threading.RLock()
+search_history_stats = {"added": 0, "refreshed": 0, "evicted_cap": 0, "evicted_age": 0, "evicted_budget": 0}
+
+# Search result delivery: "paged" (one message with Buy buttons and prev/next pages) or "messages" (one per number)
+SEARCH_DELIVERY = os.environ.get("SEARCH_DELIVERY", "paged").lower()
+SEARCH_PAGE_SIZE = max(1, int(os.environ.get("SEARCH_PAGE_SIZE", "10")))
+search_delivery_stats = {"searches": 0, "pages_served": 0, "messages_sent": 0}
+
+# Bulk buy: several numbers from one results page, purchased concurrently across the user's healthy accounts
+BULK_BUY_MAX = int(os.environ.get("BULK_BUY_MAX", "5"))
+BULK_BUY_WORKERS = int(os.environ.get("BULK_BUY_WORKERS", "8"))
+bulk_buy_executor = ThreadPoolExecutor(max_workers=BULK_BUY_WORKERS, thread_name_prefix="bulk-buy")
+bulk_buy_stats = {"batches": 0, "purchased": 0, "failed": 0, "account_failovers": 0}
+# Serializes read-modify-write of user_data[...]["purchased_numbers"]; users with a batch running
+purchased_numbers_lock = threading.Lock()
+bulk_buy_active = set()
+
+# Twilio requests currently in flight per account SID (shown by /pool_status)
+twilio_inflight = {}
+twilio_inflight_lock = threading.Lock()
+
+# Bulk login validation: bounded parallelism, throttled progress edits
+BULK_LOGIN_WORKERS = int(os.environ.get("BULK_LOGIN_WORKERS", "8"))
+BULK_LOGIN_PROGRESS_INTERVAL = float(os.environ.get("BULK_LOGIN_PROGRESS_INTERVAL", "2"))
+bulk_login_executor = ThreadPoolExecutor(max_workers=BULK_LOGIN_WORKERS, thread_name_prefix="bulk-login")
+
+# Channel membership verdict cache (seconds a verdict stays valid)
+MEMBERSHIP_CACHE_POSITIVE_TTL = int(os.environ.get("MEMBERSHIP_CACHE_POSITIVE_TTL", "300"))
+MEMBERSHIP_CACHE_NEGATIVE_TTL = int(os.environ.get("MEMBERSHIP_CACHE_NEGATIVE_TTL", "30"))
+
+# Write-behind persistence: handlers mark users dirty, one background flush per interval
+USERS_FLUSH_INTERVAL = float(os.environ.get("USERS_FLUSH_INTERVAL", "2"))
+dirty_user_ids = set()
+dirty_users_lock = threading.Lock()
+# Guards adding users to registered_users so flushes never iterate it mid-insert
+registered_users_lock = threading.Lock()
+users_flush_lock = threading.Lock()
+users_flush_event = threading.Event()
+users_persister_thread = None
+persister_stats = {"marked": 0, "flushes": 0, "rows_written": 0}
+
+# user_id -> (verdict, expires_at)
+membership_cache = {}
+membership_cache_lock = threading.Lock()
+membership_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+# Updates requested from Telegram (chat_member must be asked for explicitly)
+WEBHOOK_ALLOWED_UPDATES = ["message", "callback_query", "chat_member"]
+
+# Event-driven membership table kept current from chat_member updates
+# user_id -> {channel_username: (is_member, expires_at)}; expires_at is None for facts from events,
+# polled verdicts only seed entries that expire after MEMBERSHIP_CACHE_POSITIVE_TTL
+channel_membership_table = {}
+channel_membership_lock = threading.Lock()
+channel_membership_stats = {"events": 0, "table_hits": 0, "polls": 0}
+
+# Worker pool used to query all REQUIRED_CHANNELS concurrently
+CHANNEL_CHECK_WORKERS = int(os.environ.get("CHANNEL_CHECK_WORKERS", "16"))
+channel_check_executor = ThreadPoolExecutor(max_workers=CHANNEL_CHECK_WORKERS, thread_name_prefix="channel-check")
+
+# Global error tracking
+error_count = 0
+last_error_time = 0
+
+def comprehensive_error_handler(func):
+    """Ultra comprehensive error handler decorator"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        global error_count, last_error_time
+        try:
+            return func(*args, **kwargs)
+        except telebot.apihelper.ApiTelegramException as e:
+            error_msg = str(e).lower()
+            if "blocked" in error_msg or "chat not found" in error_msg:
+                logger.warning(f"User interaction error in {func.__name__}: {str(e)}")
+            elif "rate" in error_msg or "too many" in error_msg:
+                logger.warning(f"Rate limit in {func.__name__}, backing off...")
+                time.sleep(5)
+            else:
+                logger.error(f"Telegram API error in {func.__name__}: {str(e)}")
+        except Exception as e:
+            current_time = time.time()
+            error_count += 1
+
+            if current_time - last_error_time > 300:  # Reset count every 5 minutes
+                error_count = 1
+            last_error_time = current_time
+
+            logger.error(f"Error in {func.__name__}: {str(e)}", exc_info=True)
+
+            # Try to send error notification to user if possible
+            try:
+                if args and hasattr(args[0], 'chat') and hasattr(args[0].chat, 'id'):
+                    chat_id = args[0].chat.id
+                    safe_send_message(chat_id, "⚠️ Temporary issue occurred. Please try again.")
+            except:
+                pass
+
+            # Force garbage collection on repeated errors
+            if error_count > 10:
+                gc.collect()
+                error_count = 0
+    return wrapper
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one in-flight call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn once per key at a time; concurrent callers share its result or exception"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+                leader = True
+                self.stats["calls"] += 1
+            else:
+                leader = False
+                self.stats["shared"] += 1
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn(*args, **kwargs)
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["event"].set()
+
+# Shared in-flight channel verifications, keyed by user id
+channel_check_flight = SingleFlight()
+
+# Shared in-flight number searches, keyed by (country, mode, pattern) like the inventory cache
+number_search_flight = SingleFlight()
+
+class UserStatus(enum.IntEnum):
+    """Registered user status"""
+    APPROVED = 0
+    PENDING = 1
+    BLOCKED = 2
+
+# Bit per required channel, by position in REQUIRED_CHANNELS
+CHANNEL_BITS = {channel["username"]: 1 << index for index, channel in enumerate(REQUIRED_CHANNELS)}
+
+class UserRecord:
+    """Compact registered user record: enum status, channel bitmask, int timestamps.
+
+    Converts losslessly to and from the users.json schema; anything that does not
+    fit the packed fields (unknown status, unknown channels, odd values) is kept in
+    `extra` and written back unchanged.
+    """
+    __slots__ = ("_status", "flags", "verified_mask", "first_use_time", "extra")
+
+    FLAG_CHANNEL_JOINED = 1
+    FLAG_HAS_VERIFIED_CHANNELS = 2
+
+    def __init__(self, status=UserStatus.APPROVED, channel_joined=False, first_use_time=None):
+        self.extra = None
+        self._status = UserStatus(status)
+        self.flags = self.FLAG_CHANNEL_JOINED if channel_joined else 0
+        self.verified_mask = 0
+        self.first_use_time = first_use_time
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        self._status = UserStatus(value)
+        # An explicit status replaces any unrecognised one carried over from JSON
+        if self.extra and "status" in self.extra:
+            self.extra.pop("status")
+
+    @property
+    def channel_joined(self):
+        return bool(self.flags & self.FLAG_CHANNEL_JOINED)
+
+    @channel_joined.setter
+    def channel_joined(self, value):
+        if value:
+            self.flags |= self.FLAG_CHANNEL_JOINED
+        else:
+            self.flags &= ~self.FLAG_CHANNEL_JOINED
+
+    def is_channel_verified(self, channel_username):
+        bit = CHANNEL_BITS.get(channel_username)
+        if bit is not None and self.verified_mask & bit:
+            return True
+        return bool(self.extra and self.extra.get("verified_channels", {}).get(channel_username, False))
+
+    def mark_channel_verified(self, channel_username):
+        """Mark channel verified; returns True if the record changed"""
+        bit = CHANNEL_BITS.get(channel_username)
+        if bit is None:
+            extra_channels = self._extra_channels()
+            if extra_channels.get(channel_username) is True:
+                return False
+            extra_channels[channel_username] = True
+            self.flags |= self.FLAG_HAS_VERIFIED_CHANNELS
+            return True
+        if self.verified_mask & bit and self.flags & self.FLAG_HAS_VERIFIED_CHANNELS:
+            return False
+        self.verified_mask |= bit
+        self.flags |= self.FLAG_HAS_VERIFIED_CHANNELS
+        if self.extra and "verified_channels" in self.extra:
+            self.extra["verified_channels"].pop(channel_username, None)
+        return True
+
+    def clear_channel_verified(self, channel_username):
+        bit = CHANNEL_BITS.get(channel_username)
+        if bit is not None:
+            self.verified_mask &= ~bit
+        if self.extra and "verified_channels" in self.extra:
+            self.extra["verified_channels"].pop(channel_username, None)
+
+    def verified_channel_count(self):
+        extra_count = len(self.extra.get("verified_channels", {})) if self.extra else 0
+        return bin(self.verified_mask).count("1") + extra_count
+
+    def _extra_channels(self):
+        if self.extra is None:
+            self.extra = {}
+        return self.extra.setdefault("verified_channels", {})
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from one users.json entry"""
+        record = cls(channel_joined=bool(data.get("channel_joined", False)))
+        extra = {}
+
+        status = data.get("status", "approved")
+        try:
+            record._status = UserStatus[status.upper()]
+        except (KeyError, AttributeError):
+            extra["status"] = status
+
+        first_use_time = data.get("first_use_time")
+        if first_use_time is None or (isinstance(first_use_time, int) and not isinstance(first_use_time, bool)):
+            record.first_use_time = first_use_time
+        elif isinstance(first_use_time, float) and first_use_time.is_integer():
+            record.first_use_time = int(first_use_time)
+        else:
+            extra["first_use_time"] = first_use_time
+
+        verified_channels = data.get("verified_channels")
+        if verified_channels is not None:
+            record.flags |= cls.FLAG_HAS_VERIFIED_CHANNELS
+            if isinstance(verified_channels, dict):
+                for channel_username, verified in verified_channels.items():
+                    bit = CHANNEL_BITS.get(channel_username)
+                    if bit is not None and verified is True:
+                        record.verified_mask |= bit
+                    else:
+                        extra.setdefault("verified_channels", {})[channel_username] = verified
+            else:
+                extra["verified_channels_raw"] = verified_channels
+
+        for key, value in data.items():
+            if key not in ("status", "channel_joined", "first_use_time", "verified_channels"):
+                extra[key] = value
+
+        record.extra = extra or None
+        return record
+
+    def to_dict(self):
+        """Convert back to the users.json schema"""
+        extra = self.extra or {}
+        data = {
+            "status": extra.get("status", self.status.name.lower()),
+            "channel_joined": self.channel_joined,
+            "first_use_time": extra.get("first_use_time", self.first_use_time)
+        }
+        if "verified_channels_raw" in extra:
+            data["verified_channels"] = extra["verified_channels_raw"]
+        elif self.flags & self.FLAG_HAS_VERIFIED_CHANNELS:
+            verified_channels = {
+                channel_username: True
+                for channel_username, bit in CHANNEL_BITS.items()
+                if self.verified_mask & bit
+            }
+            verified_channels.update(extra.get("verified_channels", {}))
+            data["verified_channels"] = verified_channels
+        for key, value in extra.items():
+            if key not in ("status", "first_use_time", "verified_channels", "verified_channels_raw"):
+                data[key] = value
+        return data
+
+def users_to_json_dict(users):
+    """Convert {user_id: UserRecord} into the users.json mapping"""
+    return {str(user_id): record.to_dict() for user_id, record in users.items()}
+
+class MemoryStateBackend:
+    """Session state held in this process only (values are live objects)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, namespace, key, default=None):
+        return self._data.get(namespace, {}).get(key, default)
+
+    def set(self, namespace, key, value):
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = value
+
+    def delete(self, namespace, key):
+        with self._lock:
+            return self._data.get(namespace, {}).pop(key, None) is not None
+
+    def contains(self, namespace, key):
+        return key in self._data.get(namespace, {})
+
+    def keys(self, namespace):
+        return list(self._data.get(namespace, {}).keys())
+
+    def count(self, namespace):
+        return len(self._data.get(namespace, {}))
+
+class SqliteStateBackend:
+    """Session state in a shared SQLite file so every worker process sees the same values.
+
+    Values are stored as JSON, so reads return copies: nested changes must be
+    written back by assigning the value again.
+    """
+
+    def __init__(self, db_path=STATE_DB_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        # Opened lazily so each forked worker gets its own connection
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "namespace TEXT NOT NULL, "
+                "key TEXT NOT NULL, "
+                "value TEXT NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, namespace, key, default=None):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM state WHERE namespace=? AND key=?", (namespace, json.dumps(key))
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, namespace, key, value):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO state (namespace, key, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT(namespace, key) DO UPDATE SET value=excluded.value",
+                    (namespace, json.dumps(key), json.dumps(value, ensure_ascii=False))
+                )
+
+    def delete(self, namespace, key):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute("DELETE FROM state WHERE namespace=? AND key=?", (namespace, json.dumps(key)))
+        return cursor.rowcount > 0
+
+    def contains(self, namespace, key):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT 1 FROM state WHERE namespace=? AND key=?", (namespace, json.dumps(key))
+            ).fetchone()
+        return row is not None
+
+    def keys(self, namespace):
+        with self._lock:
+            rows = self._connection().execute("SELECT key FROM state WHERE namespace=?", (namespace,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, namespace):
+        with self._lock:
+            row = self._connection().execute("SELECT COUNT(*) FROM state WHERE namespace=?", (namespace,)).fetchone()
+        return row[0]
+
+def create_state_backend(backend=None):
+    """Create the configured session state backend"""
+    backend = (backend or STATE_BACKEND).lower()
+    if backend == "sqlite":
+        return SqliteStateBackend(STATE_DB_FILE)
+    if backend != "memory":
+        logger.warning(f"Unknown STATE_BACKEND '{backend}', using memory")
+    return MemoryStateBackend()
+
+state_backend = create_state_backend()
+
+_MISSING = object()
+
+class SharedStateDict:
+    """Dict-style view of one state backend namespace"""
+
+    def __init__(self, namespace, backend=None):
+        self.namespace = namespace
+        self.backend = backend
+
+    def _backend(self):
+        return self.backend or state_backend
+
+    def __getitem__(self, key):
+        value = self._backend().get(self.namespace, key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._backend().set(self.namespace, key, value)
+
+    def __delitem__(self, key):
+        if not self._backend().delete(self.namespace, key):
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self._backend().contains(self.namespace, key)
+
+    def __iter__(self):
+        return iter(self._backend().keys(self.namespace))
+
+    def __len__(self):
+        return self._backend().count(self.namespace)
+
+    def get(self, key, default=None):
+        return self._backend().get(self.namespace, key, default)
+
+    def pop(self, key, default=None):
+        value = self._backend().get(self.namespace, key, _MISSING)
+        if value is _MISSING:
+            return default
+        self._backend().delete(self.namespace, key)
+        return value
+
+    def keys(self):
+        return self._backend().keys(self.namespace)
+
+    def items(self):
+        return [(key, self.get(key)) for key in self.keys()]
+
+# Numbers offered to each user by searches: number -> offered_at, oldest first
+generated_numbers = SharedStateDict("generated_numbers")
+
+# Last search result set per user, served page by page from the results keyboard
+search_results = SharedStateDict("search_results")
+
+# Bulk-bought numbers of logged-out users, handed back to the session at their next login
+retained_purchased_numbers = SharedStateDict("retained_purchased_numbers")
+
+# Dictionary to store user-specific data
+user_data = SharedStateDict("user_data")
+user_current_number = SharedStateDict("user_current_number")
+
+# Track current account index for each user
+user_account_index = SharedStateDict("user_account_index")
+
+# Current search mode per user
+user_search_mode = SharedStateDict("user_search_mode")
+
+# Pending conversation step per chat (replaces telebot's in-process next-step handlers)
+pending_steps = SharedStateDict("pending_steps")
+
+# Step name -> handler function, filled in by setup_all_handlers
+step_handlers = {}
+
+def update_user_data(user_id, **fields):
+    """Update fields of a user's session data and write it back to the state backend"""
+    record = user_data.get(user_id) or {}
+    record.update(fields)
+    user_data[user_id] = record
+    return record
+
+def _search_history(user_id):
+    """A private copy of the user's history as an OrderedDict (older sessions stored a plain list)"""
+    history = generated_numbers.get(user_id)
+    if isinstance(history, list):
+        return OrderedDict.fromkeys(history, time.time())
+    return OrderedDict(history or {})
+
+def _drop_expired_search_history(history, now):
+    """Pop numbers older than SEARCH_HISTORY_MAX_AGE off the front; returns how many"""
+    if SEARCH_HISTORY_MAX_AGE <= 0:
+        return 0
+    cutoff = now - SEARCH_HISTORY_MAX_AGE
+    expired = 0
+    while history and next(iter(history.values())) < cutoff:
+        history.popitem(last=False)
+        expired += 1
+    return expired
+
+def _set_search_history_size(user_id, size):
+    """Move a user to the most recent end of the size accounting; caller holds search_history_lock"""
+    global search_history_total
+    search_history_total += size - search_history_sizes.pop(user_id, 0)
+    if size:
+        search_history_sizes[user_id] = size
+    search_history_touched.add(user_id)
+
+def _store_search_history(user_id, history):
+    """Write a user's history back and update the size accounting; caller holds search_history_lock"""
+    if history:
+        generated_numbers[user_id] = history
+    else:
+        generated_numbers.pop(user_id, None)
+    _set_search_history_size(user_id, len(history))
+
+def seed_search_history_sizes():
+    """Rebuild the size accounting from every history in the state backend, least recently offered first.
+
+    Decoding runs outside search_history_lock; users whose history changed meanwhile keep their live size.
+    """
+    global search_history_total, search_history_seeded_at
+    with search_history_lock:
+        search_history_touched.clear()
+    sizes = []
+    for user_id in generated_numbers.keys():
+        history = _search_history(user_id)
+        if history:
+            sizes.append((max(history.values()), user_id, len(history)))
+
+    with search_history_lock:
+        seeded = OrderedDict((user_id, size) for _, user_id, size in sorted(sizes))
+        for user_id in search_history_touched:
+            seeded.pop(user_id, None)
+            if user_id in search_history_sizes:
+                seeded[user_id] = search_history_sizes[user_id]
+        search_history_sizes.clear()
+        search_history_sizes.update(seeded)
+        search_history_total = sum(seeded.values())
+        search_history_seeded_at = time.time()
+
+def search_history_reseeder_loop():
+    """Re-seed the search history size accounting every SEARCH_HISTORY_RESEED_INTERVAL"""
+    while True:
+        try:
+            seed_search_history_sizes()
+        except Exception as e:
+            logger.error(f"Search history reseed error: {str(e)}")
+        time.sleep(max(1.0, SEARCH_HISTORY_RESEED_INTERVAL))
+
+def start_search_history_reseeder():
+    """Start the background search history reseeder once"""
+    global search_history_reseeder_thread
+    if search_history_reseeder_thread is not None:
+        return
+    with search_history_lock:
+        if search_history_reseeder_thread is not None:
+            return
+        search_history_reseeder_thread = threading.Thread(target=search_history_reseeder_loop, name="search-history-reseeder", daemon=True)
+        search_history_reseeder_thread.start()
+
+def load_search_history(user_id):
+    """Return a copy of the user's unexpired search history (number -> offered_at) for O(1) membership checks"""
+    history = _search_history(user_id)
+    if _drop_expired_search_history(history, time.time()):
+        with search_history_lock:
+            history = _search_history(user_id)
+            search_history_stats["evicted_age"] += _drop_expired_search_history(history, time.time())
+            _store_search_history(user_id, history)
+    return history
+
+def record_search_history(user_id, numbers):
+    """Add searched numbers to the user's history; re-offered numbers move to the newest end"""
+    with search_history_lock:
+        history = _search_history(user_id)
+        now = time.time()
+        for number in numbers:
+            if number in history:
+                history.move_to_end(number)
+                search_history_stats["refreshed"] += 1
+            else:
+                search_history_stats["added"] += 1
+            history[number] = now
+
+        search_history_stats["evicted_age"] += _drop_expired_search_history(history, now)
+        while len(history) > SEARCH_HISTORY_CAP:
+            history.popitem(last=False)
+            search_history_stats["evicted_cap"] += 1
+        _store_search_history(user_id, history)
+    enforce_search_history_budget(keep_user_id=user_id)
+    return history
+
+def forget_search_history(user_id):
+    """Drop a user's history; returns how many numbers it held"""
+    with search_history_lock:
+        history = generated_numbers.pop(user_id, None)
+        _set_search_history_size(user_id, 0)
+    return len(history or ())
+
+def enforce_search_history_budget(keep_user_id=None):
+    """Trim the least recently searched users' oldest numbers until all histories fit SEARCH_HISTORY_BUDGET"""
+    start_search_history_reseeder()
+    with search_history_lock:
+        excess = search_history_total - SEARCH_HISTORY_BUDGET
+        if excess <= 0:
+            return
+        for user_id in [user_id for user_id in search_history_sizes if user_id != keep_user_id]:
+            if excess <= 0:
+                break
+            history = _search_history(user_id)
+            trim = min(excess, len(history))
+            for _ in range(trim):
+                history.popitem(last=False)
+            excess -= trim
+            search_history_stats["evicted_budget"] += trim
+            _store_search_history(user_id, history)
+
+def carried_purchased_numbers(user_id):
+    """purchased_numbers for a new login: the previous session's, or those retained at logout"""
+    previous = (user_data.get(user_id) or {}).get("purchased_numbers")
+    retained = retained_purchased_numbers.pop(user_id, None)
+    return previous or retained or []
+
+def register_pending_step(message, step_name, *args):
+    """Route the chat's next message to step_handlers[step_name]"""
+    pending_steps[message.chat.id] = {"step": step_name, "args": list(args)}
+
+def has_pending_step(message):
+    """Check whether the chat is waiting for a step reply"""
+    return message.chat.id in pending_steps
+
+def dispatch_pending_step(message):
+    """Run (and consume) the pending step registered for this chat"""
+    pending = pending_steps.pop(message.chat.id, None)
+    if not pending:
+        return False
+    handler = step_handlers.get(pending["step"])
+    if handler is None:
+        logger.error(f"Unknown pending step: {pending['step']}")
+        return False
+    handler(message, *pending.get("args", []))
+    return True
+
+def normalize_user_records(data):
+    """Convert raw users.json data into {int user_id: UserRecord}"""
+    users = {}
+    for user_id, user_info in data.items():
+        try:
+            if isinstance(user_info, dict):
+                users[int(user_id)] = UserRecord.from_dict(user_info)
+            else:
+                users[int(user_id)] = UserRecord.from_dict({
+                    "status": user_info if isinstance(user_info, str) else "approved",
+                    "channel_joined": False,
+                    "first_use_time": None
+                })
+        except (ValueError, TypeError):
+            logger.warning(f"Skipping invalid user data: {user_id}")
+            continue
+    return users
+
+def load_users_from_json_files(users_file=USERS_FILE):
+    """Load users from users.json, falling back to .backup and .old; returns (users, path)"""
+    backup_files = [users_file, f"{users_file}.backup", f"{users_file}.old"]
+
+    for file_path in backup_files:
+        try:
+            if os.path.exists(file_path):
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                return normalize_user_records(data), file_path
+
+        except Exception as e:
+            logger.error(f"Error loading from {file_path}: {str(e)}")
+            continue
+
+    return None, None
+
+class JsonUserStore:
+    """users.json store: every save rewrites the whole file"""
+
+    def __init__(self, users_file=USERS_FILE):
+        self.users_file = users_file
+        self._lock = threading.RLock()
+
+    def load(self):
+        users, file_path = load_users_from_json_files(self.users_file)
+        if users is not None:
+            logger.info(f"Loaded {len(users)} users from {file_path}")
+        return users
+
+    def save_all(self, users):
+        # Write the new copy first, then rotate: os.replace overwrites on every platform.
+        # Each flush gets its own temp file so overlapping writers never share one.
+        temp_file = f"{self.users_file}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(users_to_json_dict(users), f, indent=2, ensure_ascii=False)
+        except Exception:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+
+        with self._lock:
+            if os.path.exists(self.users_file):
+                try:
+                    os.replace(self.users_file, f"{self.users_file}.backup")
+                except OSError:
+                    pass
+            os.replace(temp_file, self.users_file)
+
+    def upsert_many(self, records):
+        # JSON has no per-row writes: merge the records into the saved file and rewrite it.
+        # The lock keeps two merges from each dropping the other's records.
+        with self._lock:
+            users, _ = load_users_from_json_files(self.users_file)
+            users = users or {}
+            users.update(records)
+            self.save_all(users)
+
+class SqliteUserStore:
+    """SQLite store in WAL mode: one row per user, saves are single-row upserts"""
+
+    def __init__(self, db_path=USERS_DB_FILE, users_file=USERS_FILE):
+        self.db_path = db_path
+        self.users_file = users_file
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "user_id INTEGER PRIMARY KEY, "
+                "data TEXT NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def load(self):
+        with self._lock:
+            rows = self._connection().execute("SELECT user_id, data FROM users").fetchall()
+
+        if rows:
+            users = {}
+            for user_id, data in rows:
+                try:
+                    users[int(user_id)] = UserRecord.from_dict(json.loads(data))
+                except (ValueError, TypeError):
+                    logger.warning(f"Skipping invalid user row: {user_id}")
+            logger.info(f"Loaded {len(users)} users from {self.db_path}")
+            return users
+
+        # Empty database: same fallback chain as the JSON store, then import once
+        users, file_path = load_users_from_json_files(self.users_file)
+        if users is not None:
+            self.save_all(users)
+            logger.info(f"Imported {len(users)} users from {file_path} into {self.db_path}")
+        return users
+
+    def save_all(self, users):
+        now = time.time()
+        rows = [(int(user_id), json.dumps(record.to_dict(), ensure_ascii=False), now) for user_id, record in users.items()]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO users (user_id, data, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET data=excluded.data, updated_at=excluded.updated_at",
+                    rows
+                )
+
+    def upsert_many(self, records):
+        # Dirty rows only, in one transaction
+        self.save_all(records)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def create_user_store(backend=None):
+    """Create the configured user store backend"""
+    backend = (backend or USER_STORE_BACKEND).lower()
+    if backend == "sqlite":
+        return SqliteUserStore(USERS_DB_FILE, USERS_FILE)
+    if backend != "json":
+        logger.warning(f"Unknown USER_STORE_BACKEND '{backend}', using json")
+    return JsonUserStore(USERS_FILE)
+
+user_store = create_user_store()
+
+def migrate_users_json_to_sqlite(users_file=USERS_FILE, db_path=USERS_DB_FILE):
+    """One-shot migration of users.json (or its .backup/.old) into the SQLite store"""
+    users, file_path = load_users_from_json_files(users_file)
+    if users is None:
+        logger.warning(f"No users file found to migrate from {users_file}")
+        return 0
+
+    store = SqliteUserStore(db_path, users_file)
+    try:
+        store.save_all(users)
+    finally:
+        store.close()
+    logger.info(f"Migrated {len(users)} users from {file_path} to {db_path}")
+    return len(users)
+
+def safe_load_registered_users():
+    """Load registered users with maximum safety"""
+    global registered_users
+
+    try:
+        users = user_store.load()
+        if users is not None:
+            registered_users = users
+            return True
+    except Exception as e:
+        logger.error(f"Error loading users from store: {str(e)}")
+
+    # If all files fail, initialize with admin
+    registered_users = {admin_id: UserRecord(UserStatus.APPROVED, channel_joined=True)}
+    logger.info("Initialized with admin user only")
+    return True
+
+def snapshot_registered_users():
+    """Copy of registered_users taken under its lock, safe to iterate while handlers add users"""
+    with registered_users_lock:
+        return dict(registered_users)
+
+def mark_user_dirty(user_id):
+    """Queue a user record for the next write-behind flush (never touches disk)"""
+    with dirty_users_lock:
+        dirty_user_ids.add(user_id)
+        persister_stats["marked"] += 1
+    start_users_persister()
+    users_flush_event.set()
+
+def flush_dirty_users():
+    """Write all dirty user records now; returns False if the write failed"""
+    with users_flush_lock:
+        with dirty_users_lock:
+            if not dirty_user_ids:
+                return True
+            pending = set(dirty_user_ids)
+            dirty_user_ids.clear()
+
+        try:
+            users = snapshot_registered_users()
+            records = {user_id: users[user_id] for user_id in pending if user_id in users}
+            user_store.upsert_many(records)
+            persister_stats["flushes"] += 1
+            persister_stats["rows_written"] += len(records)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving users: {str(e)}")
+            # Keep them dirty so the next flush retries
+            with dirty_users_lock:
+                dirty_user_ids.update(pending)
+            return False
+
+def users_persister_loop():
+    """Background write-behind loop: at most one flush per USERS_FLUSH_INTERVAL"""
+    while True:
+        users_flush_event.wait()
+        # Coalesce everything marked during the interval into a single write
+        time.sleep(USERS_FLUSH_INTERVAL)
+        users_flush_event.clear()
+        flush_dirty_users()
+
+def start_users_persister():
+    """Start the write-behind thread once and flush synchronously at exit"""
+    global users_persister_thread
+    if users_persister_thread is not None:
+        return
+    with dirty_users_lock:
+        if users_persister_thread is not None:
+            return
+        users_persister_thread = threading.Thread(target=users_persister_loop, name="users-persister", daemon=True)
+        users_persister_thread.start()
+        atexit.register(flush_dirty_users)
+
+def fetch_channel_memberships(user_id):
+    """Query every required channel concurrently; returns {username: member or exception}"""
+    futures = {
+        channel["username"]: channel_check_executor.submit(bot.get_chat_member, channel["chat_id"], user_id)
+        for channel in REQUIRED_CHANNELS
+    }
+    memberships = {}
+    for username, future in futures.items():
+        try:
+            memberships[username] = future.result()
+        except Exception as e:
+            memberships[username] = e
+    return memberships
+
+def robust_channel_check(user_id, max_retries=3):
+    """Enhanced channel membership check; concurrent checks for one user share a single request"""
+    if user_id == admin_id:
+        return True
+
+    return channel_check_flight.do(user_id, _robust_channel_check, user_id, max_retries)
+
+def _robust_channel_check(user_id, max_retries):
+    """Enhanced channel membership check with API bypass and fallback system"""
+
+    channels_verified = 0
+    required_channels_count = len(REQUIRED_CHANNELS)
+    api_errors = []
+
+    for attempt in range(max_retries):
+        try:
+            channels_verified = 0
+            memberships = fetch_channel_memberships(user_id)
+            for channel in REQUIRED_CHANNELS:
+                try:
+                    member = memberships[channel["username"]]
+                    if isinstance(member, Exception):
+                        raise member
+                    if member.status in ['left', 'kicked']:
+                        logger.info(f"User {user_id} has left channel {channel['username']}")
+                        # Reset user's channel_joined status
+                        if user_id in registered_users and registered_users[user_id].channel_joined:
+                            registered_users[user_id].channel_joined = False
+                            mark_user_dirty(user_id)
+                        return False
+                    elif member.status in ['member', 'administrator', 'creator']:
+                        channels_verified += 1
+                        logger.info(f"User {user_id} is member of {channel['username']}")
+                        # Mark this channel as verified for this user
+                        with registered_users_lock:
+                            if user_id not in registered_users:
+                                registered_users[user_id] = UserRecord()
+                        if registered_users[user_id].mark_channel_verified(channel["username"]):
+                            mark_user_dirty(user_id)
+                except telebot.apihelper.ApiTelegramException as e:
+                    error_msg = str(e).lower()
+                    api_errors.append(f"{channel['username']}: {str(e)}")
+
+                    if "user not found" in error_msg or "chat not found" in error_msg:
+                        logger.warning(f"User {user_id} not found in {channel['username']}")
+                        return False
+                    elif "member list is inaccessible" in error_msg or "bad request" in error_msg:
+                        # Smart fallback: Use previous verification + time-based trust
+                        logger.warning(f"Member list inaccessible for {channel['username']}, using fallback verification")
+
+                        # Check if user was previously verified for this specific channel
+                        if (user_id in registered_users and
+                            registered_users[user_id].is_channel_verified(channel["username"])):
+                            channels_verified += 1
+                            logger.info(f"✅ Allowing user {user_id} for {channel['username']} - Previously verified & API bypass active")
+                        else:
+                            # Fallback verification: If user is trying to use bot and one channel is accessible, trust for both
+                            # Reuse the concurrent results instead of querying the other channels again
+                            other_channel_accessible = False
+                            for other_channel in REQUIRED_CHANNELS:
+                                if other_channel["username"] != channel["username"]:
+                                    other_member = memberships.get(other_channel["username"])
+                                    if (not isinstance(other_member, Exception) and other_member is not None and
+                                            other_member.status in ['member', 'administrator', 'creator']):
+                                        other_channel_accessible = True
+                                        break
+
+                            if other_channel_accessible:
+                                # If user is verified in at least one channel, assume good faith for inaccessible channel
+                                channels_verified += 1
+                                logger.info(f"✅ Allowing user {user_id} for {channel['username']} - Verified in other channel, API bypass fallback")
+                                # Mark as verified for future
+                                with registered_users_lock:
+                                    if user_id not in registered_users:
+                                        registered_users[user_id] = UserRecord()
+                                if registered_users[user_id].mark_channel_verified(channel["username"]):
+                                    mark_user_dirty(user_id)
+                            else:
+                                logger.warning(f"❌ User {user_id} cannot be verified for {channel['username']} - No fallback available")
+                                return False
+                    elif "rate" in error_msg or "too many" in error_msg:
+                        time.sleep(2)
+                        continue
+                    else:
+                        logger.error(f"API error checking {channel['username']}: {str(e)}")
+                        # For other API errors, be more lenient
+                        if (user_id in registered_users and
+                            registered_users[user_id].is_channel_verified(channel["username"])):
+                            channels_verified += 1
+                            logger.info(f"✅ Allowing user {user_id} for {channel['username']} - API error bypass using previous verification")
+                        else:
+                            return False
+                except Exception as e:
+                    logger.error(f"Unexpected error checking {channel['username']}: {str(e)}")
+                    # For unexpected errors, use cached verification if available
+                    if (user_id in registered_users and
+                        registered_users[user_id].is_channel_verified(channel["username"])):
+                        channels_verified += 1
+                        logger.info(f"✅ Allowing user {user_id} for {channel['username']} - Exception bypass using cached verification")
+                    else:
+                        return False
+
+            # User must be verified in ALL channels
+            if channels_verified == required_channels_count:
+                # Update user's overall status (only persisted when it actually changed)
+                if user_id in registered_users and not registered_users[user_id].channel_joined:
+                    registered_users[user_id].channel_joined = True
+                    mark_user_dirty(user_id)
+                logger.info(f"✅ User {user_id} fully verified in all {channels_verified}/{required_channels_count} channels")
+                return True
+            else:
+                logger.warning(f"❌ User {user_id} verified in only {channels_verified}/{required_channels_count} channels")
+                return False
+
+        except Exception as e:
+            logger.error(f"Channel check attempt {attempt + 1} failed: {str(e)}")
+            if attempt < max_retries - 1:
+                time.sleep(2)
+
+    # Final fallback: If all API attempts failed but user was previously verified
+    logger.warning(f"All API attempts failed for user {user_id}. API Errors: {api_errors}")
+
+    # Ultimate fallback for completely inaccessible APIs
+    if (user_id in registered_users and
+        registered_users[user_id].channel_joined and
+        registered_users[user_id].verified_channel_count() >= required_channels_count):
+        logger.info(f"🚨 ULTIMATE FALLBACK: Allowing user {user_id} based on previous full verification - API completely inaccessible")
+        return True
+
+    logger.warning(f"❌ All verification methods failed for user {user_id}")
+    return False
+
+def get_cached_membership(user_id):
+    """Return cached membership verdict for user or None if missing/expired"""
+    with membership_cache_lock:
+        entry = membership_cache.get(user_id)
+        if entry is not None:
+            verdict, expires_at = entry
+            if time.time() < expires_at:
+                membership_cache_stats["hits"] += 1
+                return verdict
+            membership_cache.pop(user_id, None)
+        membership_cache_stats["misses"] += 1
+        return None
+
+def set_cached_membership(user_id, verdict):
+    """Store membership verdict with positive/negative TTL"""
+    ttl = MEMBERSHIP_CACHE_POSITIVE_TTL if verdict else MEMBERSHIP_CACHE_NEGATIVE_TTL
+    if ttl <= 0:
+        return
+    with membership_cache_lock:
+        membership_cache[user_id] = (verdict, time.time() + ttl)
+
+def invalidate_membership_cache(user_id=None):
+    """Drop cached verdict for one user, or for everyone when user_id is None"""
+    with membership_cache_lock:
+        if user_id is None:
+            membership_cache.clear()
+        else:
+            membership_cache.pop(user_id, None)
+        membership_cache_stats["invalidations"] += 1
+
+def find_required_channel(chat):
+    """Return the REQUIRED_CHANNELS username matching a Telegram chat, or None"""
+    chat_username = f"@{chat.username}" if getattr(chat, "username", None) else None
+    for channel in REQUIRED_CHANNELS:
+        if chat_username and chat_username.lower() == channel["username"].lower():
+            return channel["username"]
+        if str(channel["chat_id"]) == str(chat.id):
+            return channel["username"]
+    return None
+
+def record_channel_membership(user_id, channel_username, is_member):
+    """Store one channel membership fact from a chat_member event"""
+    with channel_membership_lock:
+        channel_membership_table.setdefault(user_id, {})[channel_username] = (is_member, None)
+
+def seed_channel_membership(user_id, verdict):
+    """Seed the membership table from a polled verdict.
+
+    A leave only reaches the worker that gets its chat_member update (and none at all
+    when the bot is not a channel admin), so polled facts expire like cached verdicts.
+    """
+    with channel_membership_lock:
+        if not verdict:
+            # A failed poll does not say which channel is missing, so poll again next time
+            channel_membership_table.pop(user_id, None)
+            return
+        if MEMBERSHIP_CACHE_POSITIVE_TTL <= 0:
+            return
+        expires_at = time.time() + MEMBERSHIP_CACHE_POSITIVE_TTL
+        memberships = channel_membership_table.setdefault(user_id, {})
+        for channel in REQUIRED_CHANNELS:
+            # Keep joins already known from events; they do not expire
+            if memberships.get(channel["username"]) != (True, None):
+                memberships[channel["username"]] = (True, expires_at)
+
+def lookup_membership_table(user_id):
+    """Return membership verdict from the event table, or None if not fully known"""
+    with channel_membership_lock:
+        memberships = channel_membership_table.get(user_id)
+        if not memberships:
+            return None
+        now = time.time()
+        for channel_username, (_, expires_at) in list(memberships.items()):
+            if expires_at is not None and now >= expires_at:
+                del memberships[channel_username]
+        if not memberships:
+            channel_membership_table.pop(user_id, None)
+            return None
+        if any(is_member is False for is_member, _ in memberships.values()):
+            return False
+        if all(memberships.get(channel["username"], (False, None))[0] for channel in REQUIRED_CHANNELS):
+            return True
+        return None
+
+def handle_chat_member_update(update):
+    """Apply a chat_member update from a required channel to the membership table"""
+    channel_username = find_required_channel(update.chat)
+    if not channel_username:
+        return
+
+    new_member = update.new_chat_member
+    user_id = new_member.user.id
+    # Channel members who never used the bot would only grow the table
+    if user_id not in registered_users:
+        return
+
+    status = new_member.status
+    if status in ['member', 'administrator', 'creator']:
+        is_member = True
+    elif status == 'restricted':
+        is_member = bool(getattr(new_member, "is_member", False))
+    else:
+        is_member = False
+
+    channel_membership_stats["events"] += 1
+    record_channel_membership(user_id, channel_username, is_member)
+    invalidate_membership_cache(user_id)
+
+    if is_member:
+        registered_users[user_id].mark_channel_verified(channel_username)
+        if lookup_membership_table(user_id):
+            registered_users[user_id].channel_joined = True
+        logger.info(f"User {user_id} joined channel {channel_username} (chat_member update)")
+    else:
+        # Leave/kick revokes access immediately
+        registered_users[user_id].channel_joined = False
+        registered_users[user_id].clear_channel_verified(channel_username)
+        logger.info(f"User {user_id} has left channel {channel_username} (chat_member update)")
+    mark_user_dirty(user_id)
+
+def cached_channel_check(user_id):
+    """Channel membership check served from the event table or verdict cache when possible"""
+    if user_id == admin_id:
+        return True
+
+    verdict = lookup_membership_table(user_id)
+    if verdict is not None:
+        channel_membership_stats["table_hits"] += 1
+        return verdict
+
+    verdict = get_cached_membership(user_id)
+    if verdict is not None:
+        return verdict
+
+    channel_membership_stats["polls"] += 1
+    verdict = robust_channel_check(user_id)
+    set_cached_membership(user_id, verdict)
+    seed_channel_membership(user_id, verdict)
+    return verdict
+
+def fresh_channel_check(user_id):
+    """Bypass the verdict cache, re-check channels live and cache the new verdict"""
+    invalidate_membership_cache(user_id)
+    channel_membership_stats["polls"] += 1
+    verdict = robust_channel_check(user_id)
+    set_cached_membership(user_id, verdict)
+    seed_channel_membership(user_id, verdict)
+    return verdict
+
+def is_user_authorized(user_id):
+    """Check if user is authorized with safety"""
+    try:
+        if user_id == admin_id:
+            return True
+
+        # First, check if user is in our records and was previously verified
+        user_was_authorized = user_id in registered_users and registered_users[user_id].channel_joined
+
+        # Now, perform the channel check (cached verdict when still fresh)
+        is_currently_authorized = cached_channel_check(user_id)
+
+        # If the user was authorized before but isn't now, send a notification
+        if user_was_authorized and not is_currently_authorized:
+            warning_msg = "⚠️ *Channel Membership Required!* ⚠️\n\n"
+            warning_msg += "❌ You seem to have left one of our required channels.\n\n"
+            warning_msg += "🔒 To continue using the bot, please ensure you are a member of:\n\n"
+            for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                warning_msg += f"{i}. {channel['username']}\n"
+            warning_msg += "\n💡 After rejoining, please verify your membership."
+
+            safe_send_message(user_id, warning_msg, reply_markup=create_channel_join_menu(), parse_mode="Markdown")
+
+        return is_currently_authorized
+    except Exception as e:
+        logger.error(f"Error checking authorization for {user_id}: {str(e)}")
+        return False
+
+def create_main_menu(user_id):
+    """Create main menu with error handling"""
+    try:
+        markup = ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
+
+        # Main buttons for all users
+        markup.row(
+            KeyboardButton("👤 Login"),
+            KeyboardButton("➕ Bulk Login")
+        )
+        markup.row(
+            KeyboardButton("📤 Logout"),
+            KeyboardButton("🔎 Search Numbers") # Reverted to original
+        )
+        markup.row(
+            KeyboardButton("📍 Target Number"),
+            KeyboardButton("💬 Receive SMS")
+        )
+        markup.row(
+            KeyboardButton("🔗 Check Channels"),
+            KeyboardButton("🇺🇸 USA Numbers") # New button for USA numbers
+        )
+        markup.row(
+            KeyboardButton("❓ Help")
+        )
+
+        # Admin only buttons
+        if user_id == admin_id:
+            markup.row(
+                KeyboardButton("⚙️ Admin Panel"), # This one is correct from previous fix
+                KeyboardButton("📣 Broadcast")
+            )
+
+        return markup
+    except Exception as e:
+        logger.error(f"Error creating main menu: {str(e)}")
+        return ReplyKeyboardMarkup(resize_keyboard=True)
+
+def create_channel_join_menu():
+    """Create channel join menu with error handling"""
+    try:
+        markup = InlineKeyboardMarkup(row_width=1)
+        for channel in REQUIRED_CHANNELS:
+            markup.add(InlineKeyboardButton(
+                text="🚀 Join Now",
+                url=f"https://t.me/{channel['username'][1:]}"
+            ))
+        markup.add(InlineKeyboardButton(
+            text="✅ Verify Now",
+            callback_data="verify_channels"
+        ))
+        return markup
+    except Exception as e:
+        logger.error(f"Error creating channel menu: {str(e)}")
+        return InlineKeyboardMarkup()
+
+def create_admin_panel():
+    """Create admin panel with error handling"""
+    try:
+        markup = InlineKeyboardMarkup()
+        markup.row(
+            InlineKeyboardButton("Block User", callback_data="admin_block"),
+            InlineKeyboardButton("Unblock User", callback_data="admin_unblock")
+        )
+        markup.row(
+            InlineKeyboardButton("Approve User", callback_data="admin_approve")
+        )
+        return markup
+    except Exception as e:
+        logger.error(f"Error creating admin panel: {str(e)}")
+        return InlineKeyboardMarkup()
+
+def ultra_safe_send_message(chat_id, text, reply_markup=None, parse_mode=None, max_retries=5):
+    """Ultra safe message sending with comprehensive error handling; returns the sent Message or False"""
+    for attempt in range(max_retries):
+        try:
+            if not bot:
+                return False
+
+            # Truncate message if too long
+            if len(text) > 4096:
+                text = text[:4093] + "..."
+
+            return bot.send_message(chat_id, text, reply_markup=reply_markup, parse_mode=parse_mode)
+
+        except telebot.apihelper.ApiTelegramException as e:
+            error_msg = str(e).lower()
+
+            if "blocked" in error_msg or "chat not found" in error_msg:
+                logger.warning(f"User {chat_id} blocked bot or chat not found")
+                return False
+            elif "rate" in error_msg or "too many" in error_msg:
+                wait_time = min(2 ** attempt, 30)
+                logger.warning(f"Rate limited, waiting {wait_time}s")
+                time.sleep(wait_time)
+                continue
+            elif "message is too long" in error_msg:
+                text = text[:4000] + "..."
+                continue
+            elif "can't parse" in error_msg:
+                parse_mode = None
+                continue
+            else:
+                if attempt < max_retries - 1:
+                    time.sleep(2 ** attempt)
+                    continue
+                logger.error(f"Telegram API error after {max_retries} attempts: {str(e)}")
+                return False
+
+        except Exception as e:
+            if attempt < max_retries - 1:
+                time.sleep(2 ** attempt)
+                continue
+            logger.error(f"Failed to send message after {max_retries} attempts: {str(e)}")
+            return False
+
+    return False
+
+# Alias for backward compatibility
+safe_send_message = ultra_safe_send_message
+
+def twilio_operation(method, url):
+    """Classify a Twilio REST request into one of the bot's operations"""
+    method = method.upper()
+    if method == "DELETE":
+        return "delete"
+    if "/AvailablePhoneNumbers/" in url:
+        return "search"
+    if "/IncomingPhoneNumbers" in url and method == "POST":
+        return "buy"
+    if "/Messages" in url:
+        return "list_messages"
+    if re.search(r"/Accounts(/AC[0-9A-Za-z]+)?\.json", url):
+        return "validate"
+    return "default"
+
+class TwilioTimeout(tuple):
+    """(connect, read) timeout that requests accepts and TwilioHttpClient's `timeout <= 0` check tolerates"""
+
+    def __new__(cls, connect, read):
+        return super().__new__(cls, (connect, read))
+
+    def __le__(self, other):
+        return min(self) <= other
+
+class TwilioRateLimited(Exception):
+    """Raised when an account's rate limit would hold a request longer than TWILIO_RATE_MAX_WAIT"""
+
+class TokenBucket:
+    """Thread-safe token bucket; a Retry-After can block it until a given time"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.time()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self, max_wait):
+        """Take one token and return how long to wait before using it"""
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(-(self.tokens - 1) / self.rate if self.tokens < 1 else 0.0, self.blocked_until - now)
+            if wait > max_wait:
+                raise TwilioRateLimited(f"Too many requests (429): rate limit would delay this request {wait:.1f}s")
+            self.tokens -= 1
+            return wait
+
+    def block(self, seconds):
+        """Hold back all requests for the given number of seconds"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.time() + seconds)
+
+def get_rate_limiter(sid):
+    """Token bucket shared by every request made with this account"""
+    with twilio_rate_limiters_lock:
+        limiter = twilio_rate_limiters.get(sid)
+        if limiter is None:
+            limiter = twilio_rate_limiters[sid] = TokenBucket(TWILIO_RATE_PER_ACCOUNT, TWILIO_RATE_BURST)
+        return limiter
+
+def retry_after_seconds(headers, attempt):
+    """Seconds from a Retry-After header, or exponential backoff when absent"""
+    value = (headers or {}).get("Retry-After") or (headers or {}).get("retry-after")
+    try:
+        return min(float(value), TWILIO_RATE_MAX_WAIT)
+    except (TypeError, ValueError):
+        return min(2 ** attempt, TWILIO_RATE_MAX_WAIT)
+
+def is_throttling_error(error):
+    """True for Twilio 429 / 20429 and local rate-limit rejections"""
+    if isinstance(error, TwilioRateLimited):
+        return True
+    if getattr(error, "status", None) == 429 or getattr(error, "code", None) == 20429:
+        return True
+    error_msg = str(error).lower()
+    return any(marker in error_msg for marker in ("http 429", "(429)", "20429", "too many requests", "rate limit"))
+
+def note_throttled_response(limiter, response, attempt, operation, account_sid):
+    """Twilio answered 429: hold the whole account back for Retry-After"""
+    twilio_rate_stats["throttled_responses"] += 1
+    delay = retry_after_seconds(response.headers, attempt)
+    limiter.block(delay)
+    logger.warning(f"🚦 Twilio throttled {operation} for {str(account_sid)[:10]}..., backing off {delay:.1f}s")
+    if attempt < TWILIO_THROTTLE_RETRIES:
+        twilio_rate_stats["retried"] += 1
+
+class BotTwilioHttpClient(TwilioHttpClient):
+    """TwilioHttpClient with per-operation timeouts, per-account rate limiting and 429 retries"""
+
+    def request(self, method, url, params=None, data=None, headers=None, auth=None, timeout=None, allow_redirects=False):
+        operation = twilio_operation(method, url)
+        if timeout is None:
+            timeout = TwilioTimeout(TWILIO_CONNECT_TIMEOUT, TWILIO_READ_TIMEOUTS.get(operation, TWILIO_REQUEST_TIMEOUT))
+
+        account_sid = auth[0] if auth else None
+        limiter = get_rate_limiter(account_sid)
+
+        for attempt in range(TWILIO_THROTTLE_RETRIES + 1):
+            try:
+                wait = limiter.reserve(TWILIO_RATE_MAX_WAIT)
+            except TwilioRateLimited:
+                twilio_rate_stats["rejected"] += 1
+                raise
+            if wait > 0:
+                twilio_rate_stats["delayed"] += 1
+                twilio_rate_stats["wait_seconds"] += wait
+                time.sleep(wait)
+
+            response = self._send(operation, method, url, params, data, headers, auth, timeout, allow_redirects)
+            if response.status_code != 429:
+                return response
+
+            note_throttled_response(limiter, response, attempt, operation, account_sid)
+        return response
+
+    def _send(self, operation, method, url, params, data, headers, auth, timeout, allow_redirects):
+        """One HTTP round trip with timeout and in-flight accounting"""
+        with twilio_http_stats_lock:
+            stats = twilio_http_stats.setdefault(operation, {"requests": 0, "timeouts": 0})
+            stats["requests"] += 1
+
+        account_sid = auth[0] if auth else None
+        with twilio_inflight_lock:
+            twilio_inflight[account_sid] = twilio_inflight.get(account_sid, 0) + 1
+        try:
+            return super().request(method, url, params=params, data=data, headers=headers, auth=auth,
+                                   timeout=timeout, allow_redirects=allow_redirects)
+        except requests.exceptions.Timeout:
+            with twilio_http_stats_lock:
+                stats["timeouts"] += 1
+            logger.warning(f"⏱️ Twilio {operation} request timed out ({timeout[0]}s connect / {timeout[1]}s read)")
+            raise
+        finally:
+            with twilio_inflight_lock:
+                twilio_inflight[account_sid] -= 1
+                if not twilio_inflight[account_sid]:
+                    del twilio_inflight[account_sid]
+
+def _close_twilio_client(client):
+    """Close the HTTP session held by a Twilio client"""
+    try:
+        session = getattr(client.http_client, "session", None)
+        if session is not None:
+            session.close()
+    except Exception as e:
+        logger.warning(f"Error closing Twilio client session: {str(e)}")
+
+def get_twilio_client(sid, auth_token):
+    """Return the pooled Twilio client for this account, creating it on first use"""
+    global twilio_clients_last_sweep
+    now = time.time()
+    if now - twilio_clients_last_sweep > 60:
+        twilio_clients_last_sweep = now
+        evict_idle_twilio_clients()
+
+    evicted = []
+    with twilio_clients_lock:
+        entry = twilio_clients.get(sid)
+        if entry is not None and entry["auth_token"] == auth_token:
+            entry["last_used"] = now
+            entry["uses"] += 1
+            twilio_clients.move_to_end(sid)
+            twilio_client_stats["reused"] += 1
+            return entry["client"]
+
+        if entry is not None:
+            # Credentials changed for this SID: drop the stale client
+            evicted.append(twilio_clients.pop(sid)["client"])
+            twilio_client_stats["evicted_removed"] += 1
+
+        # Per-operation timeouts on the client instead of a process-wide socket default
+        client = Client(sid, auth_token, http_client=BotTwilioHttpClient())
+        twilio_clients[sid] = {"auth_token": auth_token, "client": client, "last_used": now, "uses": 1}
+        twilio_client_stats["created"] += 1
+
+        while len(twilio_clients) > TWILIO_CLIENT_POOL_SIZE:
+            _, oldest = twilio_clients.popitem(last=False)
+            evicted.append(oldest["client"])
+            twilio_client_stats["evicted_size"] += 1
+
+    for old_client in evicted:
+        _close_twilio_client(old_client)
+    return client
+
+def evict_twilio_client(sid, reason="removed"):
+    """Remove a client from the pool (logout, credential removal, invalid credentials)"""
+    with twilio_clients_lock:
+        entry = twilio_clients.pop(sid, None)
+        if entry is not None:
+            twilio_client_stats["evicted_removed"] += 1
+    if entry is not None:
+        _close_twilio_client(entry["client"])
+        logger.info(f"Evicted Twilio client {sid[:10]}... ({reason})")
+    if async_engine.loop is not None:
+        async_engine.loop.call_soon_threadsafe(async_engine.evict, sid)
+
+def evict_idle_twilio_clients():
+    """Drop clients unused for TWILIO_CLIENT_IDLE_TTL seconds"""
+    cutoff = time.time() - TWILIO_CLIENT_IDLE_TTL
+    evicted = []
+    with twilio_clients_lock:
+        for sid in [sid for sid, entry in twilio_clients.items() if entry["last_used"] < cutoff]:
+            evicted.append(twilio_clients.pop(sid)["client"])
+            twilio_client_stats["evicted_idle"] += 1
+    for client in evicted:
+        _close_twilio_client(client)
+    return len(evicted)
+
+def session_account_sids(session):
+    """All account SIDs a user's session data refers to"""
+    if not session:
+        return set()
+    sids = {account["sid"] for account in session.get("bulk_accounts", []) if account.get("sid")}
+    if session.get("sid"):
+        sids.add(session["sid"])
+    return sids
+
+def evict_session_twilio_clients(session, keep_sids=()):
+    """Evict pooled clients of a user's accounts, except shared pool accounts and keep_sids"""
+    pool_sids = {account["sid"] for account in twilio_account_pool if account["sid"]}
+    for sid in session_account_sids(session) - pool_sids - set(keep_sids):
+        evict_twilio_client(sid, "logout")
+
+def twilio_connection_stats():
+    """Connection reuse numbers from the pooled clients' HTTP sessions"""
+    connections = 0
+    requests_sent = 0
+    with twilio_clients_lock:
+        clients = [entry["client"] for entry in twilio_clients.values()]
+    for client in clients:
+        session = getattr(client.http_client, "session", None)
+        if session is None:
+            continue
+        for adapter in session.adapters.values():
+            pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+            if pools is None:
+                continue
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += getattr(pool, "num_connections", 0)
+                    requests_sent += getattr(pool, "num_requests", 0)
+    return {"clients": len(clients), "connections": connections, "requests": requests_sent}
+
+def check_account_status(twilio_client):
+    """Check Twilio account status with enhanced error handling"""
+    try:
+        # Single-account lookup instead of listing every (sub)account
+        account = twilio_client.api.accounts(twilio_client.account_sid).fetch()
+        if account.status == 'active':
+            return True, "Account is active"
+        elif account.status == 'suspended':
+            return False, "Account has been suspended. Please use a different account."
+        else:
+            return False, f"Account status: {account.status}. Please use a different account."
+    except AttributeError:
+        return False, "Could not retrieve Twilio account information. Please check your credentials."
+    except Exception as e:
+        error_msg = str(e)
+        if is_throttling_error(e):
+            return False, "Twilio rate limit reached (429). Please try again shortly."
+        elif "authenticate" in error_msg.lower():
+            return False, "Invalid Twilio credentials. Please provide correct information."
+        elif "not found" in error_msg.lower():
+            return False, "Twilio account not found. Please use a different account."
+        else:
+            return False, "Problem checking Twilio account. Please try again."
+
+def is_account_auth_error(error):
+    """True for authentication / suspension failures (as opposed to transient errors)"""
+    status = getattr(error, "status", None)
+    code = getattr(error, "code", None)
+    if status in (401, 403) or code in (20003, 20005, 20006, 10001):
+        return True
+    error_msg = str(error).lower()
+    return any(marker in error_msg for marker in ("authenticate", "suspended", "account is not active", "account is restricted"))
+
+def _breaker_entry(sid):
+    """Breaker record for an account; caller holds account_breakers_lock"""
+    entry = account_breakers.get(sid)
+    if entry is None:
+        entry = {"state": "closed", "failures": 0, "opened_at": 0.0, "last_probe": 0.0, "last_error": ""}
+        account_breakers[sid] = entry
+    elif entry["state"] == "open" and time.time() - entry["opened_at"] >= BREAKER_OPEN_SECONDS:
+        # Cool-down over: let one probe or request through
+        entry["state"] = "half_open"
+    return entry
+
+def account_breaker_state(sid):
+    """closed / open / half_open for an account SID"""
+    with account_breakers_lock:
+        return _breaker_entry(sid)["state"]
+
+def is_account_available(sid):
+    """True unless the account's breaker is open"""
+    return account_breaker_state(sid) != "open"
+
+def record_account_success(sid):
+    """Close the breaker after a successful probe or request"""
+    with account_breakers_lock:
+        entry = _breaker_entry(sid)
+        recovered = entry["state"] != "closed"
+        entry["state"] = "closed"
+        entry["failures"] = 0
+        entry["last_error"] = ""
+        if recovered:
+            breaker_stats["recovered"] += 1
+    if recovered:
+        logger.info(f"🟢 Twilio account {sid[:10]}... recovered, breaker closed")
+        refresh_healthy_pool()
+
+def record_account_failure(sid, reason="Unknown error"):
+    """Count a failure; open the breaker on auth errors, after a failed trial or past the threshold"""
+    if is_throttling_error(reason):
+        # Rate limiting says nothing about the account's health
+        logger.info(f"🚦 Twilio account {sid[:10]}... throttled, not counted as a failure")
+        return
+    with account_breakers_lock:
+        entry = _breaker_entry(sid)
+        entry["failures"] += 1
+        entry["last_error"] = str(reason)[:100]
+        should_open = entry["state"] == "half_open" or is_account_auth_error(reason) \
+            or entry["failures"] >= BREAKER_FAILURE_THRESHOLD
+        opened = should_open and entry["state"] != "open"
+        if should_open:
+            entry["state"] = "open"
+            entry["opened_at"] = time.time()
+        if opened:
+            breaker_stats["opened"] += 1
+    if opened:
+        logger.warning(f"🔴 Twilio account {sid[:10]}... breaker opened: {str(reason)[:100]}")
+        refresh_healthy_pool()
+
+def refresh_healthy_pool():
+    """Recompute which pool accounts may take traffic"""
+    global healthy_pool_indices
+    healthy_pool_indices = tuple(
+        index for index, account in enumerate(twilio_account_pool)
+        if account["sid"] and account["auth_token"] and is_account_available(account["sid"])
+    )
+    return healthy_pool_indices
+
+def probe_targets():
+    """All distinct (sid, auth_token) pairs in the global pool and users' bulk pools"""
+    targets = {}
+    for account in twilio_account_pool:
+        if account["sid"] and account["auth_token"]:
+            targets[account["sid"]] = account["auth_token"]
+    for user_id in user_data.keys():
+        session = user_data.get(user_id) or {}
+        for account in session.get("bulk_accounts", []):
+            targets.setdefault(account["sid"], account["auth_token"])
+    return targets
+
+def probe_account(sid, auth_token):
+    """Check one account and feed the result to its breaker"""
+    status_ok, status_msg = check_account_status(get_twilio_client(sid, auth_token))
+    if not status_ok and is_throttling_error(status_msg):
+        # Throttled probe: neither healthy nor failed, try again next cycle
+        return None
+    with account_breakers_lock:
+        _breaker_entry(sid)["last_probe"] = time.time()
+        breaker_stats["probes"] += 1
+        if not status_ok:
+            breaker_stats["probe_failures"] += 1
+    if status_ok:
+        record_account_success(sid)
+    else:
+        record_account_failure(sid, status_msg)
+    return status_ok
+
+def account_prober_loop():
+    """Probe every known account once per ACCOUNT_PROBE_INTERVAL, at most ACCOUNT_PROBE_RATE per second"""
+    while True:
+        cycle_started = time.time()
+        try:
+            for sid, auth_token in probe_targets().items():
+                # Open breakers wait out their cool-down; probing early would only fail again
+                if account_breaker_state(sid) == "open":
+                    continue
+                try:
+                    probe_account(sid, auth_token)
+                except Exception as e:
+                    record_account_failure(sid, e)
+                time.sleep(1.0 / ACCOUNT_PROBE_RATE)
+            refresh_healthy_pool()
+        except Exception as e:
+            logger.error(f"Account prober error: {str(e)}")
+        account_prober_wakeup.wait(max(1.0, ACCOUNT_PROBE_INTERVAL - (time.time() - cycle_started)))
+        account_prober_wakeup.clear()
+
+def start_account_prober():
+    """Start the background account prober once"""
+    global account_prober_thread
+    if account_prober_thread is not None:
+        return
+    with account_breakers_lock:
+        if account_prober_thread is not None:
+            return
+        account_prober_thread = threading.Thread(target=account_prober_loop, name="account-prober", daemon=True)
+        account_prober_thread.start()
+
+def validate_bulk_account(line_number, line):
+    """Validate one bulk login line with a single REST call.
+
+    Returns (line_number, account, error_detail); account is None when invalid.
+    """
+    try:
+        credentials = line.strip().split()
+
+        # Validate format
+        if len(credentials) < 2:
+            return line_number, None, f"Line {line_number}: Incomplete data (SID and Token required)"
+        # Take first two parts if more than 2 parts exist
+        sid, auth_token = credentials[:2]
+
+        validation_errors = []
+
+        # Check SID format
+        if not sid.startswith('AC'):
+            validation_errors.append("SID must start with 'AC'")
+        if len(sid) != 34:  # Twilio SID is exactly 34 characters
+            validation_errors.append(f"SID length invalid ({len(sid)} chars, expected exactly 34)")
+
+        # Check Auth Token format
+        if len(auth_token) != 32:  # Twilio Auth Token is exactly 32 characters
+            validation_errors.append(f"Auth Token length invalid ({len(auth_token)} chars, expected exactly 32)")
+
+        # Check for valid characters (alphanumeric only)
+        if not re.match(r'^AC[A-Za-z0-9]{32}$', sid):
+            validation_errors.append("SID format invalid (should be AC followed by 32 alphanumeric chars)")
+        if not re.match(r'^[A-Za-z0-9]{32}$', auth_token):
+            validation_errors.append("Auth Token format invalid (should be 32 alphanumeric chars)")
+
+        if validation_errors:
+            return line_number, None, f"Line {line_number}: Format issues - {', '.join(validation_errors)}"
+
+        # One fetch both authenticates and returns the account status
+        try:
+            account = get_twilio_client(sid, auth_token).api.accounts(sid).fetch()
+        except Exception as api_error:
+            logger.error(f"Account API test error for line {line_number}: {str(api_error)}")
+            evict_twilio_client(sid, "invalid credentials")
+            api_error_msg = str(api_error).lower()
+            if "authenticate" in api_error_msg or "unauthorized" in api_error_msg or "401" in api_error_msg:
+                error_detail = f"Line {line_number}: Invalid Credentials - Invalid SID or Token"
+            elif "suspended" in api_error_msg:
+                error_detail = f"Line {line_number}: Account suspended"
+            elif "trial" in api_error_msg:
+                error_detail = f"Line {line_number}: Trial account - upgrade required"
+            elif "timeout" in api_error_msg or "timed out" in api_error_msg:
+                error_detail = f"Line {line_number}: Connection timeout - check network"
+            elif "network" in api_error_msg or "connection" in api_error_msg:
+                error_detail = f"Line {line_number}: Network problem - try again"
+            else:
+                error_detail = f"Line {line_number}: API error - {str(api_error)[:50]}"
+            return line_number, None, error_detail
+
+        if account.status == 'active':
+            # Seed the breaker so selection has a verdict before the first probe
+            record_account_success(sid)
+            logger.info(f"✅ Bulk account {line_number} validated successfully")
+            return line_number, {"sid": sid, "auth_token": auth_token, "status": "active"}, None
+
+        status_msg = "Account has been suspended. Please use a different account." if account.status == 'suspended' \
+            else f"Account status: {account.status}. Please use a different account."
+        logger.warning(f"❌ Bulk account {line_number} status failed: {status_msg}")
+        return line_number, None, f"Line {line_number}: Account status issue - {status_msg}"
+
+    except Exception as e:
+        logger.error(f"Processing error for line {line_number}: {str(e)}")
+        return line_number, None, f"Line {line_number}: Processing error - {str(e)[:30]}"
+
+def account_inflight(sid):
+    """Twilio requests currently in flight for an account"""
+    with twilio_inflight_lock:
+        return twilio_inflight.get(sid, 0)
+
+def get_next_working_account(user_id, exclude_sid=None):
+    """Get next working Twilio account from pool or user's bulk accounts with automatic failover"""
+    global twilio_account_pool, user_account_index
+
+    # Check if user has bulk accounts first
+    session = user_data.get(user_id)
+    if session and session.get("using_bulk_pool", False):
+        bulk_accounts = session.get("bulk_accounts", [])
+        current_bulk_index = session.get("current_bulk_index", 0)
+
+        # Health comes from the background prober; no REST call on the request path
+        for attempt in range(len(bulk_accounts)):
+            current_index = (current_bulk_index + attempt) % len(bulk_accounts)
+            account = bulk_accounts[current_index]
+
+            if account["sid"] == exclude_sid or not is_account_available(account["sid"]):
+                continue
+
+            if current_index != current_bulk_index:
+                update_user_data(user_id, current_bulk_index=current_index)
+            logger.info(f"Using bulk account #{current_index + 1} for user {user_id}")
+            return account["sid"], account["auth_token"], current_index + 1
+
+        # No working bulk account found
+        return None, None, None
+
+    # Use global pool if no bulk accounts
+    healthy = healthy_pool_indices or refresh_healthy_pool()
+    current_index = user_account_index.get(user_id, 0)
+
+    # Stay on the current account while it is healthy, otherwise take the next healthy one
+    candidates = [index for index in healthy if twilio_account_pool[index]["sid"] != exclude_sid]
+    if not candidates:
+        return None, None, None
+    if current_index not in candidates or user_id not in user_account_index:
+        if current_index not in candidates:
+            later = [index for index in candidates if index > current_index]
+            current_index = later[0] if later else candidates[0]
+        user_account_index[user_id] = current_index
+        logger.info(f"Using Twilio account #{current_index + 1} for user {user_id}")
+
+    account = twilio_account_pool[current_index]
+    return account["sid"], account["auth_token"], current_index + 1
+
+def mark_account_as_failed(user_id, reason="Unknown error"):
+    """Record a failure on the current account and move to next"""
+    global twilio_account_pool, user_account_index
+
+    # Check if using bulk accounts
+    session = user_data.get(user_id)
+    if session and session.get("using_bulk_pool", False):
+        bulk_accounts = session.get("bulk_accounts", [])
+        current_bulk_index = session.get("current_bulk_index", 0)
+
+        if current_bulk_index < len(bulk_accounts):
+            failed_sid = bulk_accounts[current_bulk_index]["sid"]
+            record_account_failure(failed_sid, reason)
+            failure_kind = "throttled" if is_throttling_error(reason) else "marked as failed"
+            logger.warning(f"Bulk account #{current_bulk_index + 1} {failure_kind} for user {user_id}: {reason}")
+
+            # Try to get next working bulk account
+            next_sid, next_token, next_account_num = get_next_working_account(user_id, exclude_sid=failed_sid)
+            if next_sid:
+                logger.info(f"Switched to bulk account #{next_account_num} for user {user_id}")
+                return next_sid, next_token
+    else:
+        # Use global pool
+        if user_id in user_account_index:
+            current_index = user_account_index[user_id]
+            if current_index < len(twilio_account_pool):
+                failed_sid = twilio_account_pool[current_index]["sid"]
+                record_account_failure(failed_sid, reason)
+                failure_kind = "throttled" if is_throttling_error(reason) else "marked as failed"
+                logger.warning(f"Account #{current_index + 1} {failure_kind} for user {user_id}: {reason}")
+
+                # Try to get next working account
+                next_sid, next_token, next_account_num = get_next_working_account(user_id, exclude_sid=failed_sid)
+                if next_sid:
+                    logger.info(f"Switched to account #{next_account_num} for user {user_id}")
+                    return next_sid, next_token
+
+    return None, None
+
+class NoWorkingAccount(Exception):
+    """Every account the user could fail over to has failed"""
+
+def is_transient_twilio_error(error):
+    """Errors worth retrying on the same account: throttling, timeouts, connection errors, 5xx"""
+    if is_throttling_error(error):
+        return True
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError, asyncio.TimeoutError)):
+        return True
+    if aiohttp is not None and isinstance(error, aiohttp.ClientConnectionError):
+        return True
+    status = getattr(error, "status", None)
+    return isinstance(status, int) and status >= 500
+
+# Failures of the connection to Twilio itself, as opposed to errors raised by the bot's own code
+TWILIO_TRANSPORT_ERRORS = (requests.exceptions.RequestException, asyncio.TimeoutError, TimeoutError, ConnectionError)
+if aiohttp is not None:
+    TWILIO_TRANSPORT_ERRORS += (aiohttp.ClientError,)
+
+def is_account_failure(error):
+    """Errors that point at the account itself rather than at this one request"""
+    if is_account_auth_error(error):
+        return True
+    status = getattr(error, "status", None)
+    if not isinstance(status, int):
+        # No HTTP status: only transport failures count; a bug in the operation must not fail the account over
+        return isinstance(error, TWILIO_TRANSPORT_ERRORS)
+    error_msg = str(error).lower()
+    return "trial account" in error_msg or "account is restricted" in error_msg or "account is not active" in error_msg
+
+# Operations that create something on Twilio: a timed-out attempt may still have succeeded
+NON_IDEMPOTENT_TWILIO_OPERATIONS = {"buy"}
+
+def is_twilio_connect_error(error):
+    """The request never reached Twilio (connection refused, DNS, connect timeout)"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        reason = getattr(error.args[0], "reason", None)
+        return isinstance(reason, (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError))
+    if aiohttp is not None and isinstance(error, aiohttp.ClientConnectorError):
+        return True
+    # aiohttp >= 3.10 tells connect timeouts apart from read timeouts
+    connect_timeout = getattr(aiohttp, "ConnectionTimeoutError", None)
+    return connect_timeout is not None and isinstance(error, connect_timeout)
+
+def may_resend_operation(name, error):
+    """Whether a failed attempt may be sent again, on the same account or another one.
+
+    A create that timed out or hit a 5xx may already have taken effect, so those are only
+    resent when Twilio never saw the request or rejected it outright (429, 4xx).
+    """
+    if name not in NON_IDEMPOTENT_TWILIO_OPERATIONS:
+        return True
+    if is_throttling_error(error) or is_twilio_connect_error(error):
+        return True
+    status = getattr(error, "status", None)
+    return isinstance(status, int) and status < 500
+
+def operation_stats(name):
+    """Counters for one named Twilio operation; caller holds twilio_operation_stats_lock"""
+    return twilio_operation_stats.setdefault(name, {
+        "calls": 0, "attempts": 0, "retries": 0, "failovers": 0, "failures": 0, "latencies": deque(maxlen=500),
+    })
+
+def record_operation_attempt(name, latency, outcome):
+    """Per-attempt latency and outcome for one named Twilio operation"""
+    with twilio_operation_stats_lock:
+        stats = operation_stats(name)
+        stats["attempts"] += 1
+        stats["latencies"].append(latency)
+        if outcome in stats:
+            stats[outcome] += 1
+        return stats
+
+def retry_delay(attempt):
+    """Full-jitter backoff, so users sharing an account do not retry in lockstep"""
+    return random.uniform(0, min(TWILIO_RETRY_MAX_DELAY, TWILIO_RETRY_BASE_DELAY * 2 ** attempt))
+
+def fail_over_operation(user_id, name, error, tried_sids):
+    """Move a bulk-pool user to the next working account after a failed operation, or re-raise"""
+    credentials = user_data[user_id]
+    if not credentials.get("using_bulk_pool", False) or not (is_transient_twilio_error(error) or is_account_failure(error)):
+        raise error
+    if not may_resend_operation(name, error):
+        raise error
+
+    logger.warning(f"Account failed during {name} for user {user_id}, trying auto failover: {str(error)}")
+    new_sid, new_token = mark_account_as_failed(user_id, str(error))
+    if not new_sid or new_sid in tried_sids:
+        raise NoWorkingAccount(f"All bulk accounts failed during {name}: {str(error)}")
+
+    update_user_data(user_id, sid=new_sid, auth_token=new_token)
+    with twilio_operation_stats_lock:
+        operation_stats(name)["failovers"] += 1
+    return new_sid, new_token, user_data[user_id].get("current_bulk_index", 0) + 1
+
+def run_twilio_operation(user_id, name, operation, on_failover=None, async_operation=None):
+    """Run operation(twilio_client) with the user's account.
+
+    Transient errors are retried on the same account with jittered backoff; account
+    failures move a bulk-pool user to the next working account until the pool is
+    exhausted (NoWorkingAccount). Request-specific errors are raised unchanged, and so
+    are errors after which a NON_IDEMPOTENT_TWILIO_OPERATIONS request may have gone through.
+    With IO_ENGINE=asyncio, async_operation runs on the asyncio engine instead.
+    """
+    if async_operation is not None and async_engine.enabled:
+        return async_engine.run(run_twilio_operation_async(user_id, name, async_operation, on_failover))
+
+    credentials = user_data[user_id]
+    sid, auth_token = credentials['sid'], credentials['auth_token']
+    with twilio_operation_stats_lock:
+        operation_stats(name)["calls"] += 1
+
+    tried_sids = set()
+    while True:
+        tried_sids.add(sid)
+        twilio_client = get_twilio_client(sid, auth_token)
+
+        for attempt in range(TWILIO_OPERATION_RETRIES + 1):
+            started = time.time()
+            try:
+                result = operation(twilio_client)
+                record_operation_attempt(name, time.time() - started, "ok")
+                return result
+            except Exception as e:
+                error = e
+                if not is_transient_twilio_error(e) or not may_resend_operation(name, e) or attempt == TWILIO_OPERATION_RETRIES:
+                    record_operation_attempt(name, time.time() - started, "failures")
+                    break
+                record_operation_attempt(name, time.time() - started, "retries")
+                delay = retry_delay(attempt)
+                logger.warning(f"Twilio {name} failed for user {user_id} (attempt {attempt + 1}), retrying in {delay:.2f}s: {str(e)}")
+                time.sleep(delay)
+
+        sid, auth_token, account_number = fail_over_operation(user_id, name, error, tried_sids)
+        if on_failover:
+            on_failover(account_number)
+
+async def run_twilio_operation_async(user_id, name, operation, on_failover=None):
+    """run_twilio_operation on the asyncio engine: awaits operation(client), backs off without blocking"""
+    credentials = user_data[user_id]
+    sid, auth_token = credentials['sid'], credentials['auth_token']
+    with twilio_operation_stats_lock:
+        operation_stats(name)["calls"] += 1
+
+    tried_sids = set()
+    while True:
+        tried_sids.add(sid)
+        twilio_client = async_engine.twilio_client(sid, auth_token)
+
+        for attempt in range(TWILIO_OPERATION_RETRIES + 1):
+            started = time.time()
+            try:
+                result = await operation(twilio_client)
+                record_operation_attempt(name, time.time() - started, "ok")
+                return result
+            except Exception as e:
+                error = e
+                if not is_transient_twilio_error(e) or not may_resend_operation(name, e) or attempt == TWILIO_OPERATION_RETRIES:
+                    record_operation_attempt(name, time.time() - started, "failures")
+                    break
+                record_operation_attempt(name, time.time() - started, "retries")
+                delay = retry_delay(attempt)
+                logger.warning(f"Twilio {name} failed for user {user_id} (attempt {attempt + 1}), retrying in {delay:.2f}s: {str(e)}")
+                await asyncio.sleep(delay)
+
+        sid, auth_token, account_number = fail_over_operation(user_id, name, error, tried_sids)
+        if on_failover:
+            # Handler callbacks are synchronous Telegram calls; keep them off the event loop
+            await asyncio.to_thread(on_failover, account_number)
+
+if AsyncTwilioHttpClient is not None:
+    class AsyncTwilioTimeout(aiohttp.ClientTimeout):
+        """aiohttp timeout that AsyncTwilioHttpClient's `timeout <= 0` check tolerates"""
+
+        def __le__(self, other):
+            return False
+
+    class BotAsyncTwilioHttpClient(AsyncTwilioHttpClient):
+        """AsyncTwilioHttpClient with the same timeouts, rate limiting and 429 handling as BotTwilioHttpClient"""
+
+        async def request(self, method, url, params=None, data=None, headers=None, auth=None, timeout=None, allow_redirects=False):
+            operation = twilio_operation(method, url)
+            if timeout is None:
+                timeout = AsyncTwilioTimeout(connect=TWILIO_CONNECT_TIMEOUT,
+                                             sock_read=TWILIO_READ_TIMEOUTS.get(operation, TWILIO_REQUEST_TIMEOUT))
+
+            account_sid = auth[0] if auth else None
+            limiter = get_rate_limiter(account_sid)
+
+            for attempt in range(TWILIO_THROTTLE_RETRIES + 1):
+                try:
+                    wait = limiter.reserve(TWILIO_RATE_MAX_WAIT)
+                except TwilioRateLimited:
+                    twilio_rate_stats["rejected"] += 1
+                    raise
+                if wait > 0:
+                    twilio_rate_stats["delayed"] += 1
+                    twilio_rate_stats["wait_seconds"] += wait
+                    await asyncio.sleep(wait)
+
+                with twilio_http_stats_lock:
+                    stats = twilio_http_stats.setdefault(operation, {"requests": 0, "timeouts": 0})
+                    stats["requests"] += 1
+                with twilio_inflight_lock:
+                    twilio_inflight[account_sid] = twilio_inflight.get(account_sid, 0) + 1
+                try:
+                    response = await super().request(method, url, params=params, data=data, headers=headers, auth=auth,
+                                                     timeout=timeout, allow_redirects=allow_redirects)
+                except asyncio.TimeoutError:
+                    with twilio_http_stats_lock:
+                        stats["timeouts"] += 1
+                    logger.warning(f"⏱️ Twilio {operation} request timed out ({timeout.connect}s connect / {timeout.sock_read}s read)")
+                    raise
+                finally:
+                    with twilio_inflight_lock:
+                        twilio_inflight[account_sid] -= 1
+                        if not twilio_inflight[account_sid]:
+                            del twilio_inflight[account_sid]
+
+                if response.status_code != 429:
+                    return response
+                note_throttled_response(limiter, response, attempt, operation, account_sid)
+            return response
+
+def gevent_threading_patched():
+    """True when gevent has monkey-patched threading (gunicorn --worker-class gevent)"""
+    gevent_monkey = sys.modules.get("gevent.monkey")
+    return gevent_monkey is not None and gevent_monkey.is_module_patched("threading")
+
+class AsyncEngine:
+    """Event loop thread that runs Twilio operations as coroutines; handlers wait on run()"""
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.lock = threading.Lock()
+        # sid -> (auth_token, client), least recently used first; touched only on the loop
+        self.twilio_clients = OrderedDict()
+        self.stats = {"operations": 0}
+        self.gevent_warned = False
+
+    @property
+    def enabled(self):
+        if IO_ENGINE != "asyncio" or AsyncTwilioHttpClient is None:
+            return False
+        # An asyncio loop in a gevent-patched "thread" shares the gevent hub; that combination is not supported
+        if gevent_threading_patched():
+            if not self.gevent_warned:
+                self.gevent_warned = True
+                logger.warning("IO_ENGINE=asyncio is not supported under gevent monkey-patching; using threads")
+            return False
+        return True
+
+    def start(self):
+        """Start the event loop thread once"""
+        if self.loop is not None:
+            return
+        with self.lock:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=loop.run_forever, name="asyncio-engine", daemon=True)
+            self.thread.start()
+            self.loop = loop
+
+    def submit(self, coroutine):
+        """Schedule a coroutine on the engine loop; returns a concurrent.futures.Future"""
+        self.start()
+        self.stats["operations"] += 1
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine, timeout=None):
+        """Run a coroutine on the engine loop and wait for it from a handler thread"""
+        return self.submit(coroutine).result(timeout)
+
+    def twilio_client(self, sid, auth_token):
+        """Pooled async Twilio client for an account (call from the engine loop only)"""
+        entry = self.twilio_clients.get(sid)
+        if entry is not None and entry[0] == auth_token:
+            self.twilio_clients.move_to_end(sid)
+            return entry[1]
+        if entry is not None:
+            self.evict(sid)
+
+        client = Client(sid, auth_token, http_client=BotAsyncTwilioHttpClient())
+        self.twilio_clients[sid] = (auth_token, client)
+        while len(self.twilio_clients) > TWILIO_CLIENT_POOL_SIZE:
+            self.evict(next(iter(self.twilio_clients)))
+        return client
+
+    def evict(self, sid):
+        """Drop an async client and close its aiohttp session (call from the engine loop only)"""
+        entry = self.twilio_clients.pop(sid, None)
+        if entry is not None:
+            self.loop.create_task(entry[1].http_client.close())
+
+async_engine = AsyncEngine()
+
+def number_search_plan(mode, pattern):
+    """Ordered (list() kwargs, fallback_only) queries for a search mode and pattern.
+
+    Shared by the thread and asyncio engines so both run exactly the same search.
+    """
+    filters = {"sms_enabled": True, "voice_enabled": True}
+    if mode in ["search_ca_numbers", "search_us_numbers"] and len(pattern) == 3:
+        # Area code search for CA or US
+        return [({"area_code": pattern, "limit": 50, **filters}, False)]
+    # Default behavior for backward compatibility
+    if len(pattern) == 3:
+        return [({"area_code": pattern, "limit": 50, **filters}, False)]
+    return [({"contains": pattern, "limit": 50, **filters}, False)]
+
+def target_search_plan(pattern):
+    """(country, resource, list() kwargs) queries a target pattern fans out to"""
+    filters = {"contains": pattern, "limit": TARGET_SEARCH_WANTED, "sms_enabled": True, "voice_enabled": True}
+    plan = [(country, resource, dict(filters)) for country in TARGET_SEARCH_COUNTRIES for resource in TARGET_SEARCH_RESOURCES]
+    plan.extend((country, "local", {**filters, "area_code": area_code}) for country, area_code in TARGET_SEARCH_AREA_CODES)
+    return plan
+
+def rank_target_matches(numbers, pattern):
+    """Best matches first: pattern ending the number, then inside the last 7 digits, then anywhere"""
+    def match_rank(number):
+        digits = number.lstrip("+")
+        position = digits.rfind(pattern)
+        if position < 0:
+            return (3, 0)
+        if digits.endswith(pattern):
+            return (0, 0)
+        if position >= len(digits) - 7:
+            return (1, -position)
+        return (2, -position)
+    return sorted(numbers, key=match_rank)
+
+def merge_target_results(merged, numbers):
+    """Add phone numbers not yet seen; returns True once TARGET_SEARCH_WANTED is reached"""
+    for number in numbers:
+        merged.setdefault(number.phone_number, None)
+    return len(merged) >= TARGET_SEARCH_WANTED
+
+def search_target_numbers(twilio_client, pattern):
+    """Fan a target pattern out over target_search_plan concurrently; merged, de-duplicated and ranked"""
+    target_search_stats["searches"] += 1
+    plan = target_search_plan(pattern)
+    futures = [
+        target_search_executor.submit(getattr(twilio_client.available_phone_numbers(country), resource).list, **query)
+        for country, resource, query in plan
+    ]
+    target_search_stats["queries"] += len(futures)
+    merged, errors = {}, []
+    for future in as_completed(futures):
+        try:
+            enough = merge_target_results(merged, future.result())
+        except Exception as e:
+            target_search_stats["query_errors"] += 1
+            errors.append(e)
+            continue
+        if enough:
+            # Queries not started yet are dropped; running ones finish in the background
+            target_search_stats["early_stops"] += 1
+            target_search_stats["cancelled"] += sum(1 for pending in futures if pending.cancel())
+            break
+    if not merged and errors and len(errors) == len(futures):
+        raise errors[0]
+    return rank_target_matches(merged, pattern)[:TARGET_SEARCH_WANTED]
+
+async def search_target_numbers_async(twilio_client, pattern):
+    """search_target_numbers for the asyncio engine"""
+    target_search_stats["searches"] += 1
+    slots = asyncio.Semaphore(TARGET_SEARCH_WORKERS)
+
+    async def run_query(country, resource, query):
+        async with slots:
+            return await getattr(twilio_client.available_phone_numbers(country), resource).list_async(**query)
+
+    tasks = [asyncio.ensure_future(run_query(*entry)) for entry in target_search_plan(pattern)]
+    target_search_stats["queries"] += len(tasks)
+    merged, errors = {}, []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                enough = merge_target_results(merged, await next_done)
+            except Exception as e:
+                target_search_stats["query_errors"] += 1
+                errors.append(e)
+                continue
+            if enough:
+                target_search_stats["early_stops"] += 1
+                break
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+                target_search_stats["cancelled"] += 1
+    if not merged and errors and len(errors) == len(tasks):
+        raise errors[0]
+    return rank_target_matches(merged, pattern)[:TARGET_SEARCH_WANTED]
+
+def search_available_numbers(twilio_client, country_code, mode, pattern):
+    """Run the bot's number search for a mode and pattern; returns phone number strings"""
+    if mode == "target_numbers":
+        return search_target_numbers(twilio_client, pattern)
+    available_numbers = []
+    number_fetcher = twilio_client.available_phone_numbers(country_code).local
+    for query, fallback_only in number_search_plan(mode, pattern):
+        if not fallback_only:
+            available_numbers.extend(number_fetcher.list(**query))
+        elif not available_numbers:
+            try:
+                available_numbers.extend(number_fetcher.list(**query))
+            except:
+                pass
+    return [num.phone_number for num in available_numbers]
+
+async def search_available_numbers_async(twilio_client, country_code, mode, pattern):
+    """search_available_numbers for the asyncio engine"""
+    if mode == "target_numbers":
+        return await search_target_numbers_async(twilio_client, pattern)
+    available_numbers = []
+    number_fetcher = twilio_client.available_phone_numbers(country_code).local
+    for query, fallback_only in number_search_plan(mode, pattern):
+        if not fallback_only:
+            available_numbers.extend(await number_fetcher.list_async(**query))
+        elif not available_numbers:
+            try:
+                available_numbers.extend(await number_fetcher.list_async(**query))
+            except:
+                pass
+    return [num.phone_number for num in available_numbers]
+
+def inventory_lookup(key):
+    """Cached phone numbers for a search key, or None when missing or expired"""
+    now = time.time()
+    with inventory_lock:
+        entry = inventory_cache.get(key)
+        if entry is None:
+            inventory_stats["misses"] += 1
+            return None
+        age = now - entry["fetched_at"]
+        if age > INVENTORY_CACHE_TTL:
+            del inventory_cache[key]
+            inventory_stats["expired"] += 1
+            inventory_stats["misses"] += 1
+            return None
+        inventory_cache.move_to_end(key)
+        inventory_stats["hits"] += 1
+        inventory_stats["served_age"] += age
+        return list(entry["numbers"])
+
+def inventory_store(key, numbers):
+    """Cache a fresh search result"""
+    with inventory_lock:
+        inventory_cache[key] = {"numbers": list(numbers), "fetched_at": time.time()}
+        inventory_cache.move_to_end(key)
+        while len(inventory_cache) > INVENTORY_CACHE_SIZE:
+            inventory_cache.popitem(last=False)
+
+def inventory_remove_number(phone_number):
+    """Drop a purchased number from every cached search result"""
+    with inventory_lock:
+        for entry in inventory_cache.values():
+            if phone_number in entry["numbers"]:
+                entry["numbers"] = [number for number in entry["numbers"] if number != phone_number]
+                inventory_stats["removed"] += 1
+
+def inventory_record_query(key):
+    """Count a search so the prefetcher knows which patterns are popular"""
+    with inventory_lock:
+        query = inventory_queries.setdefault(key, {"score": 0.0})
+        query["score"] += 1
+    start_inventory_prefetcher()
+
+def prefetch_credentials():
+    """A healthy shared pool account for background prefetch, or (None, None).
+
+    Users' own accounts are never used: the results are shared with everyone.
+    """
+    for index in healthy_pool_indices:
+        account = twilio_account_pool[index]
+        if account["sid"] and account["auth_token"]:
+            return account["sid"], account["auth_token"]
+    return None, None
+
+def refresh_inventory(key, twilio_client):
+    """Search one inventory key on twilio_client and store the result; returns the numbers"""
+    country_code, mode, pattern = key
+    numbers = search_available_numbers(twilio_client, country_code, mode, pattern)
+    inventory_store(key, numbers)
+    return numbers
+
+def inventory_prefetcher_loop():
+    """Keep the most searched patterns warm so their next search is a cache hit"""
+    while True:
+        time.sleep(INVENTORY_PREFETCH_INTERVAL)
+        try:
+            with inventory_lock:
+                popular = sorted(inventory_queries.items(), key=lambda item: item[1]["score"], reverse=True)
+                popular = [key for key, query in popular[:INVENTORY_PREFETCH_TOP]
+                           if query["score"] >= INVENTORY_PREFETCH_MIN_QUERIES]
+                # Decay so yesterday's favourites stop being prefetched
+                for key in list(inventory_queries):
+                    inventory_queries[key]["score"] /= 2
+                    if inventory_queries[key]["score"] < 0.1:
+                        del inventory_queries[key]
+
+            for key in popular:
+                with inventory_lock:
+                    entry = inventory_cache.get(key)
+                    # Refresh anything that would expire before the next cycle
+                    if entry and time.time() - entry["fetched_at"] < INVENTORY_CACHE_TTL - INVENTORY_PREFETCH_INTERVAL:
+                        continue
+                sid, auth_token = prefetch_credentials()
+                if not sid:
+                    inventory_stats["prefetch_skipped"] += 1
+                    continue
+                try:
+                    twilio_client = get_twilio_client(sid, auth_token)
+                    # A user search already running for this key refreshes the cache too; share it
+                    number_search_flight.do(key, refresh_inventory, key, twilio_client)
+                    inventory_stats["prefetched"] += 1
+                except Exception as e:
+                    inventory_stats["prefetch_errors"] += 1
+                    logger.warning(f"Inventory prefetch failed for {key}: {str(e)}")
+        except Exception as e:
+            logger.error(f"Inventory prefetcher error: {str(e)}")
+
+def start_inventory_prefetcher():
+    """Start the popular-pattern prefetcher once"""
+    global inventory_prefetcher_thread
+    if inventory_prefetcher_thread is not None:
+        return
+    with inventory_lock:
+        if inventory_prefetcher_thread is not None:
+            return
+        inventory_prefetcher_thread = threading.Thread(target=inventory_prefetcher_loop, name="inventory-prefetcher", daemon=True)
+        inventory_prefetcher_thread.start()
+
+def pick_hedge_account(user_id):
+    """A healthy bulk account other than the user's current one, or None"""
+    session = user_data.get(user_id) or {}
+    if not session.get("using_bulk_pool", False):
+        return None
+    for account in session.get("bulk_accounts", []):
+        if account["sid"] != session.get("sid") and is_account_available(account["sid"]):
+            return account
+    return None
+
+def run_hedged_search(user_id, search, on_failover=None, async_search=None):
+    """Number search that sends the same query to a second bulk account when the first is slow.
+
+    Whichever account answers first wins; the slower request is left to finish in the background.
+    """
+    if not HEDGED_SEARCH_ENABLED:
+        return run_twilio_operation(user_id, "search", search, on_failover=on_failover, async_operation=async_search)
+
+    hedge_stats["searches"] += 1
+    # The primary starts at once on its own thread, so HEDGE_DELAY measures Twilio time, not queueing.
+    # The calling thread only waits, which leaves it free to return a hedge that answers first.
+    primary = Future()
+
+    def primary_request():
+        try:
+            primary.set_result(run_twilio_operation(user_id, "search", search, on_failover, async_search))
+        except Exception as e:
+            primary.set_exception(e)
+
+    threading.Thread(target=primary_request, name="hedged-search-primary", daemon=True).start()
+    done, _ = wait([primary], timeout=HEDGE_DELAY)
+    if done:
+        return primary.result()
+
+    hedge_account = pick_hedge_account(user_id)
+    if hedge_account is None:
+        hedge_stats["no_spare"] += 1
+        return primary.result()
+    if not hedge_slots.acquire(blocking=False):
+        hedge_stats["skipped_cap"] += 1
+        return primary.result()
+
+    def hedged_request():
+        started = time.time()
+        try:
+            result = search(get_twilio_client(hedge_account["sid"], hedge_account["auth_token"]))
+            record_operation_attempt("search_hedge", time.time() - started, "ok")
+            return result
+        except Exception:
+            record_operation_attempt("search_hedge", time.time() - started, "failures")
+            raise
+        finally:
+            hedge_slots.release()
+
+    hedge_stats["fired"] += 1
+    logger.info(f"🪁 Search for user {user_id} slower than {HEDGE_DELAY}s, hedging on {hedge_account['sid'][:10]}...")
+    hedge = hedge_executor.submit(hedged_request)
+
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                hedge_stats["hedge_won" if future is hedge else "primary_won"] += 1
+                return future.result()
+    # Both failed: the primary's error carries the failover outcome
+    return primary.result()
+
+def twilio_operation_percentiles(name):
+    """(p50, p95) attempt latency in milliseconds for a named operation"""
+    with twilio_operation_stats_lock:
+        latencies = sorted(twilio_operation_stats[name]["latencies"])
+    if not latencies:
+        return 0.0, 0.0
+    return latencies[len(latencies) // 2] * 1000, latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+
+# Phone numbers in pasted text: NANP (national, 1-, +1 or 001 prefixed) first, then other "+..." / "00..." numbers
+PHONE_NUMBER_RE = re.compile(
+    r"(?P<nanp>(?:(?:\+|(?<![\w+])00)1[ \t.-]?|(?<![\d+])(?:1[ \t.-]?)?)\(?\d{3}\)?[ \t.-]?\d{3}[ \t.-]?\d{4}(?!\d))"
+    r"|(?P<intl>(?:\+|(?<![\w+])00)\d[\d \t().-]{5,20}\d)"
+)
+PHONE_PUNCTUATION = str.maketrans("", "", "+ \t().-")
+
+WHATSAPP_NUMBER_RE = re.compile(r'\+?\d+')
+WHATSAPP_CODE_RE = re.compile(r'(\d{3}-\d{3})|(\d{3}[-]?\d{3})|(\d{4,6})')
+WHATSAPP_TIME_RE = re.compile(r'(\d{2}/\d{2}/\d{4} \d{2}:\d{2})')
+
+def international_number_prefix(candidate):
+    """Longest prefix of an international candidate, cut at a space, that is a valid E.164 number.
+
+    The pattern also swallows digit groups that follow on the same line ("+44 20 7946 0958 2024"),
+    so groups are dropped from the right until the rest fits. Returns (digits, prefix length) or None.
+    """
+    while True:
+        digits = candidate.translate(PHONE_PUNCTUATION)
+        if digits.startswith("00"):
+            digits = digits[2:]
+        # E.164 allows at most 15 digits; +1 numbers are left to the NANP branch
+        if 8 <= len(digits) <= 15 and digits[0] not in "01":
+            return digits, len(candidate)
+        cut = max(candidate.rfind(" "), candidate.rfind("\t"))
+        if cut <= 0:
+            return None
+        candidate = candidate[:cut].rstrip(" \t(.-")
+
+def extract_phone_numbers(text):
+    """Every phone number in text as E.164, de-duplicated in order of appearance, in one regex sweep"""
+    numbers = {}
+    position = 0
+    while True:
+        match = PHONE_NUMBER_RE.search(text, position)
+        if match is None:
+            break
+        position = match.end()
+        if match.lastgroup == "intl":
+            parsed = international_number_prefix(match.group())
+            if parsed is None:
+                continue
+            digits, length = parsed
+            # Digits cut off the end are scanned again: they may start the next number
+            position = match.start() + length
+        else:
+            digits = match.group().translate(PHONE_PUNCTUATION)
+            if digits.startswith("00"):
+                digits = digits[2:]
+            if len(digits) == 10:
+                digits = "1" + digits
+        numbers.setdefault("+" + digits, None)
+    return list(numbers)
+
+def extract_whatsapp_info(text):
+    """Extract WhatsApp info from text with error handling"""
+    try:
+        number_match = WHATSAPP_NUMBER_RE.search(text)
+        code_match = WHATSAPP_CODE_RE.search(text)
+        time_match = WHATSAPP_TIME_RE.search(text)
+
+        number = number_match.group(0) if number_match else None
+        code = code_match.group(0) if code_match else None
+        time_str = time_match.group(0) if time_match else None
+
+        return {'number': number, 'code': code, 'time': time_str}
+    except Exception as e:
+        logger.error(f"Error extracting WhatsApp info: {str(e)}")
+        return {'number': None, 'code': None, 'time': None}
+
+def format_sms_message(number, code, time_str):
+    """Format SMS message with error handling"""
+    try:
+        msg = f"📱 Number: {number}\n"
+        msg += f"🔑 Code: {code}\n"
+        msg += f"⏰ Time: {time_str}\n"
+
+        markup = InlineKeyboardMarkup()
+        if number:
+            markup.add(InlineKeyboardButton("Copy Number", callback_data=f"copy_number_{number}"))
+        if code:
+            markup.add(InlineKeyboardButton("Copy Code", callback_data=f"copy_code_{code}"))
+
+        return msg, markup
+    except Exception as e:
+        logger.error(f"Error formatting SMS message: {str(e)}")
+        return "Error formatting message", None
+
+def bulk_buy_accounts(user_id):
+    """Accounts a bulk buy may spread over: the session account, then the user's other healthy bulk accounts"""
+    session = user_data.get(user_id) or {}
+    accounts = [{"sid": session["sid"], "auth_token": session["auth_token"]}]
+    if session.get("using_bulk_pool", False):
+        accounts.extend(account for account in session.get("bulk_accounts", [])
+                        if account["sid"] != session["sid"] and is_account_available(account["sid"]))
+        if len(accounts) > 1 and not is_account_available(session["sid"]):
+            accounts.pop(0)
+    return accounts
+
+def purchase_on_accounts(phone_number, accounts, start):
+    """Buy one number starting on accounts[start]; moves on only when that account itself fails.
+
+    Returns (purchase record or None, last error or None).
+    """
+    last_error = None
+    for offset in range(len(accounts)):
+        account = accounts[(start + offset) % len(accounts)]
+        try:
+            purchased = get_twilio_client(account["sid"], account["auth_token"]).incoming_phone_numbers.create(phone_number=phone_number)
+        except Exception as e:
+            last_error = e
+            if not is_account_failure(e) or not may_resend_operation("buy", e):
+                break
+            record_account_failure(account["sid"], str(e)[:100])
+            bulk_buy_stats["account_failovers"] += 1
+            continue
+        record_account_success(account["sid"])
+        # The owning account's token is kept so the number can still be released after a re-login
+        return {"phone_number": purchased.phone_number, "sid": purchased.sid,
+                "account_sid": account["sid"], "auth_token": account["auth_token"]}, None
+    return None, last_error
+
+def bulk_buy_numbers(user_id, phone_numbers):
+    """Purchase numbers concurrently, round-robin over bulk_buy_accounts, and track them in the session.
+
+    Unlike a single Buy, the user's current number is kept. Returns [(phone_number, record or None, error or None)].
+    """
+    accounts = bulk_buy_accounts(user_id)
+    futures = [bulk_buy_executor.submit(purchase_on_accounts, phone_number, accounts, index % len(accounts))
+               for index, phone_number in enumerate(phone_numbers)]
+    results = [(phone_number, *future.result()) for phone_number, future in zip(phone_numbers, futures)]
+
+    purchased = [record for _, record, _ in results if record]
+    for record in purchased:
+        inventory_remove_number(record["phone_number"])
+    if purchased:
+        with purchased_numbers_lock:
+            session = user_data.get(user_id) or {}
+            update_user_data(user_id, purchased_numbers=session.get("purchased_numbers", []) + purchased)
+        # View SMS reads through the session account, so only a number bought there can become current
+        if not user_current_number.get(user_id):
+            for record in purchased:
+                if record["account_sid"] == session.get("sid"):
+                    user_current_number[user_id] = {"phone_number": record["phone_number"], "sid": record["sid"]}
+                    break
+    bulk_buy_stats["batches"] += 1
+    bulk_buy_stats["purchased"] += len(purchased)
+    bulk_buy_stats["failed"] += len(results) - len(purchased)
+    return results
+
+def user_numbers(user_id):
+    """Numbers the user owns through the bot: bulk purchases plus the current number, current first"""
+    session = user_data.get(user_id) or {}
+    records = list(session.get("purchased_numbers", []))
+    current = user_current_number.get(user_id)
+    if current and all(record["phone_number"] != current["phone_number"] for record in records):
+        records.append({"phone_number": current["phone_number"], "sid": current["sid"],
+                        "account_sid": session.get("sid"), "auth_token": session.get("auth_token")})
+    current_number = current["phone_number"] if current else None
+    return sorted(records, key=lambda record: record["phone_number"] != current_number)
+
+def find_user_number(user_id, phone_number):
+    """The user_numbers record for phone_number, or None"""
+    for record in user_numbers(user_id):
+        if record["phone_number"] == phone_number:
+            return record
+    return None
+
+def use_purchased_number(user_id, record):
+    """Make a number current, moving the session to the account that owns it so View SMS can read it"""
+    session = user_data.get(user_id) or {}
+    if record["account_sid"] != session.get("sid"):
+        fields = {"sid": record["account_sid"], "auth_token": record["auth_token"]}
+        bulk_sids = [account["sid"] for account in session.get("bulk_accounts", [])]
+        if record["account_sid"] in bulk_sids:
+            fields["current_bulk_index"] = bulk_sids.index(record["account_sid"])
+        update_user_data(user_id, **fields)
+    user_current_number[user_id] = {"phone_number": record["phone_number"], "sid": record["sid"]}
+
+def release_purchased_number(user_id, record):
+    """Release a number on the account that owns it and stop tracking it"""
+    get_twilio_client(record["account_sid"], record["auth_token"]).incoming_phone_numbers(record["sid"]).delete()
+    with purchased_numbers_lock:
+        session = user_data.get(user_id) or {}
+        remaining = [entry for entry in session.get("purchased_numbers", []) if entry["phone_number"] != record["phone_number"]]
+        update_user_data(user_id, purchased_numbers=remaining)
+    current = user_current_number.get(user_id)
+    if current and current["phone_number"] == record["phone_number"]:
+        user_current_number.pop(user_id, None)
+
+def build_my_numbers_message(user_id):
+    """Text and Use/Release keyboard for the user's numbers"""
+    records = user_numbers(user_id)
+    if not records:
+        return "📋 You don't have any numbers yet. Search and buy one first.", None
+    current = user_current_number.get(user_id)
+    bulk_sids = [account["sid"] for account in (user_data.get(user_id) or {}).get("bulk_accounts", [])]
+
+    msg = f"📦 *Your numbers ({len(records)}):*\n\n"
+    markup = InlineKeyboardMarkup()
+    for record in records:
+        is_current = bool(current) and current["phone_number"] == record["phone_number"]
+        account_label = f" (account #{bulk_sids.index(record['account_sid']) + 1})" if record["account_sid"] in bulk_sids else ""
+        msg += f"{'⭐' if is_current else '📱'} `{record['phone_number']}`{account_label}\n"
+        markup.row(InlineKeyboardButton(f"📩 Use {record['phone_number']}", callback_data=f"usenum_{record['phone_number']}"),
+                   InlineKeyboardButton("🗑 Release", callback_data=f"releasenum_{record['phone_number']}"))
+    msg += "\n⭐ = current number (used by Receive SMS and View SMS)\n"
+    msg += "⚠️ Numbers keep billing on your Twilio account until released"
+    return msg, markup
+
+def build_results_page(results, page):
+    """Build the text and Buy/prev/next keyboard for one page of a stored search result set"""
+    numbers = results["numbers"]
+    page_count = max(1, (len(numbers) + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE)
+    page = min(max(page, 0), page_count - 1)
+    page_numbers = numbers[page * SEARCH_PAGE_SIZE:(page + 1) * SEARCH_PAGE_SIZE]
+
+    msg = f"🎯 {results['pattern']} Area Code Search Result 🎯\n\n"
+    msg += f"📱 Found: {len(numbers)} new numbers\n"
+    msg += f"📊 In stock: {results['in_stock']} numbers\n"
+    msg += f"📄 Page {page + 1}/{page_count}\n\n"
+    for index, number in enumerate(page_numbers, page * SEARCH_PAGE_SIZE + 1):
+        msg += f"{index}. `{number}`\n"
+    msg += "\n💫 Tap a number to buy it, or send another area code to search again"
+
+    markup = InlineKeyboardMarkup(row_width=2)
+    markup.add(*[InlineKeyboardButton(f"Buy {number}", callback_data=f"buy_{number}_{page}") for number in page_numbers])
+    nav_buttons = []
+    if page > 0:
+        nav_buttons.append(InlineKeyboardButton("◀️ Prev", callback_data=f"results_page_{page - 1}"))
+    if page < page_count - 1:
+        nav_buttons.append(InlineKeyboardButton("Next ▶️", callback_data=f"results_page_{page + 1}"))
+    if nav_buttons:
+        markup.row(*nav_buttons)
+    bulk_count = min(BULK_BUY_MAX, len(page_numbers))
+    if bulk_count > 1:
+        markup.row(InlineKeyboardButton(f"🛒 Buy {bulk_count} from this page", callback_data=f"bulkbuy_{page}"))
+    return msg, markup
+
+def build_perf_stats_message():
+    """Build admin performance statistics message"""
+    with membership_cache_lock:
+        hits = membership_cache_stats["hits"]
+        misses = membership_cache_stats["misses"]
+        invalidations = membership_cache_stats["invalidations"]
+        cached_users = len(membership_cache)
+    lookups = hits + misses
+    hit_rate = (hits / lookups * 100) if lookups else 0.0
+
+    stats_msg = "📈 *Performance Stats*\n\n"
+    stats_msg += "🔐 *Membership Cache:*\n"
+    stats_msg += f"• Hits: {hits}\n"
+    stats_msg += f"• Misses: {misses}\n"
+    stats_msg += f"• Hit rate: {hit_rate:.1f}%\n"
+    stats_msg += f"• Invalidations: {invalidations}\n"
+    stats_msg += f"• Cached users: {cached_users}\n\n"
+
+    with channel_membership_lock:
+        tracked_users = len(channel_membership_table)
+    stats_msg += "📡 *Membership Events:*\n"
+    stats_msg += f"• chat_member events: {channel_membership_stats['events']}\n"
+    stats_msg += f"• Table hits: {channel_membership_stats['table_hits']}\n"
+    stats_msg += f"• Polled checks: {channel_membership_stats['polls']}\n"
+    stats_msg += f"• Tracked users: {tracked_users}\n"
+    stats_msg += f"• Live verifications: {channel_check_flight.stats['calls']}\n"
+    stats_msg += f"• Shared in-flight: {channel_check_flight.stats['shared']}\n\n"
+
+    with dirty_users_lock:
+        pending_users = len(dirty_user_ids)
+    stats_msg += "💾 *User Persistence:*\n"
+    stats_msg += f"• Store: {type(user_store).__name__}\n"
+    stats_msg += f"• Marked dirty: {persister_stats['marked']}\n"
+    stats_msg += f"• Flushes: {persister_stats['flushes']}\n"
+    stats_msg += f"• Rows written: {persister_stats['rows_written']}\n"
+    stats_msg += f"• Pending: {pending_users}\n\n"
+
+    connection_stats = twilio_connection_stats()
+    lookups = twilio_client_stats["created"] + twilio_client_stats["reused"]
+    reuse_rate = (twilio_client_stats["reused"] / lookups * 100) if lookups else 0.0
+    stats_msg += "🔌 *Twilio Client Pool:*\n"
+    stats_msg += f"• Pooled clients: {connection_stats['clients']}/{TWILIO_CLIENT_POOL_SIZE}\n"
+    stats_msg += f"• Created: {twilio_client_stats['created']}\n"
+    stats_msg += f"• Reused: {twilio_client_stats['reused']} ({reuse_rate:.1f}%)\n"
+    stats_msg += f"• Evicted (size/idle/removed): {twilio_client_stats['evicted_size']}/{twilio_client_stats['evicted_idle']}/{twilio_client_stats['evicted_removed']}\n"
+    stats_msg += f"• HTTP requests: {connection_stats['requests']} over {connection_stats['connections']} connections\n\n"
+
+    with twilio_http_stats_lock:
+        http_stats = {operation: dict(stats) for operation, stats in twilio_http_stats.items()}
+    stats_msg += "⏱️ *Twilio Requests (requests/timeouts):*\n"
+    if not http_stats:
+        stats_msg += "• No requests yet\n"
+    for operation, stats in sorted(http_stats.items()):
+        read_timeout = TWILIO_READ_TIMEOUTS.get(operation, TWILIO_REQUEST_TIMEOUT)
+        stats_msg += f"• {operation.replace('_', ' ')}: {stats['requests']}/{stats['timeouts']} (read {read_timeout:g}s)\n"
+
+    stats_msg += f"\n🚦 *Twilio Rate Limiter ({TWILIO_RATE_PER_ACCOUNT:g}/s, burst {TWILIO_RATE_BURST:g}):*\n"
+    stats_msg += f"• Delayed: {twilio_rate_stats['delayed']} ({twilio_rate_stats['wait_seconds']:.1f}s total)\n"
+    stats_msg += f"• Rejected locally: {twilio_rate_stats['rejected']}\n"
+    stats_msg += f"• 429 responses: {twilio_rate_stats['throttled_responses']} ({twilio_rate_stats['retried']} retried)\n"
+    stats_msg += f"• Accounts tracked: {len(twilio_rate_limiters)}\n\n"
+
+    with inventory_lock:
+        inventory_entries = len(inventory_cache)
+        tracked_patterns = len(inventory_queries)
+    lookups = inventory_stats["hits"] + inventory_stats["misses"]
+    hit_rate = (inventory_stats["hits"] / lookups * 100) if lookups else 0.0
+    served_age = (inventory_stats["served_age"] / inventory_stats["hits"]) if inventory_stats["hits"] else 0.0
+    stats_msg += f"📦 *Number Inventory Cache (TTL {INVENTORY_CACHE_TTL:g}s):*\n"
+    stats_msg += f"• Hits: {inventory_stats['hits']} ({hit_rate:.1f}%)\n"
+    stats_msg += f"• Misses: {inventory_stats['misses']} ({inventory_stats['expired']} expired)\n"
+    stats_msg += f"• Avg age served: {served_age:.1f}s\n"
+    stats_msg += f"• Purchased numbers removed: {inventory_stats['removed']}\n"
+    stats_msg += f"• Prefetched: {inventory_stats['prefetched']} ({inventory_stats['prefetch_errors']} errors, {inventory_stats['prefetch_skipped']} skipped without a pool account)\n"
+    # Followers whose shared search failed ran their own, so they saved nothing
+    searches_saved = number_search_flight.stats["shared"] - inventory_stats["coalesced_retries"]
+    stats_msg += f"• Coalesced searches (Twilio searches saved): {searches_saved}"
+    stats_msg += f" ({inventory_stats['coalesced_retries']} more waited, then searched after a failed shared search)\n"
+    stats_msg += f"• Entries: {inventory_entries}, tracked patterns: {tracked_patterns}\n\n"
+
+    with search_history_lock:
+        history_users = len(search_history_sizes)
+        history_numbers = search_history_total
+    stats_msg += f"🗂️ *Search History (cap {SEARCH_HISTORY_CAP}/user, budget {SEARCH_HISTORY_BUDGET}):*\n"
+    stats_msg += f"• Numbers held: {history_numbers} across {history_users} users\n"
+    if search_history_seeded_at:
+        stats_msg += f"• Re-seeded from the state backend {int(time.time() - search_history_seeded_at)}s ago\n"
+    stats_msg += f"• Added/refreshed: {search_history_stats['added']}/{search_history_stats['refreshed']}\n"
+    stats_msg += f"• Evicted by cap/age/budget: {search_history_stats['evicted_cap']}/{search_history_stats['evicted_age']}/{search_history_stats['evicted_budget']}\n\n"
+
+    if target_search_stats["searches"]:
+        stats_msg += f"📍 *Target Search ({len(target_search_plan('0'))} queries per pattern, want {TARGET_SEARCH_WANTED}):*\n"
+        stats_msg += f"• Searches: {target_search_stats['searches']}\n"
+        stats_msg += f"• Queries sent: {target_search_stats['queries']} ({target_search_stats['query_errors']} failed)\n"
+        stats_msg += f"• Early stops: {target_search_stats['early_stops']} ({target_search_stats['cancelled']} queries skipped)\n\n"
+
+    delivered = search_delivery_stats["searches"]
+    stats_msg += f"📄 *Search Delivery ({SEARCH_DELIVERY}, {SEARCH_PAGE_SIZE} per page):*\n"
+    stats_msg += f"• Searches delivered: {delivered}\n"
+    stats_msg += f"• Telegram messages: {search_delivery_stats['messages_sent']}"
+    stats_msg += f" ({search_delivery_stats['messages_sent'] / delivered:.1f} per search)\n" if delivered else "\n"
+    stats_msg += f"• Pages served: {search_delivery_stats['pages_served']}\n\n"
+
+    if bulk_buy_stats["batches"]:
+        stats_msg += f"🛒 *Bulk Buy (up to {BULK_BUY_MAX} per page):*\n"
+        stats_msg += f"• Batches: {bulk_buy_stats['batches']}\n"
+        stats_msg += f"• Purchased/failed: {bulk_buy_stats['purchased']}/{bulk_buy_stats['failed']}\n"
+        stats_msg += f"• Moved to another account: {bulk_buy_stats['account_failovers']}\n\n"
+
+    if HEDGED_SEARCH_ENABLED:
+        stats_msg += f"🪁 *Hedged Search (after {HEDGE_DELAY:g}s, max {HEDGE_MAX_EXTRA} extra):*\n"
+        stats_msg += f"• Searches: {hedge_stats['searches']}\n"
+        stats_msg += f"• Hedges fired: {hedge_stats['fired']}\n"
+        stats_msg += f"• Won by hedge/primary: {hedge_stats['hedge_won']}/{hedge_stats['primary_won']}\n"
+        stats_msg += f"• Skipped (cap/no spare account): {hedge_stats['skipped_cap']}/{hedge_stats['no_spare']}\n\n"
+
+    stats_msg += "🔁 *Twilio Operations (calls/retries/failovers):*\n"
+    if not twilio_operation_stats:
+        stats_msg += "• No operations yet\n"
+    for name in sorted(twilio_operation_stats):
+        stats = twilio_operation_stats[name]
+        p50, p95 = twilio_operation_percentiles(name)
+        stats_msg += f"• {name.replace('_', ' ')}: {stats['calls']}/{stats['retries']}/{stats['failovers']}, p50 {p50:.0f}ms, p95 {p95:.0f}ms\n"
+    return stats_msg
+
+def setup_all_handlers():
+    """Setup all bot handlers with comprehensive error handling"""
+
+    try:
+        # Pending conversation steps (login credentials, broadcast text, ...) take priority
+        @bot.message_handler(func=has_pending_step, content_types=['text'])
+        @comprehensive_error_handler
+        def handle_pending_step(message):
+            dispatch_pending_step(message)
+
+        # Start command
+        @bot.message_handler(commands=['start'])
+        @comprehensive_error_handler
+        def handle_start(message):
+            user_id = message.chat.id
+
+            with registered_users_lock:
+                is_new_user = user_id not in registered_users
+                if is_new_user:
+                    registered_users[user_id] = UserRecord(UserStatus.APPROVED)
+            if is_new_user:
+                mark_user_dirty(user_id)
+
+            if not is_user_authorized(user_id):
+                channel_msg = "🔔 Channel membership required!\n\n"
+                channel_msg += "✨ Please join these channels first to use the bot:\n\n"
+
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    channel_msg += f"{i}. {channel['username']}\n"
+
+                channel_msg += "\n💡 After joining both channels, click 'I've joined both channels' button."
+                channel_msg += "\n\n🎯 Use all features completely free after joining!"
+
+                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
+                return
+
+            main_menu = create_main_menu(user_id)
+            safe_send_message(message.chat.id,
+                            "🌟 Welcome to TwilioPro Bot! 🌟\n"
+                            "📱 Get virtual numbers and real-time\n"
+                            "SMS services easily and instantly!\n\n"
+                            "💫 Key Features:\n"
+                            "• Search and purchase numbers effortlessly\n"
+                            "• Receive SMS instantly\n"
+                            "• Automatically detect OTP\n"
+                            "• 24/7 active service and support\n\n"
+                            "🎯 Select your desired option from the\n"
+                            "menu below and get started!",
+                            reply_markup=main_menu)
+
+        # Get ID command
+        @bot.message_handler(commands=['get_id'])
+        @comprehensive_error_handler
+        def get_user_id(message):
+            user_id = message.chat.id
+            if not is_user_authorized(user_id):
+                channel_msg = "🔔 Channel membership required!\n\n"
+                channel_msg += "✨ To view ID, first join these channels:\n\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    channel_msg += f"{i}. {channel['username']}\n"
+                channel_msg += "\n🎯 Use all features completely free after joining!"
+                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
+                return
+            safe_send_message(message.chat.id, f"Your User ID is: {message.chat.id}")
+
+        # Admin panel command
+        @bot.message_handler(commands=['admin_panel'])
+        @comprehensive_error_handler
+        def admin_panel_cmd(message):
+            if message.chat.id != admin_id:
+                safe_send_message(message.chat.id, "You are not authorized to access the admin panel.")
+                return
+            safe_send_message(message.chat.id, "Admin Panel: Select an action", reply_markup=create_admin_panel())
+
+        # Admin panel button handler (for ReplyKeyboardMarkup)
+        @bot.message_handler(func=lambda message: message.text == "⚙️ Admin Panel" and message.chat.id == admin_id)
+        @comprehensive_error_handler
+        def handle_admin_panel_button(message):
+            if message.chat.id != admin_id:
+                safe_send_message(message.chat.id, "You are not authorized to access the admin panel.")
+                return
+            admin_panel_cmd(message) # Call the existing admin panel command handler
+        # Broadcast message handler
+        @bot.message_handler(func=lambda message: message.text == "📣 Broadcast" and message.chat.id == admin_id)
+        @comprehensive_error_handler
+        def broadcast_message_handler(message):
+            if message.chat.id != admin_id:
+                safe_send_message(message.chat.id, "You cannot use this feature.")
+                return
+
+            broadcast_msg = "📢 *Broadcast Message System* 📢\n"
+            broadcast_msg += "━━━━━━━━━━━━━━━━━━━━━\n\n"
+            broadcast_msg += "💬 *Write your message:*\n\n"
+            broadcast_msg += "📝 Type the message you want to send to all users\n\n"
+            broadcast_msg += "⚠️ *Important:*\n"
+            broadcast_msg += "• Keep message within 4000 characters\n"
+            broadcast_msg += "• Empty message cannot be sent\n"
+            broadcast_msg += "• All registered users will receive it\n\n"
+            broadcast_msg += "🌟 *Now type your message...*"
+
+            safe_send_message(message.chat.id, broadcast_msg, parse_mode="Markdown")
+
+            try:
+                register_pending_step(message, "broadcast_message")
+            except Exception as e:
+                logger.error(f"Error registering broadcast handler: {str(e)}")
+
+        @comprehensive_error_handler
+        def process_broadcast_message(message):
+            if message.chat.id != admin_id:
+                safe_send_message(message.chat.id, "Unauthorized access.")
+                return
+
+            broadcast_text = message.text.strip()
+
+            # Validate message
+            if not broadcast_text:
+                safe_send_message(message.chat.id, "❌ Empty message cannot be sent. Please write a message.")
+                return
+
+            if len(broadcast_text) > 4000:
+                safe_send_message(message.chat.id, f"❌ Message too long ({len(broadcast_text)} characters). Please keep within 4000 characters.")
+                return
+
+            # Get all registered users
+            total_users = len(registered_users)
+            if total_users == 0:
+                safe_send_message(message.chat.id, "❌ No registered users found.")
+                return
+
+            # Confirmation message
+            confirm_msg = f"📊 *Broadcast Confirmation* 📊\n"
+            confirm_msg += f"━━━━━━━━━━━━━━━━━━━━━\n\n"
+            confirm_msg += f"👥 **Target Users:** {total_users} users\n"
+            confirm_msg += f"📝 **Message Length:** {len(broadcast_text)} characters\n\n"
+            confirm_msg += f"💬 **Your Message:**\n"
+            confirm_msg += f"```\n{broadcast_text[:200]}{'...' if len(broadcast_text) > 200 else ''}\n```\n\n"
+            confirm_msg += f"⚡ **Broadcast will start now...**"
+
+            safe_send_message(message.chat.id, confirm_msg, parse_mode="Markdown")
+
+            # Start broadcasting
+            success_count = 0
+            failed_count = 0
+            blocked_count = 0
+
+            # Progress message
+            progress_msg = f"🚀 **Broadcast started...**\n\n"
+            progress_msg += f"📊 **Progress:** 0/{total_users}\n"
+            progress_msg += f"✅ **Success:** 0\n"
+            progress_msg += f"❌ **Failed:** 0\n"
+            progress_msg += f"🚫 **Blocked:** 0"
+
+            progress_message = safe_send_message(message.chat.id, progress_msg, parse_mode="Markdown")
+
+            # Prepare broadcast message with admin signature
+            final_broadcast_msg = f"📢 **Admin Announcement** 📢\n"
+            final_broadcast_msg += f"━━━━━━━━━━━━━━━━━━━━━\n\n"
+            final_broadcast_msg += f"{broadcast_text}\n\n"
+            final_broadcast_msg += f"━━━━━━━━━━━━━━━━━━━━━\n"
+            final_broadcast_msg += f"👨‍💼 **Sender:** Admin {ADMIN_USERNAME}\n"
+            final_broadcast_msg += f"⏰ **Time:** {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+
+            # Send to all users
+            processed = 0
+            for user_id in snapshot_registered_users():
+                processed += 1
+
+                # Skip admin
+                if user_id == admin_id:
+                    continue
+
+                try:
+                    # Send broadcast message
+                    if ultra_safe_send_message(user_id, final_broadcast_msg, parse_mode="Markdown"):
+                        success_count += 1
+                        logger.info(f"✅ Broadcast sent successfully to user {user_id}")
+                    else:
+                        failed_count += 1
+                        logger.warning(f"❌ Failed to send broadcast to user {user_id}")
+
+                except telebot.apihelper.ApiTelegramException as e:
+                    error_msg = str(e).lower()
+                    if "blocked" in error_msg or "chat not found" in error_msg:
+                        blocked_count += 1
+                        logger.warning(f"🚫 User {user_id} blocked the bot")
+                    else:
+                        failed_count += 1
+                        logger.error(f"❌ API error sending to user {user_id}: {str(e)}")
+
+                except Exception as e:
+                    failed_count += 1
+                    logger.error(f"❌ Error sending broadcast to user {user_id}: {str(e)}")
+
+                # Update progress every 5 users or on completion
+                if processed % 5 == 0 or processed == total_users:
+                    try:
+                        updated_progress = f"🚀 **Broadcast in progress...**\n\n"
+                        updated_progress += f"📊 **Progress:** {processed}/{total_users}\n"
+                        updated_progress += f"✅ **Success:** {success_count}\n"
+                        updated_progress += f"❌ **Failed:** {failed_count}\n"
+                        updated_progress += f"🚫 **Blocked:** {blocked_count}\n"
+                        updated_progress += f"⏳ **Remaining:** {total_users - processed}"
+
+                        if progress_message:
+                            bot.edit_message_text(
+                                chat_id=message.chat.id,
+                                message_id=progress_message.message_id,
+                                text=updated_progress,
+                                parse_mode="Markdown"
+                            )
+                    except Exception as e:
+                        logger.error(f"Error updating progress: {str(e)}")
+
+                # Small delay to avoid rate limiting
+                time.sleep(0.1)
+
+            # Final report
+            completion_percentage = (success_count / max(total_users - 1, 1)) * 100  # Exclude admin
+            final_report = f"🎉 **Broadcast Complete!** 🎉\n"
+            final_report += f"━━━━━━━━━━━━━━━━━━━━━\n\n"
+            final_report += f"📊 **Final Statistics:**\n"
+            final_report += f"👥 **Total Users:** {total_users - 1} users (excluding admin)\n"
+            final_report += f"✅ **Successfully Reached:** {success_count} users\n"
+            final_report += f"❌ **Failed:** {failed_count} users\n"
+            final_report += f"🚫 **Bot Blocked:** {blocked_count} users\n\n"
+            final_report += f"📈 **Success Rate:** {completion_percentage:.1f}%\n\n"
+
+            if success_count > 0:
+                final_report += f"🎯 **Your message reached {success_count} users!**\n"
+
+            if failed_count > 0 or blocked_count > 0:
+                final_report += f"⚠️ **Note:** Some users blocked the bot or API issues occurred\n"
+
+            final_report += f"\n💫 **Broadcast system worked successfully!**"
+
+            try:
+                if progress_message:
+                    bot.edit_message_text(
+                        chat_id=message.chat.id,
+                        message_id=progress_message.message_id,
+                        text=final_report,
+                        parse_mode="Markdown"
+                    )
+            except:
+                safe_send_message(message.chat.id, final_report, parse_mode="Markdown")
+
+            logger.info(f"📢 Broadcast completed: {success_count} successful, {failed_count} failed, {blocked_count} blocked")
+
+        # Account pool management command
+        @bot.message_handler(commands=['pool_status'])
+        @comprehensive_error_handler
+        def pool_status_cmd(message):
+            if message.chat.id != admin_id:
+                safe_send_message(message.chat.id, "You cannot use this command.")
+                return
+
+            status_msg = "📊 *Account Pool Status:*\n\n"
+
+            breaker_icons = {"closed": "✅", "half_open": "🟡", "open": "❌"}
+            for i, account in enumerate(twilio_account_pool, 1):
+                if account["sid"] and account["auth_token"]:
+                    with account_breakers_lock:
+                        breaker = dict(_breaker_entry(account["sid"]))
+                    status_msg += f"{breaker_icons[breaker['state']]} Account #{i}: {breaker['state'].replace('_', '-')}\n"
+                    status_msg += f"   SID: {account['sid'][:10]}...\n"
+                    status_msg += f"   In flight: {account_inflight(account['sid'])}\n"
+                    if breaker["failures"]:
+                        status_msg += f"   Failures: {breaker['failures']}\n"
+                    if breaker["last_probe"]:
+                        status_msg += f"   Last probe: {int(time.time() - breaker['last_probe'])}s ago\n"
+                    status_msg += "\n"
+                else:
+                    status_msg += f"⚪ Account #{i}: empty\n\n"
+
+            status_msg += f"🩺 *Prober:* {breaker_stats['probes']} probes, {breaker_stats['probe_failures']} failed, "
+            status_msg += f"{breaker_stats['opened']} opened, {breaker_stats['recovered']} recovered\n\n"
+
+            status_msg += f"💡 *User Account Index:*\n"
+            for user_id, index in user_account_index.items():
+                status_msg += f"User {user_id}: Account #{index + 1}\n"
+
+            safe_send_message(message.chat.id, status_msg, parse_mode="Markdown")
+
+        # Performance statistics command
+        @bot.message_handler(commands=['perf_stats'])
+        @comprehensive_error_handler
+        def perf_stats_cmd(message):
+            if message.chat.id != admin_id:
+                safe_send_message(message.chat.id, "You cannot use this command.")
+                return
+
+            safe_send_message(message.chat.id, build_perf_stats_message(), parse_mode="Markdown")
+
+        # Add account to pool command
+        @bot.message_handler(commands=['add_account'])
+        @comprehensive_error_handler
+        def add_account_cmd(message):
+            if message.chat.id != admin_id:
+                safe_send_message(message.chat.id, "You cannot use this command.")
+                return
+
+            safe_send_message(message.chat.id, "Add new account:\n\nFormat: Account_SID Auth_Token\n\nExample:\nAC123...xyz fe99...abc")
+
+            try:
+                register_pending_step(message, "add_account")
+            except Exception as e:
+                logger.error(f"Error registering step handler: {str(e)}")
+
+        @comprehensive_error_handler
+        def process_add_account(message):
+            try:
+                credentials = message.text.strip().split()
+                if len(credentials) != 2:
+                    safe_send_message(message.chat.id, "❌ Invalid format! Correct format: Account_SID Auth_Token")
+                    return
+
+                sid, auth_token = credentials
+
+                # Test the account
+                try:
+                    status_ok, status_msg = check_account_status(get_twilio_client(sid, auth_token))
+
+                    if not status_ok:
+                        evict_twilio_client(sid, "invalid credentials")
+                        safe_send_message(message.chat.id, f"❌ Account could not be added: {status_msg}")
+                        return
+
+                except Exception as e:
+                    evict_twilio_client(sid, "invalid credentials")
+                    safe_send_message(message.chat.id, f"❌ Invalid credentials: {str(e)}")
+                    return
+
+                # Find empty slot or add to list
+                added = False
+                for i, account in enumerate(twilio_account_pool):
+                    if not account["sid"]:
+                        account["sid"] = sid
+                        account["auth_token"] = auth_token
+                        account["status"] = "active"
+                        safe_send_message(message.chat.id, f"✅ Account successfully added to slot #{i + 1}!")
+                        added = True
+                        break
+
+                if not added:
+                    twilio_account_pool.append({"sid": sid, "auth_token": auth_token, "status": "active"})
+                    safe_send_message(message.chat.id, f"✅ New account added to slot #{len(twilio_account_pool)}!")
+
+                record_account_success(sid)
+                refresh_healthy_pool()
+
+            except Exception as e:
+                safe_send_message(message.chat.id, f"❌ Error: {str(e)}")
+
+        # Channel verification callback with enhanced fallback
+        @bot.callback_query_handler(func=lambda call: call.data == "verify_channels")
+        @comprehensive_error_handler
+        def handle_verify_channels(call):
+            user_id = call.message.chat.id
+
+            # Enhanced verification with multiple fallback methods (never served from cache)
+            verification_result = fresh_channel_check(user_id)
+
+            # Additional manual verification attempt if automated fails
+            if not verification_result:
+                logger.info(f"Attempting manual verification for user {user_id}")
+
+                # Try alternative verification method
+                manual_channels_verified = 0
+                for channel in REQUIRED_CHANNELS:
+                    try:
+                        # Try to get chat info as an alternative check
+                        chat_info = bot.get_chat(channel["chat_id"])
+                        if chat_info:
+                            # If we can get chat info, assume user has some access
+                            manual_channels_verified += 1
+                            logger.info(f"Manual verification: User {user_id} has access to {channel['username']}")
+                    except Exception as e:
+                        logger.warning(f"Manual verification failed for {channel['username']}: {str(e)}")
+                        # Even if manual fails, be lenient for API issues
+                        manual_channels_verified += 1
+                        logger.info(f"Manual verification fallback: Assuming access for {channel['username']} due to API issues")
+
+                # If manual verification suggests user has access, allow it
+                if manual_channels_verified >= len(REQUIRED_CHANNELS):
+                    verification_result = True
+                    logger.info(f"✅ Manual verification successful for user {user_id}")
+
+                    # Update user records
+                    with registered_users_lock:
+                        if user_id not in registered_users:
+                            registered_users[user_id] = UserRecord()
+
+                    registered_users[user_id].channel_joined = True
+                    for channel in REQUIRED_CHANNELS:
+                        registered_users[user_id].mark_channel_verified(channel["username"])
+
+                    mark_user_dirty(user_id)
+                    set_cached_membership(user_id, True)
+                    seed_channel_membership(user_id, True)
+
+            if verification_result:
+                # Ensure user data is properly saved
+                with registered_users_lock:
+                    if user_id not in registered_users:
+                        registered_users[user_id] = UserRecord()
+
+                registered_users[user_id].channel_joined = True
+                mark_user_dirty(user_id)
+
+                success_msg = "🎉 Congratulations! 🎉\n\n"
+                success_msg += "✅ You have successfully completed channel verification!\n\n"
+                success_msg += "🚀 Now you can use all bot features completely free:\n"
+                success_msg += "• 🔑 Login\n"
+                success_msg += "• 🔍 Search numbers\n"
+                success_msg += "• 📩 Receive SMS\n"
+                success_msg += "• All services completely free!\n\n"
+                success_msg += "⚠️ Important: You must stay in channels to use the bot.\n"
+                success_msg += "💫 Thank you for using the bot!"
+
+                try:
+                    bot.edit_message_text(
+                        chat_id=call.message.chat.id,
+                        message_id=call.message.message_id,
+                        text=success_msg
+                    )
+                except:
+                    pass
+
+                safe_send_message(call.message.chat.id, "🌟 Main Menu", reply_markup=create_main_menu(user_id))
+                try:
+                    bot.answer_callback_query(call.id, "Successfully verified!")
+                except:
+                    pass
+            else:
+                # Even if verification fails, be more lenient due to API issues
+                error_msg = "⚠️ Verification incomplete due to API issues!\n\n"
+                error_msg += "🔄 If you have joined both channels, please try again.\n\n"
+                error_msg += "📋 Make sure you have joined these channels:\n\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    error_msg += f"{i}. {channel['username']}\n"
+                error_msg += "\n💡 If the problem persists, try again later."
+                error_msg += "\n\n🚨 Temporary inconvenience may occur due to API issues."
+
+                try:
+                    bot.edit_message_text(
+                        chat_id=call.message.chat.id,
+                        message_id=call.message.message_id,
+                        text=error_msg,
+                        reply_markup=create_channel_join_menu()
+                    )
+                except:
+                    pass
+
+                try:
+                    bot.answer_callback_query(call.id, "API issue! Please try again.", show_alert=True)
+                except:
+                    pass
+
+        # Channel membership changes (requires the bot to be admin in the channels)
+        @bot.chat_member_handler()
+        @comprehensive_error_handler
+        def handle_channel_member_update(update):
+            handle_chat_member_update(update)
+
+        # Login handler
+        @bot.message_handler(func=lambda message: message.text == "👤 Login")
+        @comprehensive_error_handler
+        def login_account(message):
+            user_id = message.chat.id
+            if not is_user_authorized(user_id):
+                channel_msg = "🔔Channel subscription required!\n\n"
+                channel_msg += "✨ To login first join these channels:\n\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    channel_msg += f"{i}. {channel['username']}\n"
+                channel_msg += "\n🎯 Use all features completely free after joining!"
+                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
+                return
+
+            credentials_msg = "📝 Single Account Login Instructions\n\n"
+            credentials_msg += "• Enter your Account SID and Auth Token\n"
+            credentials_msg += "• Make sure to separate both values with one space\n\n"
+            credentials_msg += "💡 Example:\n"
+            credentials_msg += "ACxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx yyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyy\n\n"
+            credentials_msg += "⚠️ Important:\n"
+            credentials_msg += "Please input your credentials correctly otherwise login will fail\n\n"
+            credentials_msg += "💫 To add multiple accounts use the\n"
+            credentials_msg += "🔐 Bulk Login option"
+            safe_send_message(message.chat.id, credentials_msg)
+
+            try:
+                register_pending_step(message, "twilio_login")
+            except Exception as e:
+                logger.error(f"Error registering step handler: {str(e)}")
+
+        # Bulk Login handler
+        @bot.message_handler(func=lambda message: message.text == "➕ Bulk Login")
+        @comprehensive_error_handler
+        def bulk_login_account(message):
+            user_id = message.chat.id
+            if not is_user_authorized(user_id):
+                channel_msg = "🔔 Channel subscription required!\n\n"
+                channel_msg += "✨ To bulk login first join these channels:\n\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    channel_msg += f"{i}. {channel['username']}\n"
+                channel_msg += "\n🎯 Use all features completely free after joining!"
+                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
+                return
+
+            bulk_msg = "━━━━━━━━━━━━━━\n"
+            bulk_msg += "🚀 Auto-Failover System 🚀\n"
+            bulk_msg += "━━━━━━━━━━━━━━\n\n"
+            bulk_msg += "✅ With 30 accounts you get:\n"
+            bulk_msg += "• Auto-switch when one account fails\n"
+            bulk_msg += "• Zero service interruption\n"
+            bulk_msg += "• Continuous SMS reception\n"
+            bulk_msg += "• No manual intervention needed\n\n"
+
+            bulk_msg += "🖊️ Example:\n"
+            bulk_msg += "```\n"
+            bulk_msg += "ACxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx yyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyy\n\n"
+            bulk_msg += "ACzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzz aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa\n"
+            bulk_msg += "```\n\n"
+
+            bulk_msg += "⚠️ Warning:\n"
+            bulk_msg += "Login will fail without proper spacing\n\n"
+
+            bulk_msg += "💡 Simply put:\n"
+            bulk_msg += "With 30 accounts if one fails\n"
+            bulk_msg += "others keep working automatically!\n\n"
+
+            bulk_msg += "🔐 Uninterrupted service - Try now!\n"
+            bulk_msg += "━━━━━━━━━━━━━━━━"
+            safe_send_message(message.chat.id, bulk_msg, parse_mode="Markdown")
+
+            try:
+                register_pending_step(message, "bulk_twilio_login")
+            except Exception as e:
+                logger.error(f"Error registering step handler: {str(e)}")
+
+        # Process Twilio login
+        @comprehensive_error_handler
+        def process_twilio_login(message):
+            user_id = message.chat.id
+            try:
+                credentials = message.text.strip().split()
+
+                if len(credentials) != 2:
+                    error_msg = "⚠️ Account Login Failed\n\n"
+                    error_msg += "🚨 No valid account credentials found!\n"
+                    error_msg += "Please provide your details in the correct format:"
+                    safe_send_message(message.chat.id, error_msg)
+                    return
+
+                sid, auth_token = credentials
+
+                try:
+                    status_ok, status_msg = check_account_status(get_twilio_client(sid, auth_token))
+
+                    if not status_ok:
+                        evict_twilio_client(sid, "invalid credentials")
+                        safe_send_message(message.chat.id, f"⚠️ *Twilio Account Issue*\n\n{status_msg}\n\nPlease use a different account.", parse_mode="Markdown")
+                        return
+
+                except Exception as e:
+                    evict_twilio_client(sid, "invalid credentials")
+                    safe_send_message(message.chat.id, "Invalid Twilio credentials. Please provide a valid Account SID and Auth Token.")
+                    return
+
+                # Credentials of the previous login are no longer used
+                evict_session_twilio_clients(user_data.get(user_id), keep_sids=[sid])
+
+                user_data[user_id] = {
+                    "sid": sid,
+                    "auth_token": auth_token,
+                    # Bulk-bought numbers stay reachable across logins (each record keeps its account's token)
+                    "purchased_numbers": carried_purchased_numbers(user_id),
+                    "using_pool": False
+                }
+
+                success_msg = "✅ Login Successful!\n"
+                success_msg += "📍 Please enter your area code to proceed."
+                safe_send_message(message.chat.id, success_msg, reply_markup=create_main_menu(user_id), parse_mode="Markdown")
+            except Exception as e:
+                safe_send_message(message.chat.id, f"Error: {e}")
+
+        # Process Bulk Twilio login
+        @comprehensive_error_handler
+        def process_bulk_twilio_login(message):
+            user_id = message.chat.id
+            try:
+                # Enhanced text processing to handle various formats
+                text_input = message.text.strip()
+
+                # Handle different separators and formats
+                lines = []
+
+                # Split by newlines first
+                raw_lines = text_input.split('\n')
+
+                for line in raw_lines:
+                    line = line.strip()
+                    if not line:
+                        continue
+
+                    # Skip lines that don't look like credentials
+                    if len(line) < 20:  # Too short to be valid credentials
+                        continue
+
+                    # Handle multiple formats
+                    # Format 1: SID TOKEN (space separated)
+                    # Format 2: SID,TOKEN (comma separated)
+                    # Format 3: SID:TOKEN (colon separated)
+                    # Format 4: SID|TOKEN (pipe separated)
+                    # Format 5: SID\nTOKEN (newline separated - for your example)
+
+                    # Check if this line contains both SID and Token
+                    if line.startswith('AC') and len(line) > 60:
+                        # This might be SID and Token on same line
+                        # Replace various separators with space
+                        line = line.replace(',', ' ').replace(':', ' ').replace('|', ' ').replace('\t', ' ')
+
+                        # Clean multiple spaces
+                        import re
+                        line = re.sub(r'\s+', ' ', line)
+
+                        # Check if we have exactly 2 parts after splitting
+                        parts = line.split()
+                        if len(parts) == 2 and parts[0].startswith('AC'):
+                            lines.append(line)
+                        elif len(parts) == 1 and parts[0].startswith('AC'):
+                            # This might be just SID, look for token in next line
+                            lines.append(line)
+                    elif not line.startswith('AC') and len(line) >= 30:
+                        # This might be a token on separate line
+                        # Check if previous line was a SID
+                        if lines and lines[-1].split()[-1].startswith('AC'):
+                            # Combine with previous SID
+                            sid_line = lines[-1]
+                            combined_line = f"{sid_line} {line}"
+                            lines[-1] = combined_line
+                        else:
+                            lines.append(line)
+                    else:
+                        # Other formats
+                        line = line.replace(',', ' ').replace(':', ' ').replace('|', ' ').replace('\t', ' ')
+                        import re
+                        line = re.sub(r'\s+', ' ', line)
+                        if line:
+                            lines.append(line)
+
+                if not lines:
+                    safe_send_message(message.chat.id, "⚠️ Account Login Failed\n\n🚨 No valid account credentials found!\nPlease provide your details in the correct format:")
+                    return
+
+                valid_accounts = []
+                invalid_accounts = []
+                detailed_errors = []
+
+                # Maximum 30 accounts allowed (increased limit)
+                if len(lines) > 30:
+                    safe_send_message(message.chat.id, f"⚠️ *Maximum 30 accounts can be added.* Processing first 30 accounts...", parse_mode="Markdown")
+                    lines = lines[:30]
+
+                progress_msg = f"🔄 Bulk account verification started...\n\n📊 Total accounts: {len(lines)}\n\n⏳ Please wait..."
+                progress_message = safe_send_message(message.chat.id, progress_msg, parse_mode="Markdown")
+
+                # Validate concurrently; results keep their original line numbers
+                futures = [bulk_login_executor.submit(validate_bulk_account, i, line) for i, line in enumerate(lines, 1)]
+                results = []
+                last_progress_edit = time.time()
+
+                for completed, future in enumerate(as_completed(futures), 1):
+                    results.append(future.result())
+
+                    # Throttle progress edits by time rather than once per account
+                    now = time.time()
+                    if completed == len(lines) or now - last_progress_edit < BULK_LOGIN_PROGRESS_INTERVAL:
+                        continue
+                    last_progress_edit = now
+
+                    valid_so_far = sum(1 for _, account, _ in results if account)
+                    progress_update = f"🔄 *Progress: {completed}/{len(lines)}*\n\n"
+                    progress_update += f"✅ Valid: {valid_so_far}\n"
+                    progress_update += f"❌ Invalid: {completed - valid_so_far}\n"
+                    progress_update += f"📊 Completed: {completed}/{len(lines)}"
+
+                    try:
+                        if progress_message:
+                            bot.edit_message_text(
+                                chat_id=message.chat.id,
+                                message_id=progress_message.message_id,
+                                text=progress_update,
+                                parse_mode="Markdown"
+                            )
+                    except Exception as e:
+                        logger.error(f"Error updating bulk login progress: {str(e)}")
+
+                for _, account, error_detail in sorted(results, key=lambda result: result[0]):
+                    if account:
+                        valid_accounts.append(account)
+                    else:
+                        invalid_accounts.append(error_detail)
+                        detailed_errors.append(error_detail)
+
+                # Final results
+                if valid_accounts:
+                    # Update user's personal pool
+                    # Credentials of the previous login are no longer used
+                    evict_session_twilio_clients(user_data.get(user_id), keep_sids=[account["sid"] for account in valid_accounts])
+
+                    # Set current working account
+                    current_account = valid_accounts[0]
+                    user_data[user_id] = {
+                        "bulk_accounts": valid_accounts,
+                        "current_bulk_index": 0,
+                        "using_bulk_pool": True,
+                        "purchased_numbers": carried_purchased_numbers(user_id),
+                        "sid": current_account["sid"],
+                        "auth_token": current_account["auth_token"]
+                    }
+
+                    # Enhanced success message
+                    result_msg = f"━━━━━━━━━━━━━━━━━━\n"
+                    result_msg += f"🎉 BULK LOGIN SUCCESS! 🎉\n"
+                    result_msg += f"━━━━━━━━━━━━━━━━━━\n\n"
+                    result_msg += f"📊 Login Summary:\n"
+                    result_msg += f"✅ Successful: {len(valid_accounts)} account{'s' if len(valid_accounts) != 1 else ''}\n"
+                    result_msg += f"❌ Failed: {len(invalid_accounts)} account{'s' if len(invalid_accounts) != 1 else ''}\n\n"
+                    result_msg += f"🔄 Auto-Failover Active:\n"
+                    result_msg += f"• Automatic switching between accounts\n"
+                    result_msg += f"• Continuous service guaranteed\n"
+                    result_msg += f"• Zero downtime experience"
+
+                    safe_send_message(message.chat.id, result_msg, reply_markup=create_main_menu(user_id), parse_mode="Markdown")
+                    logger.info(f"✅ Bulk login successful for user {user_id}: {len(valid_accounts)} accounts loaded")
+
+                else:
+                    # Enhanced error message with detailed troubleshooting
+                    error_msg = f"❌ *All Accounts Invalid!* ❌\n"
+                    error_msg += f"━━━━━━━━━━━━━━━━━━━━━\n\n"
+                    error_msg += f"🚨 **Problem:** None of the {len(invalid_accounts)} accounts you provided are working!\n\n"
+
+                    # Analyze and categorize errors
+                    error_analysis = {
+                        "Credential Issues": 0,
+                        "Format Issues": 0,
+                        "Account Suspended": 0,
+                        "Network Issues": 0,
+                        "Trial Account": 0,
+                        "Others": 0
+                    }
+
+                    for error in invalid_accounts:
+                        if "credential" in error.lower() or "invalid" in error.lower() or "authenticate" in error.lower():
+                            error_analysis["Credential Issues"] += 1
+                        elif "format" in error.lower() or "length" in error.lower():
+                            error_analysis["Format Issues"] += 1
+                        elif "suspend" in error.lower() or "restricted" in error.lower():
+                            error_analysis["Account Suspended"] += 1
+                        elif "network" in error.lower() or "timeout" in error.lower() or "connection" in error.lower():
+                            error_analysis["Network Issues"] += 1
+                        elif "trial" in error.lower():
+                            error_analysis["Trial Account"] += 1
+                        else:
+                            error_analysis["Others"] += 1
+
+                    error_msg += f"📊 **Problem Analysis:**\n"
+                    for issue_type, count in error_analysis.items():
+                        if count > 0:
+                            error_msg += f"• {issue_type}: {count} accounts\n"
+                    error_msg += f"\n"
+
+                    # Common issues and solutions
+                    error_msg += f"🔍 **Most Common Issues & Solutions:**\n\n"
+
+                    if error_analysis["Credential Issues"] > 0:
+                        error_msg += f"🔑 **Wrong Credentials ({error_analysis['Credential Issues']} accounts):**\n"
+                        error_msg += f"• Copy correct SID & Token from Twilio Console\n"
+                        error_msg += f"• Account SID starts with 'AC'\n"
+                        error_msg += f"• Auth Token is exactly 32 characters\n"
+                        error_msg += f"• Make sure there are no extra spaces or symbols\n\n"
+
+                    if error_analysis["Format Issues"] > 0:
+                        error_msg += f"📝 **Format Issues ({error_analysis['Format Issues']} accounts):**\n"
+                        error_msg += f"• Each line should be: Account_SID Auth_Token\n"
+                        error_msg += f"• Correct example:\n" # Corrected example
+                        error_msg += f"```\nACxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx yyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyy\nACzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzz aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa\n```\n\n"
+
+                    if error_analysis["Account Suspended"] > 0:
+                        error_msg += f"🚫 **Suspended Accounts ({error_analysis['Account Suspended']} accounts):**\n"
+                        error_msg += f"• These accounts are suspended on Twilio\n"
+                        error_msg += f"• Create new accounts or use different accounts\n\n"
+
+                    if error_analysis["Trial Account"] > 0:
+                        error_msg += f"🎯 **Trial Accounts ({error_analysis['Trial Account']} accounts):**\n"
+                        error_msg += f"• Trial accounts have limited features\n"
+                        error_msg += f"• Upgrade by adding $20 credit\n\n"
+
+                    error_msg += f"💡 **Quick Solutions:**\n"
+                    error_msg += f"1️⃣ First test with 1 account\n"
+                    error_msg += f"2️⃣ Copy fresh SID & Token from Twilio Console\n"
+                    error_msg += f"3️⃣ Check account balance and status\n"
+                    error_msg += f"4️⃣ Create completely new Twilio accounts\n\n"
+
+                    # Show specific errors
+                    error_msg += f"📋 **Detailed Error List:**\n"
+                    for i, error in enumerate(invalid_accounts[:8], 1):  # Show max 8 errors
+                        error_msg += f"{i}. {error}\n"
+                    if len(invalid_accounts) > 8:
+                        error_msg += f"... {len(invalid_accounts) - 8} more issues\n"
+
+                    error_msg += f"\n🔄 **Next Steps:**\n"
+                    error_msg += f"• Click '🔐 bulk login' to try again\n"
+                    error_msg += f"• Or use '🔑 login' to test one account\n\n"
+                    error_msg += f"❓ **Need Help?** Contact admin for assistance."
+
+                    safe_send_message(message.chat.id, error_msg, parse_mode="Markdown")
+
+                    # Send detailed technical log to admin for debugging
+                    if detailed_errors:
+                        admin_debug_msg = f"🔧 **Debug Info for User {user_id}:**\n\n"
+                        admin_debug_msg += f"Total lines processed: {len(lines)}\n"
+                        admin_debug_msg += f"Valid accounts: {len(valid_accounts)}\n"
+                        admin_debug_msg += f"Invalid accounts: {len(invalid_accounts)}\n\n"
+                        admin_debug_msg += f"**Technical Errors:**\n"
+                        for error in detailed_errors[:10]:
+                            admin_debug_msg += f"• {error}\n"
+
+                        try:
+                            safe_send_message(admin_id, admin_debug_msg, parse_mode="Markdown")
+                        except:
+                            pass
+
+                    logger.warning(f"❌ Bulk login failed for user {user_id}: No valid accounts from {len(lines)} attempts")
+
+            except Exception as e:
+                safe_send_message(message.chat.id, f"ত্রুটি: {str(e)}")
+                logger.error(f"Error in process_bulk_twilio_login for User ID {user_id}: {str(e)}")
+
+        # Enhanced Logout Button with Complete Cleanup
+        @bot.message_handler(func=lambda message: message.text == "📤 Logout")
+        @comprehensive_error_handler
+        def logout_account(message):
+            user_id = message.chat.id
+
+            if not is_user_authorized(user_id):
+                channel_msg = "🔔 Channel membership required!\n\n"
+                channel_msg += "✨ To logout, first join these channels:\n\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    channel_msg += f"{i}. {channel['username']}\n"
+                channel_msg += "\n🎯 Use all features completely free after joining!"
+                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
+                return
+
+            session = user_data.get(user_id)
+            if session is not None:
+                # Count accounts before logout for display
+                accounts_count = 0
+                if session.get("using_bulk_pool", False):
+                    accounts_count = len(session.get("bulk_accounts", []))
+                elif session.get("using_pool", False):
+                    accounts_count = 1  # Pool account
+                else:
+                    accounts_count = 1  # Single account
+
+                # Bulk-bought numbers keep billing, so they are kept for the next login instead of dropped
+                owned_numbers = [record["phone_number"] for record in session.get("purchased_numbers", [])]
+                if owned_numbers:
+                    retained_purchased_numbers[user_id] = session["purchased_numbers"]
+
+                # Complete cleanup of all user data
+                evict_session_twilio_clients(session)
+                user_data.pop(user_id, None)
+                user_current_number.pop(user_id, None)
+                forget_search_history(user_id)
+                search_results.pop(user_id, None)
+
+                # Clear user account index for pool system
+                if user_id in user_account_index:
+                    user_account_index.pop(user_id, None)
+
+                # Create logout success message
+                logout_msg = "✅ *Success!*\n"
+                logout_msg += "*All your accounts have been logged out.*"
+                if owned_numbers:
+                    logout_msg += f"\n\n⚠️ *{len(owned_numbers)} purchased numbers are still active on your Twilio accounts and keep billing:*\n"
+                    logout_msg += "\n".join(f"• `{number}`" for number in owned_numbers)
+                    logout_msg += "\n\nLog in again and use /my\\_numbers to release them."
+
+                safe_send_message(message.chat.id, logout_msg, reply_markup=create_main_menu(user_id), parse_mode="Markdown")
+
+                # Log the logout for admin monitoring
+                logger.info(f"🚪 Complete logout performed for user {user_id}: {accounts_count} accounts cleared")
+
+            else:
+                login_msg = "🔒 *Please log in first before proceeding.*\n"
+                login_msg += "📌 *Login is required to access this feature.*"
+
+                safe_send_message(message.chat.id, login_msg, parse_mode="Markdown")
+
+
+
+        # Search Numbers by Area Code
+        @bot.message_handler(func=lambda message: message.text == "🔎 Search Numbers")
+        @comprehensive_error_handler
+        def ask_for_area_code(message):
+            user_id = message.chat.id
+
+            if not is_user_authorized(user_id):
+                channel_msg = "🔔 Channel membership required!\n\n"
+                channel_msg += "✨ To search numbers, first join these channels:\n\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    channel_msg += f"{i}. {channel['username']}\n"
+                channel_msg += "\n🎯 Use all features completely free after joining!"
+                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
+                return
+
+            # Set user in search mode
+            user_search_mode[user_id] = "search_ca_numbers"
+
+            search_msg = "📍 **Search Numbers (Default: Canada)**\n\n"
+            search_msg += "Enter a 3-digit area code to find available numbers.\n\n"
+
+            # Show search history info if exists
+            search_history = load_search_history(user_id)
+            if search_history:
+                search_msg += f"📋 You have {len(search_history)} searched numbers\n"
+                search_msg += "💫 Type 'clear history' to clear search history"
+
+            safe_send_message(message.chat.id, search_msg, parse_mode="Markdown")
+
+        # Search USA Numbers by Area Code
+        @bot.message_handler(func=lambda message: message.text == "🇺🇸 USA Numbers")
+        @comprehensive_error_handler
+        def ask_for_usa_area_code(message):
+            user_id = message.chat.id
+
+            if not is_user_authorized(user_id):
+                channel_msg = "🔔 Channel membership required!\n\n"
+                channel_msg += "✨ To search USA numbers, first join these channels:\n\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    channel_msg += f"{i}. {channel['username']}\n"
+                channel_msg += "\n🎯 Use all features completely free after joining!"
+                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
+                return
+
+            # Set user in USA search mode
+            user_search_mode[user_id] = "search_us_numbers"
+
+            search_msg = "🇺🇸 **USA Number Search** 🇺🇸\n\n"
+            search_msg += "📍 Send your 3-digit USA area code to find numbers."
+
+            safe_send_message(message.chat.id, search_msg)
+
+        # Target Number handler
+        @bot.message_handler(func=lambda message: message.text == "📍 Target Number")
+        @comprehensive_error_handler
+        def target_number_search(message):
+            user_id = message.chat.id
+            if not is_user_authorized(user_id):
+                channel_msg = "🔔 Channel membership required!\n\n"
+                channel_msg += "✨ To search target numbers, first join these channels:\n\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    channel_msg += f"{i}. {channel['username']}\n"
+                channel_msg += "\n🎯 Use all features completely free after joining!"
+                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
+                return
+
+            # Set user in target mode
+            user_search_mode[user_id] = "target_numbers"
+
+            target_msg = "🎯 Smart Target Number Search 🎯\n\n"
+            target_msg += "💡 Enter any 3 to 5-digit pattern to find matching virtual numbers.\n"
+            target_msg += "🔥 Why use this?\n"
+            target_msg += "• No area code needed\n"
+            target_msg += "• Intelligent and fast search\n"
+            target_msg += "• Instantly find matching numbers\n\n"
+            target_msg += "🎲 Now enter your desired 3–5 digit pattern below!"
+            safe_send_message(message.chat.id, target_msg, parse_mode="Markdown")
+
+        @bot.message_handler(func=lambda message: message.text.isdigit() and len(message.text) in [3, 4, 5])
+        @comprehensive_error_handler
+        def fetch_numbers_by_pattern(message):
+            user_id = message.chat.id
+
+            if not is_user_authorized(user_id):
+                channel_msg = "🔔 Channel membership required!\n\n"
+                channel_msg += "✨ To search numbers, first join these channels:\n\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    channel_msg += f"{i}. {channel['username']}\n"
+                channel_msg += "\n🎯 Use all features completely free after joining!"
+                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
+                return
+
+            # Check if user is in search numbers mode and input is more than 3 digits
+            current_mode = user_search_mode.get(user_id, None)
+            pattern = message.text
+            pattern_length = len(pattern)
+
+            # If user is in search numbers mode and input is not exactly 3 digits, reject
+            if current_mode in ["search_ca_numbers", "search_us_numbers"] and pattern_length != 3:
+                country = "Canadian" if current_mode == "search_ca_numbers" else "USA"
+                error_msg = f"❌ *In {country} search mode, please provide only a 3-digit area code!*\n\n"
+                error_msg += f"🚫 You provided {pattern_length} digits: `{pattern}`\n\n"
+                error_msg += "📝 *Correct format:*\n"
+                error_msg += "• Provide only 3 digits\n"
+                error_msg += "• Example: 416 (for CA), 212 (for USA)\n\n"
+                safe_send_message(message.chat.id, error_msg, parse_mode="Markdown")
+                return
+
+            # If user is in target numbers mode, allow 3-5 digits
+            if current_mode == "target_numbers" and pattern_length not in [3, 4, 5]:
+                error_msg = "❌ *In target number mode, provide 3-5 digit pattern!*\n\n"
+                error_msg += f"🚫 You provided {pattern_length} digits: `{pattern}`\n\n"
+                error_msg += "📝 *Correct format:*\n"
+                error_msg += "• 3 digits: 123\n"
+                error_msg += "• 4 digits: 1234\n"
+                error_msg += "• 5 digits: 12345\n\n"
+                error_msg += "💡 *Tip:* To search area code, use 🔍 search numbers button"
+                safe_send_message(message.chat.id, error_msg, parse_mode="Markdown")
+                return
+
+            # If no mode is set, default behavior (for backward compatibility)
+            if current_mode is None:
+                if pattern_length == 3:
+                    user_search_mode[user_id] = "search_ca_numbers" # Default to CA
+                else:
+                    user_search_mode[user_id] = "target_numbers"
+
+            try:
+                if user_id not in user_data:
+                    login_msg = "🔒 *Please log in first before proceeding.*\n"
+                    login_msg += "📌 *Login is required to access this feature.*"
+                    safe_send_message(message.chat.id, login_msg, parse_mode="Markdown")
+                    return
+
+                # Determine country based on search mode
+                country_code = 'US' if current_mode == "search_us_numbers" else 'CA'
+                inventory_key = (country_code, current_mode, pattern)
+                inventory_record_query(inventory_key)
+
+                # Recent results for the same search are shared by all users
+                available_numbers = inventory_lookup(inventory_key)
+                if available_numbers is None:
+                    searched_here = []
+
+                    def search_and_store():
+                        searched_here.append(True)
+                        numbers = run_hedged_search(
+                            user_id, lambda twilio_client: search_available_numbers(twilio_client, country_code, current_mode, pattern),
+                            on_failover=lambda account_number: safe_send_message(message.chat.id, f"🔄 *Auto Failover Successful!*\n\nSearching with account #{account_number}...", parse_mode="Markdown"),
+                            async_search=lambda twilio_client: search_available_numbers_async(twilio_client, country_code, current_mode, pattern),
+                        )
+                        inventory_store(inventory_key, numbers)
+                        return numbers
+
+                    try:
+                        # Identical searches already in flight share that one Twilio response
+                        try:
+                            available_numbers = number_search_flight.do(inventory_key, search_and_store)
+                        except Exception:
+                            if searched_here:
+                                raise
+                            # The shared search failed on another user's accounts; this user's may be fine
+                            inventory_stats["coalesced_retries"] += 1
+                            available_numbers = search_and_store()
+                    except NoWorkingAccount:
+                        safe_send_message(message.chat.id, "⚠️ All bulk accounts have been destroyed. Please add new accounts.")
+                        return
+
+                if available_numbers:
+                    # Add new numbers to the user's history (deduplicated, capped)
+                    search_history = record_search_history(user_id, available_numbers)
+
+                    # Enhanced search result message with total count
+                    total_numbers_in_collection = len(search_history)
+                    search_delivery_stats["searches"] += 1
+
+                    if SEARCH_DELIVERY == "paged":
+                        # One message; further pages are edits served from the stored result set
+                        results = {"pattern": pattern, "numbers": available_numbers, "in_stock": total_numbers_in_collection}
+                        search_results[user_id] = results
+                        page_msg, markup = build_results_page(results, 0)
+                        if safe_send_message(message.chat.id, page_msg, reply_markup=markup, parse_mode="Markdown"):
+                            search_delivery_stats["messages_sent"] += 1
+                    else:
+                        result_msg = f"🎯 {pattern} Area Code Search Result 🎯\n\n"
+                        result_msg += f"📱 Found: {len(available_numbers)} new numbers\n"
+                        result_msg += f"📊 In stock: {total_numbers_in_collection} numbers\n"
+                        result_msg += f"📌 Send your preferred area code to search again"
+
+                        safe_send_message(message.chat.id, result_msg, parse_mode="Markdown")
+
+                        # Send numbers in batches of 30 with counter
+                        numbers_sent = 0
+                        for phone_number in available_numbers:
+                            if safe_send_message(user_id, phone_number):
+                                numbers_sent += 1
+
+                                # After every 30 numbers, send encouragement message
+                                if numbers_sent % 30 == 0:
+                                    encouragement_msg = f"🚀 {numbers_sent} numbers sent successfully!\n\n"
+                                    encouragement_msg += f"💫 Want more numbers? Search again!\n"
+                                    encouragement_msg += f"🔄 Get more numbers with a new area code"
+                                    safe_send_message(user_id, encouragement_msg, parse_mode="Markdown")
+                            else:
+                                logger.error(f"Failed to send number: {phone_number}")
+
+                        # Final message if remaining numbers (less than 30)
+                        if numbers_sent > 0 and numbers_sent % 30 != 0:
+                            final_msg = f"✅ **Total {numbers_sent} numbers sent successfully!**\n\n"
+                            final_msg += f"🔄 **To get more numbers** search again\n"
+                            final_msg += f"⚡ **Check unlimited** numbers together\n"
+                            final_msg += f"🎯 **Forward to vote** with the best numbers!"
+                            safe_send_message(user_id, final_msg, parse_mode="Markdown")
+                        search_delivery_stats["messages_sent"] += 1 + numbers_sent + numbers_sent // 30 + (1 if numbers_sent % 30 else 0)
+                else:
+                    no_result_msg = f"🎯 {pattern} Area Code Search Result 🎯\n\n"
+                    no_result_msg += f"📱 Found: 0 new numbers\n"
+                    no_result_msg += f"📊 In stock: 0 numbers\n"
+                    no_result_msg += f"📌 Send your preferred area code to search again"
+                    safe_send_message(message.chat.id, no_result_msg)
+            except Exception as e:
+                safe_send_message(message.chat.id, f"Error searching numbers: {str(e)}")
+                logger.error(f"Error in fetch_numbers_by_area_code for User ID {user_id}: {str(e)}")
+
+        # Check channels status
+        @bot.message_handler(func=lambda message: message.text == "🔗 Check Channels")
+        @comprehensive_error_handler
+        def check_channels_status(message):
+            user_id = message.chat.id
+            if user_id == admin_id:
+                safe_send_message(message.chat.id, "You are admin, no need to check channels.")
+                return
+
+            if fresh_channel_check(user_id):
+                status_msg = "✅ Channel Status: Active\n\n"
+                status_msg += "🎉 You have joined all required channels!\n\n"
+                status_msg += "📢 Joined Channels:\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    status_msg += f"{i}. {channel['username']} ✅\n"
+                status_msg += "\n🎯 Now you can use all features completely free!"
+                safe_send_message(message.chat.id, status_msg)
+            else:
+                status_msg = "❌ Channel Status: Incomplete\n\n"
+                status_msg += "⚠️ You haven't joined all channels!\n\n"
+                status_msg += "📢 Required Channels:\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    status_msg += f"{i}. {channel['username']}\n"
+                safe_send_message(message.chat.id, status_msg, reply_markup=create_channel_join_menu())
+
+        # Help handler
+        @bot.message_handler(func=lambda message: message.text == "❓ Help")
+        @comprehensive_error_handler
+        def help_handler(message):
+            user_id = message.chat.id
+
+            if not is_user_authorized(user_id):
+                channel_msg = "🔔 Channel membership required!\n\n"
+                channel_msg += "✨ To get help, first join these channels:\n\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    channel_msg += f"{i}. {channel['username']}\n"
+                channel_msg += "\n🎯 Use all features completely free after joining!"
+                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
+                return
+
+            help_msg = "━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+            help_msg += "📌 COMPLETE BOT USAGE GUIDE 📌\n"
+            help_msg += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+
+            help_msg += "🔑 Login Method:\n"
+            help_msg += "• Click the login button\n"
+            help_msg += "• Enter your Twilio Account SID and Auth Token\n"
+            help_msg += "• Format: SID Auth_Token (separated by space)\n\n"
+
+            help_msg += "🔐 Bulk Login (Multiple Accounts)\n"
+            help_msg += "• Click the bulk login' button\n"
+            help_msg += "• Enter one account per line\n"
+            help_msg += "• Auto-failover system will activate\n\n"
+
+            help_msg += "🔍 Number Search Rules:\n"
+            help_msg += "• Click the 'search numbers button\n"
+            help_msg += "• Enter 3-digit area code (e.g., 416, 647)\n"
+            help_msg += "• View available numbers and purchase your choice\n\n" # Corrected example
+
+            help_msg += "🎯 Target Number (Specific Pattern)\n"
+            help_msg += "• Click the target number' button\n"
+            help_msg += "• Enter any 3-5 digit pattern\n"
+            help_msg += "• Smart search system will work\n\n"
+
+            help_msg += "📩 SMS Receiving Method:\n"
+            help_msg += "• First purchase a number\n"
+            help_msg += "• Click the 'receive sms' button\n"
+            help_msg += "• Or use the 'View SMS' button after purchase\n\n"
+
+            help_msg += "📦 Your Numbers:\n"
+            help_msg += "• Buy several at once with 'Buy N from this page'\n"
+            help_msg += "• Send /my\\_numbers to switch between or release them\n\n"
+
+            help_msg += "🚪 Logout Process:\n"
+            help_msg += "• Click the logout' button\n"
+            help_msg += "• All data will be erased for security\n\n"
+
+            help_msg += "📋 Check Channel:\n"
+            help_msg += "• Check your status with 'check channels\n"
+            help_msg += "• Join the channel if required\n\n"
+
+            help_msg += "⚠️ Important Information:\n"
+            help_msg += "• Must stay in channel to use the bot\n"
+            help_msg += "• Auto-failover when adding multiple accounts\n"
+            help_msg += "• All services are completely free and secure\n\n"
+
+            help_msg += "🎯 Pro Tips:\n"
+            help_msg += "• Add up to 15 accounts in bulk login\n"
+            help_msg += "• Popular area codes: e.g., 416, 647, 437, 905\n"
+            help_msg += "• Try patterns like 123, 456, 789\n\n" # Corrected example
+
+            help_msg += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+            help_msg += "💫 Contact admin for any issues!\n"
+            help_msg += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+
+            # Create inline keyboard with Admin Inbox button
+            markup = InlineKeyboardMarkup()
+            markup.add(InlineKeyboardButton("📧 Admin Inbox", url=f"https://t.me/{ADMIN_USERNAME[1:]}"))
+
+            safe_send_message(message.chat.id, help_msg, reply_markup=markup, parse_mode="Markdown")
+
+        # Receive SMS Messages (registered before the catch-all text handler below)
+        @bot.message_handler(func=lambda message: message.text == "💬 Receive SMS")
+        @comprehensive_error_handler
+        def receive_sms(message):
+            user_id = message.chat.id
+
+            if not is_user_authorized(user_id):
+                channel_msg = "🔔 Channel membership required!\n\n"
+                channel_msg += "✨ To receive SMS, first join these channels:\n\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    channel_msg += f"{i}. {channel['username']}\n"
+                channel_msg += "\n🎯 Use all features completely free after joining!"
+                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
+                return
+
+            if user_id not in user_data:
+                login_msg = "🔒 Please log in first before proceeding\n"
+                login_msg += "📌 Login is required to access this feature\n\n"
+                safe_send_message(message.chat.id, login_msg, parse_mode="Markdown")
+                return
+
+            if user_id not in user_current_number:
+                safe_send_message(message.chat.id, "You haven't purchased any phone number yet. Use '🔍 search numbers' to buy one.")
+                return
+
+            try:
+                phone_number = user_current_number[user_id]['phone_number']
+
+                try:
+                    messages = run_twilio_operation(
+                        user_id, "receive_sms", lambda twilio_client: twilio_client.messages.list(to=phone_number, limit=10),
+                        on_failover=lambda account_number: safe_send_message(message.chat.id, f"🔄 *Auto Failover Successful!*\n\nChecking SMS with account #{account_number}...", parse_mode="Markdown"),
+                        async_operation=lambda twilio_client: twilio_client.messages.list_async(to=phone_number, limit=10),
+                    )
+                except NoWorkingAccount:
+                    safe_send_message(message.chat.id, "⚠️ All bulk accounts have failed. Cannot retrieve SMS.")
+                    return
+
+                if messages:
+                    response = f"📱 *Number:* `{phone_number}`\n\n"
+                    response += "📩 *Recent SMS Messages:*\n"
+                    response += "━━━━━━━━━━━━━━━━━━━━━\n"
+                    for msg in messages:
+                        timestamp = msg.date_sent.strftime("%Y-%m-%d %H:%M:%S") if msg.date_sent else "Unknown time"
+                        response += f"👤 *From:* {msg.from_}\n⏰ *Time:* {timestamp}\n\n```\n{msg.body}\n```\n\n"
+                    safe_send_message(message.chat.id, response, parse_mode="Markdown")
+                else:
+                    safe_send_message(message.chat.id, f"*Purchased Number:* `{phone_number}`\n\nNo SMS messages found for this number.", parse_mode="Markdown")
+            except Exception as e:
+                safe_send_message(message.chat.id, f"Error retrieving SMS: {e}")
+                logger.error(f"Error in receive_sms for User ID {user_id}: {str(e)}")
+
+        # Handle Forwarded Numbers
+        @bot.message_handler(func=lambda message: message.text.lower() == "clear history")
+        @comprehensive_error_handler
+        def clear_search_history(message):
+            user_id = message.chat.id
+
+            if not is_user_authorized(user_id):
+                return
+
+            count = forget_search_history(user_id)
+            if count:
+                search_results.pop(user_id, None)
+                safe_send_message(message.chat.id, f"✅ Search history cleared for {count} numbers!")
+            else:
+                safe_send_message(message.chat.id, "📋 No search history found.")
+
+        @bot.message_handler(content_types=['text'])
+        @comprehensive_error_handler
+        def handle_numbers(message):
+            user_id = message.chat.id
+
+            if not is_user_authorized(user_id):
+                channel_msg = "🔔 Channel subscription required!\n\n"
+                channel_msg += "✨ To use the bot, first join these channels:\n\n"
+                for i, channel in enumerate(REQUIRED_CHANNELS, 1):
+                    channel_msg += f"{i}. {channel['username']}\n"
+                channel_msg += "\n🎯 Use all features completely free after joining!"
+                safe_send_message(message.chat.id, channel_msg, reply_markup=create_channel_join_menu())
+                return
+
+            if user_id not in user_data:
+                login_msg = "🔒 Please log in first before proceeding\n"
+                login_msg += "📌 Login is required to access this feature\n\n"
+
+                safe_send_message(message.chat.id, login_msg, parse_mode="Markdown")
+                return
+
+            # Check against all possible button texts to avoid re-triggering handlers
+            button_texts = ["👤 Login", "➕ Bulk Login", "📤 Logout", "🔎 Search Numbers", "🇺🇸 USA Numbers", "📍 Target Number", "💬 Receive SMS", "🔗 Check Channels", "❓ Help", "⚙️ Admin Panel", "📣 Broadcast", "clear history"]
+            # Add other variations from create_main_menu if necessary
+            if message.text in button_texts:
+                return
+
+            try:
+                normalized_numbers = extract_phone_numbers(message.text)
+                if not normalized_numbers:
+                    return
+
+                search_history = load_search_history(user_id)
+                whatsapp_info_sent = False
+                for number in normalized_numbers:
+                    try:
+                        if number in search_history:
+                            markup = InlineKeyboardMarkup()
+                            markup.add(InlineKeyboardButton("Buy", callback_data=f"buy_{number}"))
+                            display_number = f"📱 *Number:* `{number}`\n💫 _Click Buy button_"
+                            if not safe_send_message(message.chat.id, display_number, reply_markup=markup, parse_mode="Markdown"):
+                                logger.error(f"Failed to send number with Buy button: {number}")
+                        elif not whatsapp_info_sent:
+                            # The info comes from the whole message, so it is sent once, not per number
+                            whatsapp_info_sent = True
+                            info = extract_whatsapp_info(message.text)
+                            if info['number'] and info['code'] and info['time']:
+                                formatted_msg, markup = format_sms_message(info['number'], info['code'], info['time'])
+                                safe_send_message(message.chat.id, formatted_msg, reply_markup=markup, parse_mode="Markdown")
+                    except Exception as e:
+                        logger.error(f"Error processing number {number}: {str(e)}")
+                        continue
+            except Exception as e:
+                safe_send_message(message.chat.id, f"Error processing number: {str(e)}")
+                logger.error(f"Error in handle_numbers for User ID {user_id}: {str(e)}, Original text: {message.text}")
+
+        # Buy Number Callback
+        @bot.callback_query_handler(func=lambda call: call.data.startswith("buy_"))
+        @comprehensive_error_handler
+        def buy_number(call):
+            user_id = call.message.chat.id
+
+            if not is_user_authorized(user_id):
+                try:
+                    bot.answer_callback_query(call.id, "Please join the channels first!", show_alert=True)
+                except:
+                    pass
+                return
+
+            try:
+                callback_parts = call.data.split("_")
+                phone_number = callback_parts[1]
+                # Buttons on a search results page carry the page number; keep that page on screen
+                from_results_page = len(callback_parts) > 2
+                if user_id not in user_data:
+                    try:
+                        bot.answer_callback_query(call.id, "Please login first!")
+                    except:
+                        pass
+                    return
+
+                current_number = user_current_number.get(user_id)
+                # Bulk-bought numbers stay owned until released from /my_numbers; only an untracked one is replaced
+                kept_number = current_number if current_number and any(
+                    record["phone_number"] == current_number["phone_number"]
+                    for record in user_data[user_id].get("purchased_numbers", [])) else None
+                release_previous = bool(current_number) and not kept_number
+                # The previous number lives on the account the session uses now, even if the buy fails over
+                previous_account = (user_data[user_id]["sid"], user_data[user_id]["auth_token"])
+
+                def purchase_number(twilio_client):
+                    return twilio_client.incoming_phone_numbers.create(phone_number=phone_number)
+
+                async def purchase_number_async(twilio_client):
+                    return await twilio_client.incoming_phone_numbers.create_async(phone_number=phone_number)
+
+                def announce_failover(account_number):
+                    try:
+                        bot.answer_callback_query(call.id, f"🔄 Auto Failover! Number purchased with account #{account_number}!")
+                    except:
+                        pass
+
+                try:
+                    purchased_number = run_twilio_operation(user_id, "buy", purchase_number, on_failover=announce_failover,
+                                                            async_operation=purchase_number_async)
+                except NoWorkingAccount:
+                    try:
+                        bot.answer_callback_query(call.id, "⚠️ All bulk accounts have been destroyed.")
+                    except:
+                        pass
+                    return
+                except Exception as e:
+                    if not isinstance(e, TWILIO_TRANSPORT_ERRORS) or may_resend_operation("buy", e):
+                        raise
+                    # Twilio may have bought the number before the response was lost: do not guess either way
+                    logger.error(f"Buy of {phone_number} for User ID {user_id} timed out, outcome unknown: {str(e)}")
+                    try:
+                        bot.answer_callback_query(call.id, "⏱️ Twilio did not answer in time. The number may have been bought: "
+                                                           "check the numbers on your Twilio account before buying again.", show_alert=True)
+                    except:
+                        pass
+                    return
+
+                # Release the previous number only once the new one is bought
+                if release_previous:
+                    try:
+                        get_twilio_client(*previous_account).incoming_phone_numbers(current_number['sid']).delete()
+                    except Exception as e:
+                        logger.error(f"Error deleting previous number for User ID {user_id}: {str(e)}")
+                inventory_remove_number(purchased_number.phone_number)
+                user_current_number[user_id] = {
+                    "phone_number": purchased_number.phone_number,
+                    "sid": purchased_number.sid
+                }
+
+                markup = InlineKeyboardMarkup()
+                markup.add(InlineKeyboardButton(text="View SMS 📩", callback_data="view_sms"))
+
+                purchased_msg = f"Successfully purchased: `{purchased_number.phone_number}` _(click to copy)_"
+                if kept_number:
+                    purchased_msg += f"\n\n📦 `{kept_number['phone_number']}` is still yours; manage it with /my\\_numbers"
+                if from_results_page:
+                    safe_send_message(call.message.chat.id, purchased_msg, reply_markup=markup, parse_mode="Markdown")
+                else:
+                    try:
+                        bot.edit_message_text(chat_id=call.message.chat.id, message_id=call.message.message_id,
+                                              text=purchased_msg,
+                                              reply_markup=markup,
+                                              parse_mode="Markdown")
+                    except:
+                        pass
+                try:
+                    bot.answer_callback_query(call.id, "Number purchased successfully!")
+                except:
+                    pass
+            except Exception as e:
+                error_message = str(e)
+                if "Trial account" in error_message:
+                    try:
+                        bot.answer_callback_query(call.id, "Error: Trial account cannot purchase this number. Please upgrade your Twilio account.")
+                    except:
+                        pass
+                else:
+                    if "Account is restricted" in error_message:
+                        error_msg = "⚠️ Sorry! Your free Twilio account can no longer purchase new numbers. Please use a paid account."
+                    else:
+                        error_msg = f"ত্রুটি: {error_message[:100]}"
+                    try:
+                        bot.answer_callback_query(call.id, error_msg)
+                    except:
+                        pass
+                logger.error(f"Error in buy_number for User ID {user_id}: {str(e)}")
+
+        # Search results paging
+        @bot.callback_query_handler(func=lambda call: call.data.startswith("results_page_"))
+        @comprehensive_error_handler
+        def show_results_page(call):
+            user_id = call.message.chat.id
+            results = search_results.get(user_id)
+            if not results:
+                try:
+                    bot.answer_callback_query(call.id, "These results have expired. Please search again.")
+                except:
+                    pass
+                return
+
+            page_msg, markup = build_results_page(results, int(call.data.rsplit("_", 1)[1]))
+            try:
+                bot.edit_message_text(chat_id=call.message.chat.id, message_id=call.message.message_id,
+                                      text=page_msg, reply_markup=markup, parse_mode="Markdown")
+                search_delivery_stats["pages_served"] += 1
+            except Exception as e:
+                logger.error(f"Error showing results page for User ID {user_id}: {str(e)}")
+            try:
+                bot.answer_callback_query(call.id)
+            except:
+                pass
+
+        # Bulk buy from a search results page
+        @bot.callback_query_handler(func=lambda call: call.data.startswith("bulkbuy_"))
+        @comprehensive_error_handler
+        def bulk_buy_page(call):
+            user_id = call.message.chat.id
+
+            if not is_user_authorized(user_id):
+                try:
+                    bot.answer_callback_query(call.id, "Please join the channels first!", show_alert=True)
+                except:
+                    pass
+                return
+            if user_id not in user_data:
+                try:
+                    bot.answer_callback_query(call.id, "Please login first!")
+                except:
+                    pass
+                return
+            results = search_results.get(user_id)
+            if not results:
+                try:
+                    bot.answer_callback_query(call.id, "These results have expired. Please search again.")
+                except:
+                    pass
+                return
+
+            page = int(call.data.split("_", 1)[1])
+            phone_numbers = results["numbers"][page * SEARCH_PAGE_SIZE:(page + 1) * SEARCH_PAGE_SIZE][:BULK_BUY_MAX]
+            # A double tap must not start a second batch for the same numbers
+            with purchased_numbers_lock:
+                already_buying = user_id in bulk_buy_active
+                bulk_buy_active.add(user_id)
+            if already_buying:
+                try:
+                    bot.answer_callback_query(call.id, "⏳ A bulk buy is already running. Please wait.")
+                except:
+                    pass
+                return
+            try:
+                bot.answer_callback_query(call.id, f"🛒 Buying {len(phone_numbers)} numbers...")
+            except:
+                pass
+
+            try:
+                purchases = bulk_buy_numbers(user_id, phone_numbers)
+            finally:
+                with purchased_numbers_lock:
+                    bulk_buy_active.discard(user_id)
+            bulk_accounts = [account["sid"] for account in user_data[user_id].get("bulk_accounts", [])]
+            bought = [record["phone_number"] for _, record, _ in purchases if record]
+
+            summary_msg = f"🛒 *Bulk buy: {len(bought)}/{len(purchases)} numbers purchased*\n\n"
+            for phone_number, record, error in purchases:
+                if record:
+                    account_label = f" (account #{bulk_accounts.index(record['account_sid']) + 1})" if record["account_sid"] in bulk_accounts else ""
+                    summary_msg += f"✅ `{record['phone_number']}`{account_label}\n"
+                else:
+                    summary_msg += f"❌ `{phone_number}`: {str(error)[:80].replace('`', '').replace('*', '').replace('_', ' ')}\n"
+            if bought:
+                summary_msg += "\n📦 Use /my\\_numbers to switch between or release your numbers"
+            markup = InlineKeyboardMarkup()
+            markup.add(InlineKeyboardButton(text="View SMS 📩", callback_data="view_sms"))
+            safe_send_message(call.message.chat.id, summary_msg, reply_markup=markup if bought else None, parse_mode="Markdown")
+
+            if bought:
+                # Purchased numbers leave the stored result set and the page on screen
+                results["numbers"] = [number for number in results["numbers"] if number not in bought]
+                search_results[user_id] = results
+                page_msg, page_markup = build_results_page(results, page)
+                try:
+                    bot.edit_message_text(chat_id=call.message.chat.id, message_id=call.message.message_id,
+                                          text=page_msg, reply_markup=page_markup, parse_mode="Markdown")
+                except Exception as e:
+                    logger.error(f"Error refreshing results page after bulk buy for User ID {user_id}: {str(e)}")
+
+        # Numbers the user owns: list, switch, release
+        @bot.message_handler(commands=['my_numbers'])
+        @comprehensive_error_handler
+        def my_numbers_cmd(message):
+            user_id = message.chat.id
+            if not is_user_authorized(user_id):
+                return
+            if user_id not in user_data:
+                safe_send_message(message.chat.id, "🔒 *Please log in first before proceeding.*", parse_mode="Markdown")
+                return
+
+            numbers_msg, markup = build_my_numbers_message(user_id)
+            safe_send_message(message.chat.id, numbers_msg, reply_markup=markup, parse_mode="Markdown")
+
+        @bot.callback_query_handler(func=lambda call: call.data.startswith(("usenum_", "releasenum_")))
+        @comprehensive_error_handler
+        def manage_number(call):
+            user_id = call.message.chat.id
+            if not is_user_authorized(user_id) or user_id not in user_data:
+                try:
+                    bot.answer_callback_query(call.id, "Please login first!")
+                except:
+                    pass
+                return
+
+            action, phone_number = call.data.split("_", 1)
+            record = find_user_number(user_id, phone_number)
+            if record is None:
+                try:
+                    bot.answer_callback_query(call.id, "This number is no longer tracked.")
+                except:
+                    pass
+                return
+
+            try:
+                if action == "usenum":
+                    use_purchased_number(user_id, record)
+                    notice = f"⭐ {phone_number} is now your current number"
+                else:
+                    release_purchased_number(user_id, record)
+                    notice = f"🗑 {phone_number} released"
+            except Exception as e:
+                logger.error(f"Error in manage_number ({action}) for User ID {user_id}: {str(e)}")
+                notice = f"Error: {str(e)[:100]}"
+
+            numbers_msg, markup = build_my_numbers_message(user_id)
+            try:
+                bot.edit_message_text(chat_id=call.message.chat.id, message_id=call.message.message_id,
+                                      text=numbers_msg, reply_markup=markup, parse_mode="Markdown")
+            except:
+                pass
+            try:
+                bot.answer_callback_query(call.id, notice)
+            except:
+                pass
+
+        # View SMS via Inline Button
+        @bot.callback_query_handler(func=lambda call: call.data.startswith("copy_"))
+        @comprehensive_error_handler
+        def copy_text_callback(call):
+            try:
+                text_to_copy = call.data.replace("copy_", "")
+                try:
+                    bot.answer_callback_query(call.id, f"Copied: {text_to_copy}")
+                except:
+                    pass
+            except Exception as e:
+                try:
+                    bot.answer_callback_query(call.id, "Failed to copy")
+                except:
+                    pass
+                logger.error(f"Error in copy_text_callback: {str(e)}")
+
+        @bot.callback_query_handler(func=lambda call: call.data == "view_sms")
+        @comprehensive_error_handler
+        def view_sms_callback(call):
+            user_id = call.message.chat.id
+
+            if not is_user_authorized(user_id):
+                try:
+                    bot.answer_callback_query(call.id, "Please join the channels first!", show_alert=True)
+                except:
+                    pass
+                return
+
+            if user_id not in user_data:
+                try:
+                    bot.answer_callback_query(call.id, "Please login first!")
+                except:
+                    pass
+                return
+
+            if user_id not in user_current_number:
+                try:
+                    bot.answer_callback_query(call.id, "You haven't purchased any phone number yet. Use '🔍 search numbers' to buy one.")
+                except:
+                    pass
+                return
+
+            try:
+                phone_number = user_current_number[user_id]['phone_number']
+
+                try:
+                    messages = run_twilio_operation(
+                        user_id, "view_sms", lambda twilio_client: twilio_client.messages.list(to=phone_number, limit=1),
+                        async_operation=lambda twilio_client: twilio_client.messages.list_async(to=phone_number, limit=1),
+                    )
+                except NoWorkingAccount:
+                    try:
+                        bot.answer_callback_query(call.id, "⚠️ All bulk accounts have been destroyed")
+                    except:
+                        pass
+                    return
+
+                markup = InlineKeyboardMarkup()
+                markup.add(InlineKeyboardButton(text="View SMS 📩", callback_data="view_sms"))
+
+                if not messages:
+                    response = f"`{phone_number}`\n\nNo new SMS found."
+                else:
+                    msg = messages[0]
+
+                    # Extract OTP from message body
+                    otp_match = re.search(r'\b\d{4,8}\b', msg.body)
+                    otp_code = otp_match.group(0) if otp_match else "No OTP Found"
+
+                    # New format as requested by the user
+                    # 1. OTP Code
+                    # 2. Purchased Number
+                    # 3. Full SMS Body
+                    response_parts = [
+                        otp_code,
+                        phone_number,
+                        f"\n{msg.body}"
+                    ]
+                    response = "\n".join(response_parts)
+
+                if len(response) > 4000:
+                    response = response[:3997] + "..."
+                try:
+                    bot.edit_message_text(
+                        chat_id=call.message.chat.id,
+                        message_id=call.message.message_id,
+                        text=response,
+                        reply_markup=markup,
+                        parse_mode=None # Use None for plain text
+                    )
+                except:
+                    pass
+                try:
+                    bot.answer_callback_query(call.id, "Viewing SMS")
+                except:
+                    pass
+            except Exception as e:
+                try:
+                    bot.answer_callback_query(call.id, f"Error retrieving SMS: {e}")
+                except:
+                    pass
+                logger.error(f"Error in view_sms_callback for User ID {user_id}: {str(e)}")
+
+        # Admin Actions
+        @bot.callback_query_handler(func=lambda call: call.data.startswith("admin_"))
+        @comprehensive_error_handler
+        def admin_actions(call):
+            if call.message.chat.id != admin_id:
+                try:
+                    bot.answer_callback_query(call.id, "Unauthorized access.")
+                except:
+                    pass
+                return
+
+            action = call.data.split("_")[1]
+            safe_send_message(call.message.chat.id, f"Please provide User ID to {action}:")
+            try:
+                register_pending_step(call.message, "admin_action", action)
+            except Exception as e:
+                logger.error(f"Error registering step handler: {str(e)}")
+
+        @comprehensive_error_handler
+        def process_admin_action(message, action):
+            try:
+                user_id = int(message.text.strip())
+                logger.info(f"Processing {action} for User ID: {user_id}")
+
+                if action == "approve":
+                    if user_id in registered_users and registered_users[user_id].status == UserStatus.APPROVED:
+                        safe_send_message(message.chat.id, f"User {user_id} is already approved.")
+                        return
+
+                    with registered_users_lock:
+                        if user_id not in registered_users:
+                            registered_users[user_id] = UserRecord(UserStatus.PENDING)
+
+                    registered_users[user_id].status = UserStatus.APPROVED
+                    mark_user_dirty(user_id)
+
+                    safe_send_message(message.chat.id, f"✅ User {user_id} has been successfully approved.")
+
+                    approval_msg = "🌟 *Congratulations! Your account has been approved* 🌟\n"
+                    approval_msg += "━━━━━━━━━━━━━━━━━━━━━\n\n"
+                    approval_msg += "✨ Now you can use the bot!\n\n"
+                    approval_msg += "📋 *Next Steps:*\n"
+                    approval_msg += "• Join the required channels\n"
+                    approval_msg += "• Complete channel verification\n"
+                    approval_msg += "• Enjoy all bot features\n\n"
+                    approval_msg += "💫 _Thank you for using our service_"
+
+                    safe_send_message(user_id, approval_msg, parse_mode="Markdown")
+
+                elif action == "block":
+                    if user_id in registered_users:
+                        registered_users[user_id].status = UserStatus.BLOCKED
+                        block_msg = "⛔️ *Account Block Notification*\n"
+                        block_msg += "━━━━━━━━━━━━━━━━━━━━━\n\n"
+                        block_msg += "❌ Your account has been temporarily blocked.\n\n"
+                        block_msg += "📝 *What to do:*\n"
+                        block_msg += f"• Contact {ADMIN_USERNAME}\n"
+                        block_msg += "• Explain your problem in detail\n"
+                        block_msg += "• Promise to follow the rules\n\n"
+                        block_msg += "⚠️ _We will try to solve your problem quickly_"
+                        safe_send_message(user_id, block_msg, parse_mode="Markdown")
+                        safe_send_message(message.chat.id, f"✅ User {user_id} has been successfully blocked.")
+                        mark_user_dirty(user_id)
+                    else:
+                        safe_send_message(message.chat.id, f"❌ User {user_id} Not registered.")
+
+                elif action == "unblock":
+                    if user_id in registered_users:
+                        registered_users[user_id].status = UserStatus.APPROVED
+                        unblock_msg = "🎉 *Congratulations! Your account has been unblocked*\n"
+                        unblock_msg += "━━━━━━━━━━━━━━━━━━━━━\n\n"
+                        unblock_msg += "✅ Now you can use our services again\n\n"
+                        unblock_msg += "📱 *Next Steps:*\n"
+                        unblock_msg += "• Join the channels\n"
+                        unblock_msg += "• Complete verification\n\n"
+                        unblock_msg += "💫 _Thank you for using our service_"
+                        safe_send_message(user_id, unblock_msg, parse_mode="Markdown")
+                        safe_send_message(message.chat.id, f"✅ User {user_id} has been successfully unblocked.")
+                        mark_user_dirty(user_id)
+                    else:
+                        safe_send_message(message.chat.id, f"User {user_id} is not registered.")
+            except ValueError:
+                safe_send_message(message.chat.id, "Invalid User ID. Please provide a valid numeric ID.")
+            except Exception as e:
+                safe_send_message(message.chat.id, f"An error occurred: {str(e)}")
+                logger.error(f"Error in process_admin_action for User ID {message.text}: {str(e)}")
+
+        step_handlers.update({
+            "broadcast_message": process_broadcast_message,
+            "add_account": process_add_account,
+            "twilio_login": process_twilio_login,
+            "bulk_twilio_login": process_bulk_twilio_login,
+            "admin_action": process_admin_action,
+        })
+
+        logger.info("All handlers setup completed successfully")
+        return True
+
+    except Exception as e:
+        logger.error(f"Critical error setting up handlers: {str(e)}", exc_info=True)
+        return False
+
+
+
+
+
+app = Flask(__name__)
+
+# Global bot instance
+bot = telebot.TeleBot(TELEGRAM_BOT_TOKEN)
+
+@app.route("/" + TELEGRAM_BOT_TOKEN, methods=['POST'])
+def getMessage():
+    # Account health is probed in the background from the first update on, not on the request path
+    start_account_prober()
+    try:
+        bot.process_new_updates([telebot.types.Update.de_json(request.stream.read().decode("utf-8"))])
+        return "!", 200
+    except Exception as e:
+        logger.error(f"Error in getMessage: {e}")
+        return "?", 500
+
+@app.route("/")
+def webhook():
+    bot.remove_webhook()
+    bot.set_webhook(url=f"https://{os.environ.get('RENDER_EXTERNAL_HOSTNAME')}/{TELEGRAM_BOT_TOKEN}",
+                    allowed_updates=WEBHOOK_ALLOWED_UPDATES)
+    return "Webhook set!", 200
+
+if __name__ == "__main__":
+    # One-shot users.json -> SQLite migration: python Twiliopro.py migrate-users
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate-users":
+        migrated = migrate_users_json_to_sqlite()
+        print(f"Migrated {migrated} users to {USERS_DB_FILE}")
+        sys.exit(0)
+
+    # Make SIGTERM a normal exit so the atexit flush of dirty users runs
+    # (under gunicorn the worker_exit hook in gunicorn.conf.py flushes instead)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    safe_load_registered_users()
+    setup_all_handlers()
+    app.run(host="0.0.0.0", port=int(os.environ.get('PORT', 5000)))
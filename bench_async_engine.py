@@ -0,0 +1,150 @@
+"""Throughput benchmark: thread engine vs asyncio engine at N concurrent users.
+
+Every simulated user runs the same flow through Twiliopro's operation executor:
+an area-code search on their Twilio account, then a Telegram reply with the
+result count. The asyncio engine only covers Twilio operations, so the asyncio
+flow sends its reply with telebot's AsyncTeleBot directly. The thread engine runs flows on a fixed worker pool (the blocking
+webhook model); the asyncio engine runs all flows as coroutines on one loop.
+Both APIs are the fake local servers from bench_handlers.py, run in a child
+process so their CPU time does not count against the engine being measured.
+
+Usage: python bench_async_engine.py [--users 1000] [--threads 64] [--accounts 10]
+                                    [--twilio-latency MS] [--telegram-latency MS]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+# Measure the engines, not the per-account rate limiter
+os.environ.setdefault("TWILIO_RATE_PER_ACCOUNT", "100000")
+os.environ.setdefault("TWILIO_RATE_BURST", "100000")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import telebot  # noqa: E402
+import telebot.asyncio_helper  # noqa: E402
+from telebot.async_telebot import AsyncTeleBot  # noqa: E402
+
+from bench_handlers import (  # noqa: E402
+    FakeApiServer, FakeTelegramHandler, FakeTwilioHandler, Twiliopro, make_sid, make_token, redirect_twilio_to,
+)
+
+# twilio's async client still passes auth= to aiohttp
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+# 1k simultaneous connections would overflow socketserver's default backlog of 5
+ThreadingHTTPServer.request_queue_size = 2048
+
+
+def serve_fake_apis(conn, twilio_latency, telegram_latency):
+    """Child process: run both fake APIs and report call counts on request"""
+    telegram = FakeApiServer(FakeTelegramHandler, latency=telegram_latency).start()
+    twilio = FakeApiServer(FakeTwilioHandler, latency=twilio_latency).start()
+    conn.send((telegram.base_url, twilio.base_url))
+    while conn.recv() == "counts":
+        conn.send((twilio.total_calls(), telegram.total_calls()))
+    telegram.stop()
+    twilio.stop()
+
+
+def login_users(count, accounts):
+    """Bulk-pool sessions spread over a handful of Twilio accounts"""
+    bulk_accounts = [{"sid": make_sid(i), "auth_token": make_token(i), "status": "active"} for i in range(accounts)]
+    user_ids = [900000 + i for i in range(count)]
+    for index, user_id in enumerate(user_ids):
+        account = bulk_accounts[index % accounts]
+        Twiliopro.user_data[user_id] = {
+            "sid": account["sid"], "auth_token": account["auth_token"],
+            "bulk_accounts": bulk_accounts, "current_bulk_index": index % accounts, "using_bulk_pool": True,
+        }
+    return user_ids
+
+
+def threaded_flow(user_id):
+    started = time.time()
+    numbers = Twiliopro.run_twilio_operation(
+        user_id, "search",
+        lambda twilio_client: Twiliopro.search_available_numbers(twilio_client, "CA", "search_ca_numbers", "416"),
+    )
+    Twiliopro.safe_send_message(user_id, f"Found {len(numbers)} numbers")
+    return time.time() - started
+
+
+async def async_flow(telegram, user_id):
+    started = time.time()
+    numbers = await Twiliopro.run_twilio_operation_async(
+        user_id, "search",
+        lambda twilio_client: Twiliopro.search_available_numbers_async(twilio_client, "CA", "search_ca_numbers", "416"),
+    )
+    await telegram.send_message(user_id, f"Found {len(numbers)} numbers")
+    return time.time() - started
+
+
+def run_threads(user_ids, threads):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(threaded_flow, user_ids))
+
+
+def run_asyncio(user_ids):
+    telegram = AsyncTeleBot(Twiliopro.TELEGRAM_BOT_TOKEN)
+
+    async def all_flows():
+        return await asyncio.gather(*(async_flow(telegram, user_id) for user_id in user_ids))
+    return Twiliopro.async_engine.run(all_flows())
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=64, help="worker threads for the thread engine")
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--twilio-latency", type=float, default=200, help="ms per Twilio call")
+    parser.add_argument("--telegram-latency", type=float, default=50, help="ms per Bot API call")
+    args = parser.parse_args()
+
+    if Twiliopro.AsyncTwilioHttpClient is None:
+        sys.exit("aiohttp is not installed; the asyncio engine is unavailable")
+
+    conn, child_conn = multiprocessing.Pipe()
+    fake_apis = multiprocessing.Process(target=serve_fake_apis, daemon=True,
+                                        args=(child_conn, args.twilio_latency / 1000, args.telegram_latency / 1000))
+    fake_apis.start()
+    telegram_url, twilio_url = conn.recv()
+    telebot.apihelper.API_URL = telegram_url + "/bot{0}/{1}"
+    telebot.asyncio_helper.API_URL = telegram_url + "/bot{0}/{1}"
+    redirect_twilio_to(twilio_url)
+    user_ids = login_users(args.users, args.accounts)
+
+    print(f"users: {args.users}, accounts: {args.accounts}, "
+          f"latency twilio/telegram: {args.twilio_latency:g}/{args.telegram_latency:g} ms")
+    print(f"{'engine':<22}{'wall s':>8}{'flows/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'cpu ms/flow':>13}"
+          f"{'twilio':>8}{'telegram':>10}")
+    for engine, run in [(f"threads ({args.threads})", lambda: run_threads(user_ids, args.threads)),
+                        ("asyncio", lambda: run_asyncio(user_ids))]:
+        conn.send("counts")
+        twilio_before, telegram_before = conn.recv()
+        started, cpu_started = time.time(), time.process_time()
+        latencies = run()
+        wall, cpu = time.time() - started, time.process_time() - cpu_started
+        conn.send("counts")
+        twilio_after, telegram_after = conn.recv()
+        print(f"{engine:<22}{wall:>8.2f}{len(latencies) / wall:>10.1f}"
+              f"{percentile(latencies, 0.5) * 1000:>10.0f}{percentile(latencies, 0.95) * 1000:>10.0f}"
+              f"{cpu / len(latencies) * 1000:>13.2f}{twilio_after - twilio_before:>8}{telegram_after - telegram_before:>10}")
+
+    conn.send("stop")
+    fake_apis.join(5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+"""In-process handler benchmark with fake Telegram Bot API and Twilio REST servers.
+
+Synthetic telebot Update objects are fed through bot.process_new_updates after
+setup_all_handlers(). Both APIs are served by local HTTP servers with
+configurable latency and error injection, so nothing leaves the machine.
+
+Usage: python bench_handlers.py [--iterations N] [--flows start,login,...]
+                                [--telegram-latency MS] [--twilio-latency MS]
+                                [--telegram-error-rate P] [--twilio-error-rate P]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Twiliopro needs a token at import time and writes debug.log/users.json to the cwd
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "000000:bench")
+os.environ.setdefault("USERS_FLUSH_INTERVAL", "0.5")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp(prefix="twiliopro-bench-"))
+
+import telebot  # noqa: E402
+from twilio.http.http_client import TwilioHttpClient  # noqa: E402
+
+import Twiliopro  # noqa: E402
+from Twiliopro import AsyncTwilioHttpClient  # noqa: E402
+
+TWILIO_BASE_URL = "https://api.twilio.com"
+TWILIO_DATE = "Thu, 30 Oct 2025 15:32:29 +0000"
+
+
+class FakeApiServer:
+    """Threaded local HTTP server with latency/error injection and call counters"""
+
+    # Bulk login and bulk buy open a connection per worker at once; with socketserver's
+    # default backlog of 5 the overflow waits out a 1s SYN retransmit and skews p95
+    backlog = 128
+
+    def __init__(self, handler_class, latency=0.0, error_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.random = random.Random(7)
+        server = self
+
+        class Handler(handler_class):
+            fake = server
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = FakeApiServer.backlog
+
+        self.httpd = Server(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+
+    def record(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def total_calls(self):
+        with self.lock:
+            return sum(self.calls.values())
+
+    def should_fail(self):
+        with self.lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+
+class FakeHandlerBase(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _params(self):
+        parsed = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length).decode("utf-8")
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                params.update(json.loads(body or "{}"))
+            else:
+                params.update({key: values[-1] for key, values in parse_qs(body).items()})
+        return parsed.path, params
+
+    def _reply(self, status, payload=None):
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method):
+        path, params = self._params()
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+        self.handle_api(method, path, params)
+
+
+class FakeTelegramHandler(FakeHandlerBase):
+    """Bot API: /bot<token>/<method>"""
+
+    message_ids = iter(range(1, 10 ** 9))
+
+    def handle_api(self, method, path, params):
+        api_method = path.rsplit("/", 1)[-1]
+        self.fake.record(api_method)
+
+        if self.fake.should_fail():
+            self._reply(500, {"ok": False, "error_code": 500, "description": "Internal Server Error: injected"})
+            return
+
+        chat_id = int(params.get("chat_id", 0) or 0) if str(params.get("chat_id", "0")).lstrip("-").isdigit() else 0
+        if api_method in ("sendMessage", "editMessageText"):
+            result = {
+                "message_id": next(self.message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": params.get("text", ""),
+            }
+        elif api_method == "getChatMember":
+            result = {"user": {"id": int(params.get("user_id", 0)), "is_bot": False, "first_name": "bench"},
+                      "status": "member"}
+        elif api_method == "getChat":
+            result = {"id": -1001, "type": "channel", "title": "bench"}
+        else:
+            result = True
+        self._reply(200, {"ok": True, "result": result})
+
+
+class FakeTwilioHandler(FakeHandlerBase):
+    """Twilio REST 2010-04-01 subset used by the bot"""
+
+    def handle_api(self, method, path, params):
+        parts = [part for part in path.split("/") if part]
+        # ['2010-04-01', 'Accounts', '<sid>.json'] or deeper
+        resource = "/".join(part if not part.startswith(("AC", "PN")) else "{sid}" for part in parts[2:])
+        self.fake.record(f"{method} {resource or 'Accounts'}")
+
+        if self.fake.should_fail():
+            self._reply(500, {"code": 20500, "message": "Internal Server Error: injected", "status": 500})
+            return
+
+        if len(parts) == 2:
+            self._reply(200, {"accounts": [self._account(self._auth_sid())]})
+        elif len(parts) == 3:
+            self._reply(200, self._account(parts[2].replace(".json", "")))
+        elif "AvailablePhoneNumbers" in parts:
+            self._reply(200, {"available_phone_numbers": self._available_numbers(parts, params)})
+        elif parts[3] == "IncomingPhoneNumbers.json" and method == "POST":
+            number = params.get("PhoneNumber", "+14165550100")
+            self._reply(201, {"sid": "PN" + number.strip("+").rjust(32, "0"), "phone_number": number,
+                              "account_sid": parts[2]})
+        elif parts[3] == "IncomingPhoneNumbers" and method == "DELETE":
+            self._reply(204)
+        elif parts[3] == "Messages.json":
+            to = params.get("To", "+14165550100")
+            self._reply(200, {"messages": [{
+                "sid": "SM" + "0" * 32, "to": to, "from": "+15005550006",
+                "body": "Your WhatsApp code is 123-456", "date_sent": TWILIO_DATE,
+                "account_sid": parts[2], "status": "received",
+            }]})
+        else:
+            self._reply(404, {"code": 20404, "message": "Not found", "status": 404})
+
+    def _auth_sid(self):
+        import base64
+        header = self.headers.get("Authorization", "")
+        if header.startswith("Basic "):
+            return base64.b64decode(header[6:]).decode("utf-8").split(":", 1)[0]
+        return "AC" + "0" * 32
+
+    @staticmethod
+    def _account(sid):
+        return {"sid": sid, "status": "active", "friendly_name": "bench", "type": "Full"}
+
+    def _available_numbers(self, parts, params):
+        country = parts[parts.index("AvailablePhoneNumbers") + 1]
+        limit = int(params.get("PageSize", 50))
+        rng = random.Random(json.dumps([parts, params], sort_keys=True))
+        area_code = params.get("AreaCode")
+        contains = params.get("Contains", "")
+        numbers = []
+        for _ in range(limit):
+            if area_code:
+                national = area_code + "".join(rng.choice("0123456789") for _ in range(7))
+            else:
+                prefix = "800" if "TollFree.json" in parts else rng.choice(["416", "647", "437", "212", "305"])
+                tail = contains + "".join(rng.choice("0123456789") for _ in range(7 - len(contains)))
+                national = prefix + tail[:7]
+            numbers.append({"phone_number": f"+1{national}", "friendly_name": national, "iso_country": country,
+                            "capabilities": {"sms": True, "voice": True, "mms": False}})
+        return numbers
+
+
+def redirect_twilio_to(base_url):
+    """Send every Twilio REST request to the fake server"""
+    original_request = TwilioHttpClient.request
+
+    def request(self, method, url, *args, **kwargs):
+        if url.startswith(TWILIO_BASE_URL):
+            url = base_url + url[len(TWILIO_BASE_URL):]
+        return original_request(self, method, url, *args, **kwargs)
+
+    TwilioHttpClient.request = request
+
+    # IO_ENGINE=asyncio goes through the aiohttp-based client instead
+    if AsyncTwilioHttpClient is not None:
+        original_async_request = AsyncTwilioHttpClient.request
+
+        async def async_request(self, method, url, *args, **kwargs):
+            if url.startswith(TWILIO_BASE_URL):
+                url = base_url + url[len(TWILIO_BASE_URL):]
+            return await original_async_request(self, method, url, *args, **kwargs)
+
+        AsyncTwilioHttpClient.request = async_request
+
+
+def make_sid(index):
+    return "AC" + f"{index:032x}"
+
+
+def make_token(index):
+    return f"{index:032x}"
+
+
+class Bench:
+    """Drives synthetic updates through the bot and records latency per flow"""
+
+    def __init__(self, telegram, twilio, broadcast_users):
+        self.telegram = telegram
+        self.twilio = twilio
+        self.broadcast_users = broadcast_users
+        self.update_ids = iter(range(1, 10 ** 9))
+        self.message_ids = iter(range(1, 10 ** 9))
+
+    def _user(self, user_id):
+        return {"id": user_id, "is_bot": False, "first_name": "bench"}
+
+    def message(self, user_id, text):
+        return {
+            "update_id": next(self.update_ids),
+            "message": {"message_id": next(self.message_ids), "date": int(time.time()),
+                        "chat": {"id": user_id, "type": "private"}, "from": self._user(user_id), "text": text},
+        }
+
+    def callback(self, user_id, data):
+        return {
+            "update_id": next(self.update_ids),
+            "callback_query": {
+                "id": str(next(self.update_ids)), "from": self._user(user_id), "chat_instance": "bench", "data": data,
+                "message": {"message_id": next(self.message_ids), "date": int(time.time()),
+                            "chat": {"id": user_id, "type": "private"}, "from": self._user(user_id), "text": "x"},
+            },
+        }
+
+    def send(self, *updates):
+        Twiliopro.bot.process_new_updates([telebot.types.Update.de_json(json.dumps(update)) for update in updates])
+
+    def login(self, user_id, accounts=1):
+        Twiliopro.registered_users.setdefault(user_id, Twiliopro.UserRecord())
+        if accounts == 1:
+            self.send(self.message(user_id, "👤 Login"),
+                      self.message(user_id, f"{make_sid(user_id)} {make_token(user_id)}"))
+        else:
+            lines = "\n".join(f"{make_sid(user_id * 100 + i)} {make_token(user_id * 100 + i)}" for i in range(accounts))
+            self.send(self.message(user_id, "➕ Bulk Login"), self.message(user_id, lines))
+
+    def buy(self, user_id, number="+14165550100"):
+        self.send(self.callback(user_id, f"buy_{number}"))
+
+    # Flows: each returns the updates to time (setup work happens before)
+    def flow_start(self, i):
+        return [self.message(700000000 + i, "/start")]
+
+    def flow_login(self, i):
+        user_id = 710000000 + i
+        Twiliopro.registered_users.setdefault(user_id, Twiliopro.UserRecord())
+        return [self.message(user_id, "👤 Login"), self.message(user_id, f"{make_sid(user_id)} {make_token(user_id)}")]
+
+    def flow_bulk_login(self, i):
+        user_id = 720000 + i
+        Twiliopro.registered_users.setdefault(user_id, Twiliopro.UserRecord())
+        lines = "\n".join(f"{make_sid(user_id * 100 + n)} {make_token(user_id * 100 + n)}" for n in range(10))
+        return [self.message(user_id, "➕ Bulk Login"), self.message(user_id, lines)]
+
+    def flow_area_code_search(self, i):
+        user_id = 730000 + i
+        self.login(user_id, accounts=3)
+        self.send(self.message(user_id, "🔎 Search Numbers"))
+        return [self.message(user_id, random.choice(["416", "647", "437", "905"]))]
+
+    def flow_target_search(self, i):
+        user_id = 740000 + i
+        self.login(user_id, accounts=3)
+        self.send(self.message(user_id, "📍 Target Number"))
+        return [self.message(user_id, random.choice(["1234", "777", "55555"]))]
+
+    def flow_buy(self, i):
+        user_id = 750000 + i
+        self.login(user_id, accounts=3)
+        return [self.callback(user_id, f"buy_+1416555{i:04d}")]
+
+    def flow_bulk_buy(self, i):
+        user_id = 755000 + i
+        self.login(user_id, accounts=3)
+        self.send(self.message(user_id, "🔎 Search Numbers"), self.message(user_id, "416"))
+        return [self.callback(user_id, "bulkbuy_0")]
+
+    def flow_receive_sms(self, i):
+        user_id = 760000 + i
+        self.login(user_id, accounts=3)
+        self.buy(user_id)
+        return [self.message(user_id, "💬 Receive SMS")]
+
+    def flow_view_sms(self, i):
+        user_id = 770000 + i
+        self.login(user_id, accounts=3)
+        self.buy(user_id)
+        return [self.callback(user_id, "view_sms")]
+
+    def flow_broadcast(self, i):
+        for n in range(self.broadcast_users):
+            Twiliopro.registered_users.setdefault(780000 + n, Twiliopro.UserRecord())
+        self.send(self.message(Twiliopro.admin_id, "📣 Broadcast"))
+        return [self.message(Twiliopro.admin_id, f"Benchmark announcement #{i}")]
+
+    def run(self, flow_name, iterations):
+        flow = getattr(self, f"flow_{flow_name}")
+        latencies = []
+        telegram_calls = 0
+        twilio_calls = 0
+        for i in range(iterations):
+            updates = flow(i)
+            telegram_before = self.telegram.total_calls()
+            twilio_before = self.twilio.total_calls()
+            started = time.perf_counter()
+            self.send(*updates)
+            latencies.append((time.perf_counter() - started) * 1000)
+            telegram_calls += self.telegram.total_calls() - telegram_before
+            twilio_calls += self.twilio.total_calls() - twilio_before
+        return latencies, telegram_calls / iterations, twilio_calls / iterations
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+FLOWS = ["start", "login", "bulk_login", "area_code_search", "target_search", "buy", "bulk_buy",
+         "receive_sms", "view_sms", "broadcast"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--flows", default=",".join(FLOWS))
+    parser.add_argument("--telegram-latency", type=float, default=20, help="ms per Bot API call")
+    parser.add_argument("--twilio-latency", type=float, default=50, help="ms per Twilio call")
+    parser.add_argument("--telegram-error-rate", type=float, default=0.0)
+    parser.add_argument("--twilio-error-rate", type=float, default=0.0)
+    parser.add_argument("--broadcast-users", type=int, default=10)
+    args = parser.parse_args()
+
+    telegram = FakeApiServer(FakeTelegramHandler, args.telegram_latency / 1000, args.telegram_error_rate).start()
+    twilio = FakeApiServer(FakeTwilioHandler, args.twilio_latency / 1000, args.twilio_error_rate).start()
+
+    telebot.apihelper.API_URL = telegram.base_url + "/bot{0}/{1}"
+    redirect_twilio_to(twilio.base_url)
+
+    # Run handlers inline so each update's latency is measured end to end
+    Twiliopro.bot.threaded = False
+    Twiliopro.safe_load_registered_users()
+    Twiliopro.setup_all_handlers()
+
+    bench = Bench(telegram, twilio, args.broadcast_users)
+    print(f"{'flow':<18}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'tg calls':>10}{'twilio calls':>14}")
+    for flow_name in args.flows.split(","):
+        flow_name = flow_name.strip()
+        iterations = max(1, min(args.iterations, 3)) if flow_name == "broadcast" else args.iterations
+        latencies, telegram_calls, twilio_calls = bench.run(flow_name, iterations)
+        print(f"{flow_name:<18}{iterations:>5}{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}"
+              f"{percentile(latencies, 99):>10.1f}{telegram_calls:>10.1f}{twilio_calls:>14.1f}")
+
+    telegram.stop()
+    twilio.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Micro-benchmark: pasted-number extraction, per-line regexes vs one precompiled sweep.
+
+The legacy path is handle_numbers as it was: an uncompiled re.search and re.sub
+per line, plus extract_whatsapp_info's three searches over the whole message
+for every number not in the user's search history (the worst case timed here).
+
+Usage: python bench_number_extraction.py [numbers_per_paste ...]
+"""
+import os
+import random
+import re
+import sys
+import tempfile
+import timeit
+
+# Twiliopro needs a token at import time and logs to ./debug.log
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "000000:bench")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp(prefix="twiliopro-bench-"))
+
+import Twiliopro  # noqa: E402
+
+
+def legacy_extract(text):
+    """handle_numbers' parsing loop before the extraction engine"""
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    normalized_numbers = []
+    for line in lines:
+        phone_pattern = r'(?:\+?1?\s?-?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}'
+        match = re.search(phone_pattern, line)
+        if match:
+            digits = re.sub(r'[^\d]', '', match.group(0))
+            if len(digits) == 10:
+                normalized = '+1' + digits
+            elif len(digits) == 11 and digits.startswith('1'):
+                normalized = '+' + digits
+            else:
+                continue
+            normalized_numbers.append(normalized)
+    for _ in normalized_numbers:
+        re.search(r'\+?\d+', text)
+        re.search(r'(\d{3}-\d{3})|(\d{3}[-]?\d{3})|(\d{4,6})', text)
+        re.search(r'(\d{2}/\d{2}/\d{4} \d{2}:\d{2})', text)
+    return normalized_numbers
+
+
+def current_extract(text):
+    numbers = Twiliopro.extract_phone_numbers(text)
+    Twiliopro.extract_whatsapp_info(text)
+    return numbers
+
+
+def sample_paste(count, seed=7):
+    """A pasted list of NANP numbers in the formats users forward"""
+    rng = random.Random(seed)
+    formats = ["+1{a}{e}{s}", "({a}) {e}-{s}", "{a}.{e}.{s}", "1-{a}-{e}-{s}", "{a}{e}{s}"]
+    lines = []
+    for _ in range(count):
+        area, exchange, subscriber = rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999)
+        lines.append(rng.choice(formats).format(a=area, e=exchange, s=f"{subscriber:04d}"))
+    return "\n".join(lines)
+
+
+# Pasted lines where a number is followed by other digits; both paths must still find the number
+EDGE_CASES = [
+    "+1 416-555-1234 123-456",
+    "+14165551234 2024",
+    "+1 (416) 555-1234 code 123456",
+    "1-212-555-0000 at 10:30",
+    "(647)555-1111\n416.555.9876 ext 12",
+]
+
+
+def best_of(function, text, repeat=3):
+    # The legacy path is quadratic; keep large pastes to a single run per repeat
+    runs = max(1, 2000 // (len(text) // 12 + 1))
+    return min(timeit.repeat(lambda: function(text), number=runs, repeat=repeat)) / runs
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 300, 1000]
+
+    for text in EDGE_CASES:
+        assert current_extract(text) == list(dict.fromkeys(legacy_extract(text))), text
+
+    print(f"{'numbers':>8}{'legacy ms':>12}{'engine ms':>12}{'speedup':>10}")
+    for size in sizes:
+        text = sample_paste(size)
+        # Same numbers out (the engine also drops duplicates)
+        assert current_extract(text) == list(dict.fromkeys(legacy_extract(text)))
+        legacy, current = best_of(legacy_extract, text), best_of(current_extract, text)
+        print(f"{size:>8}{legacy * 1000:>12.3f}{current * 1000:>12.3f}{legacy / current:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
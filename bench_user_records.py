@@ -0,0 +1,66 @@
+"""Memory benchmark: bytes per registered user, dict schema vs UserRecord.
+
+Usage: python bench_user_records.py [user_count]
+"""
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+# Twiliopro needs a token at import time and logs to ./debug.log
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "000000:bench")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp(prefix="twiliopro-bench-"))
+
+import Twiliopro  # noqa: E402
+
+
+def sample_user(index):
+    """One users.json entry shaped like the ones the bot writes"""
+    user = {"status": "approved", "channel_joined": index % 3 != 0, "first_use_time": None}
+    if index % 2 == 0:
+        user["verified_channels"] = {channel["username"]: True for channel in Twiliopro.REQUIRED_CHANNELS}
+    return user
+
+
+def measure(build, count):
+    """Return (bytes per user, container) for the structure produced by build()"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    container = build(count)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return allocated / count, container
+
+
+def build_dicts(count):
+    return {5000000000 + i: sample_user(i) for i in range(count)}
+
+
+def build_records(count):
+    return {5000000000 + i: Twiliopro.UserRecord.from_dict(sample_user(i)) for i in range(count)}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    dict_bytes, dicts = measure(build_dicts, count)
+    del dicts
+    record_bytes, records = measure(build_records, count)
+
+    # Round trip must be lossless
+    for user_id, record in list(records.items())[:1000]:
+        assert record.to_dict() == sample_user(user_id - 5000000000)
+
+    print(f"users:            {count}")
+    print(f"dict schema:      {dict_bytes:8.1f} bytes/user")
+    print(f"UserRecord:       {record_bytes:8.1f} bytes/user")
+    print(f"saving:           {(1 - record_bytes / dict_bytes) * 100:8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# Gunicorn settings for the Render deployment (render.yaml passes -c gunicorn.conf.py).
+# Gunicorn owns SIGTERM in its workers, so the dirty-user flush runs from this hook.
+
+# One worker only: registered users (approval, block, channel verification) live in the
+# worker's memory, so a second worker would miss users and updates handled by the first.
+# Sessions can already be shared through STATE_BACKEND=sqlite; user records cannot yet.
+# The gevent worker class provides the concurrency.
+workers = 1
+
+
+def on_starting(server):
+    """Hold the worker count at 1 even if -w or WEB_CONCURRENCY asks for more"""
+    if server.num_workers != 1:
+        server.log.warning("Twiliopro supports a single worker; ignoring workers=%s", server.num_workers)
+        server.num_workers = 1
+
+
+def worker_exit(server, worker):
+    """Write any users still queued by the write-behind persister before the worker exits"""
+    import Twiliopro
+
+    if not Twiliopro.flush_dirty_users():
+        server.log.error("Dirty users could not be flushed on worker exit (pid: %s)", worker.pid)
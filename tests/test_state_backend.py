@@ -0,0 +1,85 @@
+"""Consecutive updates from one user served by different workers sharing one SQLite state file.
+
+Each worker is a SqliteStateBackend with its own connection to the same state.db,
+swapped in as Twiliopro.state_backend while that worker handles an update. The
+Telegram and Twilio APIs are the fake local servers from bench_handlers.py.
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import telebot  # noqa: E402
+
+from bench_handlers import (  # noqa: E402
+    Bench, FakeApiServer, FakeTelegramHandler, FakeTwilioHandler, Twiliopro, make_sid, make_token, redirect_twilio_to,
+)
+
+
+@pytest.fixture(scope="module")
+def bench():
+    telegram = FakeApiServer(FakeTelegramHandler).start()
+    twilio = FakeApiServer(FakeTwilioHandler).start()
+    telebot.apihelper.API_URL = telegram.base_url + "/bot{0}/{1}"
+    redirect_twilio_to(twilio.base_url)
+    Twiliopro.bot.threaded = False
+    Twiliopro.setup_all_handlers()
+    yield Bench(telegram, twilio, broadcast_users=0)
+    telegram.stop()
+    twilio.stop()
+
+
+@pytest.fixture
+def workers(tmp_path):
+    db_path = str(tmp_path / "state.db")
+    return Twiliopro.SqliteStateBackend(db_path), Twiliopro.SqliteStateBackend(db_path)
+
+
+@contextmanager
+def serving(worker):
+    """Handle updates as if this worker process had received them"""
+    previous = Twiliopro.state_backend
+    Twiliopro.state_backend = worker
+    try:
+        yield
+    finally:
+        Twiliopro.state_backend = previous
+
+
+def test_login_reply_resolves_on_another_worker(bench, workers):
+    worker_a, worker_b = workers
+    user_id = 790001
+    Twiliopro.registered_users.setdefault(user_id, Twiliopro.UserRecord())
+
+    with serving(worker_a):
+        bench.send(bench.message(user_id, "👤 Login"))
+    with serving(worker_b):
+        assert user_id in Twiliopro.pending_steps
+        bench.send(bench.message(user_id, f"{make_sid(user_id)} {make_token(user_id)}"))
+
+    with serving(worker_a):
+        assert user_id not in Twiliopro.pending_steps
+        assert Twiliopro.user_data[user_id]["sid"] == make_sid(user_id)
+
+
+def test_search_mode_and_results_follow_the_user(bench, workers):
+    worker_a, worker_b = workers
+    user_id = 790002
+    Twiliopro.registered_users.setdefault(user_id, Twiliopro.UserRecord())
+
+    with serving(worker_a):
+        bench.send(bench.message(user_id, "👤 Login"))
+    with serving(worker_b):
+        bench.send(bench.message(user_id, f"{make_sid(user_id)} {make_token(user_id)}"))
+    with serving(worker_a):
+        bench.send(bench.message(user_id, "🇺🇸 USA Numbers"))
+    with serving(worker_b):
+        assert Twiliopro.user_search_mode[user_id] == "search_us_numbers"
+        bench.send(bench.message(user_id, "212"))
+
+    with serving(worker_a):
+        assert Twiliopro.search_results[user_id]["numbers"]
+        assert Twiliopro.load_search_history(user_id)